@@ -1,17 +1,74 @@
+import sys
+import time
 import asyncio
-from asyncio import Semaphore
-from prompt_toolkit.shortcuts import radiolist_dialog, input_dialog
-from prompt_toolkit.styles import Style
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Coroutine, Iterable
 
 from random import uniform
 
+from data import config
 from tasks.hyperlend import Hyperlend
 from eth_async.client import Client
 from eth_async.data.models import Networks, TokenAmount
-from utils import logger, format_proxy, load_file
+from eth_async.exceptions import InvalidProxy
+from eth_async.metrics import metrics, MetricsServer
+from eth_async.pipeline import tx_pipeline
+from eth_async.proxies import proxy_verifier, proxy_pool
+from eth_async.transactions import NonceManager
+from journal import Journal
+from scheduler import Job, Scheduler
+from utils import logger, format_proxy, load_file, WalletSource
 
+FUNCTIONS = [
+    ('claim_hype_faucet', 'Claim HYPE Faucet'),
+    # ('get_balances', 'Get token balances'),
+    ('claim_mbtc_faucet', 'Claim MBTC Faucet'),
+    ('supply_mbtc', 'Supply MBTC'),
+    ('supply_eth', 'Supply ETH'),
+    ('supply_hype', 'Supply HYPE'),
+]
 
-async def process_wallet(private_key: str, proxy: str, api_key: str, semaphore: Semaphore, selected_function: str):
+# How wallets get proxies, 'fixed' is run as 'sticky' without a pool since every wallet has its own proxy
+PROXY_MODES = [
+    ('fixed', 'Fixed: the N-th wallet uses the N-th proxy'),
+    ('sticky', 'Sticky: a wallet keeps the same proxy of the shared pool while it works'),
+    ('rotating', 'Rotating: each wallet takes the next free proxy of the shared pool'),
+]
+
+# Default ranges of random supply amounts and the number of decimal places they are rounded to
+AMOUNT_RANGES = {
+    'supply_mbtc': (0.01, 0.02, 4),
+    'supply_eth': (0.0001, 0.0005, 5),
+    'supply_hype': (0.0001, 0.0005, 5),
+}
+
+
+def random_amount(selected_function: str, amount_range: tuple[float, float] | None = None) -> TokenAmount:
+    """
+        Picks a random supply amount for the selected function.
+
+        Args:
+            selected_function (str): The supply function, a key of AMOUNT_RANGES.
+            amount_range (tuple[float, float] | None): The minimum and the maximum amount. Default is the range
+                of the function in AMOUNT_RANGES.
+
+        Returns:
+            TokenAmount: The amount.
+    """
+    low, high, digits = AMOUNT_RANGES[selected_function]
+    if amount_range:
+        low, high = amount_range
+
+    decimals = 8 if selected_function == 'supply_mbtc' else 18
+    return TokenAmount(amount=round(uniform(low, high), digits), decimals=decimals)
+
+
+async def process_wallet(
+        private_key: str, proxy: str | None, api_key: str, selected_function: str,
+        journal: Journal | None = None, amount_range: tuple[float, float] | None = None, job: Job | None = None,
+        check_proxy: bool = True
+):
     """
         Processes a wallet using the provided private key, proxy, and selected function.
 
@@ -20,40 +77,335 @@ async def process_wallet(private_key: str, proxy: str, api_key: str, semaphore:
 
         Args:
             private_key (str): The private key of the wallet to interact with.
-            proxy (str): The proxy settings to use for the connection.
+            proxy (str | None): The proxy settings to use for the connection.
             api_key (str): The API key for Capmonster service.
-            semaphore (Semaphore): The semaphore to control concurrent execution.
             selected_function (str): The selected function to execute. Valid options:
                 - ???? -
+            journal (Journal | None): The run journal. Wallets it records as completed are skipped.
+            amount_range (tuple[float, float] | None): The minimum and the maximum supply amount. Default is the
+                range of the function in AMOUNT_RANGES.
+            job (Job | None): The scheduler job of the wallet. Its label is set to the wallet address, and a failure
+                isn't counted if the job is retried.
+            check_proxy (bool): Whether to skip the wallet if its proxy doesn't work. A proxy without a cached
+                verification is verified blocking the event loop, so the run verifies proxies beforehand. Default is
+                True.
 
         Returns:
             None: This function performs an action but does not return a value.
     """
-    async with semaphore:
+    try:
         client = Client(private_key=private_key,
                         network=Networks.Hyperlend,
-                        proxy=proxy)
-        proxy_dict = format_proxy(proxy)
-
-        hyperlend = Hyperlend(client=client,
-                              api_key=api_key,
-                              proxy_info=proxy_dict)
-
-        if selected_function == 'claim_hype_faucet':
-            await hyperlend.claim_hype_faucet()
-        # elif selected_function == 'get_balances':
-        #     await Hyperlend.get_balances()
-        elif selected_function == 'claim_mbtc_faucet':
-            await hyperlend.claim_mbtc_faucet()
-        elif selected_function == 'supply_mbtc':
-            await hyperlend.supply_mbtc(amount=TokenAmount(amount=round(uniform(0.01, 0.02), 4), decimals=8))
-        elif selected_function == 'supply_eth':
-            await hyperlend.supply_eth(amount=TokenAmount(amount=round(uniform(0.0001, 0.0005), 5)))
-        elif selected_function == 'supply_hype':
-            await hyperlend.supply_hype(amount=TokenAmount(amount=round(uniform(0.0001, 0.0005), 5)))
+                        proxy=proxy,
+                        check_proxy=check_proxy)
+    except InvalidProxy as e:
+        metrics.inc('wallets_processed', function=selected_function, result='skipped')
+        logger.error(str(e))
+        return
+
+    address = client.account.address
+    if job:
+        job.label = address
+
+    if journal and journal.is_completed(address, selected_function):
+        metrics.inc('wallets_processed', function=selected_function, result='completed_before')
+        logger.info(f'Completed in a previous run, skipping | {address}')
+        return
+
+    proxy_dict = format_proxy(proxy)
+
+    hyperlend = Hyperlend(client=client,
+                          api_key=api_key,
+                          proxy_info=proxy_dict,
+                          journal=journal)
+
+    try:
+        with metrics.timer('wallet', selected_function):
+            if selected_function == 'claim_hype_faucet':
+                await hyperlend.claim_hype_faucet()
+            # elif selected_function == 'get_balances':
+            #     await Hyperlend.get_balances()
+            elif selected_function == 'claim_mbtc_faucet':
+                await hyperlend.claim_mbtc_faucet()
+            elif selected_function == 'supply_mbtc':
+                await hyperlend.supply_mbtc(amount=random_amount(selected_function, amount_range))
+            elif selected_function == 'supply_eth':
+                await hyperlend.supply_eth(amount=random_amount(selected_function, amount_range))
+            elif selected_function == 'supply_hype':
+                await hyperlend.supply_hype(amount=random_amount(selected_function, amount_range))
+
+    except asyncio.CancelledError:
+        # The deadline of the scheduler or the second Ctrl-C, the wallet isn't left pending without a reason
+        reason = 'timed out' if job and job.expired() else 'cancelled'
+        if not job or job.last_attempt:
+            metrics.inc('wallets_processed', function=selected_function, result=reason.replace(' ', '_'))
+
+        if journal:
+            journal.record(address, selected_function, 'failed', reason)
+        raise
+
+    except Exception as e:
+        if not job or job.last_attempt:
+            metrics.inc('wallets_processed', function=selected_function, result='failed')
+
+        if journal:
+            journal.record(address, selected_function, 'failed', str(e))
+        raise
+
+    finally:
+        NonceManager.evict(client.network.chain_id, address)
+
+    metrics.inc('wallets_processed', function=selected_function, result='done')
+
+
+async def run(
+        wallets: Iterable[tuple[str, str | None]], api_key: str, selected_function: str, max_concurrent_tasks: int,
+        amount_range: tuple[float, float] | None = None, verify_proxies: bool = True,
+        wallet_timeout: float | None = None, retries: int = 0, proxies: list[str] | None = None,
+        proxy_mode: str = 'sticky', max_per_proxy: int = 5
+) -> dict:
+    """
+        Runs the selected function for all wallets.
+
+        The wallets are taken from a queue by 'max_concurrent_tasks' workers of a Scheduler, so only the wallets being
+        processed are held in memory, however many the source has. The first Ctrl-C stops taking new wallets, the
+        second one cancels the wallets in progress.
+
+        Args:
+            wallets (Iterable[tuple[str, str | None]]): Pairs of the private key and the proxy of each wallet, e.g.
+                a WalletSource that reads them lazily. Wallets without a proxy lease one from the proxy pool.
+            api_key (str): The API key for Capmonster service.
+            selected_function (str): The selected function to execute, one of FUNCTIONS.
+            max_concurrent_tasks (int): The maximum number of wallets processed at once.
+            amount_range (tuple[float, float] | None): The minimum and the maximum supply amount. Default is the
+                range of the function in AMOUNT_RANGES.
+            verify_proxies (bool): Whether to verify the proxy of each wallet before processing it, every proxy is
+                verified once. Default is True.
+            wallet_timeout (float | None): The time limit of a wallet attempt, in seconds. Default is no limit.
+            retries (int): The number of times a wallet is retried at the back of the queue if it raises an exception
+                or runs out of time. Default is 0.
+            proxies (list[str] | None): The proxies of the pool shared by the wallets without a proxy. Default is the
+                proxies the pool already has.
+            proxy_mode (str): 'sticky' to keep a wallet on the same proxy while it's healthy, 'rotating' to give each
+                attempt the next free proxy. Default is 'sticky'.
+            max_per_proxy (int): The maximum number of wallets using a proxy of the pool at once, 0 for no limit.
+                Default is 5.
+
+        Returns:
+            dict: The run summary: the number of wallets by result, the number of retries, whether the run was
+                stopped by Ctrl-C, the duration and the throughput.
+    """
+    metrics_server = None
+    if config.METRICS_PORT:
+        metrics_server = MetricsServer(port=config.METRICS_PORT)
+        await metrics_server.start()
+        logger.info(f'Serving metrics at http://127.0.0.1:{config.METRICS_PORT}/metrics')
+
+    if config.SIGN_PROCESSES:
+        tx_pipeline.configure(processes=config.SIGN_PROCESSES)
+        await tx_pipeline.warm_up()
+
+    journal = Journal(config.JOURNAL_PATH)
+    completed = journal.counts(selected_function)
+    if completed:
+        logger.info(f'Journal {config.JOURNAL_PATH}: {completed}')
+
+    started = time.monotonic()
+    metrics.set_gauge('wallets_per_second', lambda: metrics.total('wallets_processed') / (time.monotonic() - started))
+
+    failed_proxies = set()
+    proxy_pool.configure(proxies, mode=proxy_mode, max_per_proxy=max_per_proxy, verify=verify_proxies)
+
+    async def handle(job: Job) -> None:
+        private_key, proxy = job.item
+        if proxy is None and len(proxy_pool):
+            # The key picks the sticky proxy of the wallet
+            async with proxy_pool.lease(private_key) as proxy:
+                await process(job, private_key, proxy)
+            return
+
+        if verify_proxies and proxy and not (await proxy_verifier.verify(proxy)).ok:
+            failed_proxies.add(proxy)
+
+        await process(job, private_key, proxy)
+
+    async def process(job: Job, private_key: str, proxy: str | None) -> None:
+        await process_wallet(
+            private_key=private_key,
+            proxy=proxy,
+            api_key=api_key,
+            selected_function=selected_function,
+            journal=journal,
+            amount_range=amount_range,
+            job=job,
+            check_proxy=verify_proxies
+        )
+
+    scheduler = Scheduler(handle, workers=max_concurrent_tasks, deadline=wallet_timeout, retries=retries)
+    try:
+        # A failed wallet doesn't stop the others
+        stats = await scheduler.run(wallets)
+    finally:
+        journal.close()
+        tx_pipeline.shutdown()
+        if metrics_server:
+            await metrics_server.stop()
+
+    if failed_proxies:
+        logger.warning(f'{len(failed_proxies)} proxies do not work, their wallets were skipped')
+
+    if proxy_pool.quarantined():
+        logger.warning(f'{proxy_pool.quarantined()} of {len(proxy_pool)} proxies are quarantined')
+
+    elapsed = time.monotonic() - started
+    logger.info(f'Request timings:\n{metrics.summary()}')
+    results = {value['result']: value['value'] for value in metrics.values().get('wallets_processed', [])}
+    return {
+        'function': selected_function,
+        'wallets': stats['taken'],
+        'results': results,
+        'retried': stats['retried'],
+        'stopped': stats['stopped'],
+        'elapsed': round(elapsed, 3),
+        'wallets_per_second': round(sum(results.values()) / elapsed, 3) if elapsed else None,
+    }
+
+
+def run_loop(coroutine: Coroutine[Any, Any, Any]) -> Any:
+    """
+        Runs the coroutine in a new event loop: the selector one on Windows, uvloop on other systems if it's installed.
+
+        Args:
+            coroutine (Coroutine): The coroutine to run.
+
+        Returns:
+            Any: The result of the coroutine.
+    """
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        return asyncio.run(coroutine)
+
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(coroutine)
+
+    return uvloop.run(coroutine)
+
+
+def _run_shard(kwargs: dict) -> tuple[dict, dict]:
+    # The metrics endpoint of the parent process can't be shared, the shards don't serve their own
+    config.METRICS_PORT = 0
+    summary = run_loop(run(**kwargs))
+    return summary, metrics.export()
+
+
+def run_sharded(
+        wallets: WalletSource | Iterable[tuple[str, str | None]], api_key: str, selected_function: str,
+        max_concurrent_tasks: int, processes: int, amount_range: tuple[float, float] | None = None,
+        verify_proxies: bool = True, wallet_timeout: float | None = None, retries: int = 0,
+        proxies: list[str] | None = None, proxy_mode: str = 'sticky', max_per_proxy: int = 5,
+        initializer: Callable[..., None] | None = None, initargs: tuple = ()
+) -> dict:
+    """
+        Runs the selected function for all wallets in several processes, each with its own event loop, a shard of the
+        wallets and a shard of the concurrency. The journal is shared by the processes.
+
+        Args:
+            wallets (WalletSource | Iterable[tuple[str, str | None]]): Pairs of the private key and the proxy of each
+                wallet. A WalletSource is read by the processes themselves, other iterables are sent to them.
+            api_key (str): The API key for Capmonster service.
+            selected_function (str): The selected function to execute, one of FUNCTIONS.
+            max_concurrent_tasks (int): The maximum number of wallets processed at once by all processes.
+            processes (int): The number of processes, at most 'max_concurrent_tasks'.
+            amount_range (tuple[float, float] | None): The minimum and the maximum supply amount. Default is the
+                range of the function in AMOUNT_RANGES.
+            verify_proxies (bool): Whether to verify the proxy of each wallet before processing it. Default is True.
+            wallet_timeout (float | None): The time limit of a wallet attempt, in seconds. Default is no limit.
+            retries (int): The number of times a failed wallet is retried. Default is 0.
+            proxies (list[str] | None): The proxies of the pool shared by the wallets without a proxy, every process
+                has a pool of all of them. Default is none.
+            proxy_mode (str): 'sticky' or 'rotating'. Default is 'sticky'.
+            max_per_proxy (int): The maximum number of wallets using a proxy of the pool at once in all processes,
+                0 for no limit, else at least 'processes'. Default is 5.
+            initializer (Callable[..., None] | None): A function that sets up each process, e.g. the logger, since
+                processes are spawned and don't inherit the state of this one.
+            initargs (tuple): Arguments of the initializer.
+
+        Returns:
+            dict: The run summary merged over the processes, with the summary of each process in 'shards'. Metrics of
+                the processes are merged into the metrics of this one.
+    """
+    if not isinstance(wallets, WalletSource):
+        wallets = list(wallets)
+        processes = min(processes, len(wallets))
+
+    if max_concurrent_tasks < 1:
+        raise ValueError('The number of concurrent tasks must be positive')
+
+    if proxies and 0 < max_per_proxy < processes:
+        # Each process needs at least one lease of a proxy, together they would go over the limit
+        raise ValueError(f'The limit of {max_per_proxy} wallets per proxy is less than {processes} processes')
+
+    if processes > max_concurrent_tasks:
+        # A process runs at least one wallet at once, more processes would go over the total concurrency
+        logger.warning(
+            f'{processes} processes for {max_concurrent_tasks} concurrent tasks, running {max_concurrent_tasks}'
+        )
+        processes = max_concurrent_tasks
+
+    processes = max(processes, 1)
+    shards = []
+    for i in range(processes):
+        shards.append({
+            # Wallets are dealt round-robin, each keeps its proxy
+            'wallets': wallets.shard(i, processes) if isinstance(wallets, WalletSource) else wallets[i::processes],
+            'api_key': api_key,
+            'selected_function': selected_function,
+            'max_concurrent_tasks': max_concurrent_tasks // processes + (i < max_concurrent_tasks % processes),
+            'amount_range': amount_range,
+            'verify_proxies': verify_proxies,
+            'wallet_timeout': wallet_timeout,
+            'retries': retries,
+            'proxies': proxies,
+            'proxy_mode': proxy_mode,
+            # The processes don't share the leases, so each gets a share of the limit
+            'max_per_proxy': max(max_per_proxy // processes, 1) if max_per_proxy else 0,
+        })
+
+    logger.info(f'Running the wallets in {processes} processes')
+    started = time.monotonic()
+    with ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context('spawn'), initializer=initializer,
+            initargs=initargs
+    ) as executor:
+        results = list(executor.map(_run_shard, shards))
+
+    elapsed = time.monotonic() - started
+    wallet_results = {}
+    for summary, state in results:
+        metrics.merge(state)
+        for result, count in summary['results'].items():
+            wallet_results[result] = wallet_results.get(result, 0) + count
+
+    logger.info(f'Request timings of all processes:\n{metrics.summary()}')
+    return {
+        'function': selected_function,
+        'wallets': sum(summary['wallets'] for summary, _ in results),
+        'results': wallet_results,
+        'retried': sum(summary['retried'] for summary, _ in results),
+        'stopped': any(summary['stopped'] for summary, _ in results),
+        'elapsed': round(elapsed, 3),
+        'wallets_per_second': round(sum(wallet_results.values()) / elapsed, 3) if elapsed else None,
+        'processes': processes,
+        'shards': [summary for summary, _ in results],
+    }
 
 
 async def main():
+    from prompt_toolkit.shortcuts import radiolist_dialog, input_dialog
+    from prompt_toolkit.styles import Style
+
     try:
         max_concurrent_tasks = await input_dialog(
             title="Configure threads",
@@ -70,67 +422,73 @@ async def main():
         logger.error(f"Error when entering the number of threads: {e}. Use default value: 1.")
         max_concurrent_tasks = 1
 
-    semaphore: Semaphore = Semaphore(max_concurrent_tasks)
-
-    proxies = load_file("./proxies.txt", 'proxy')
     api_key = load_file("./api_key.txt", 'API-key of Capmonster')
-    private_keys = load_file("./private_keys.txt", 'wallet')
-
     if not api_key:
         logger.error("API key from Capmonster was not found.")
         return
 
-    if not proxies:
-        logger.error("Proxies not found.")
+    style = Style.from_dict({
+        'selected': 'bg:#00aaaa #ffffff',
+        'pointer': '#00aaaa bold',
+    })
+
+    proxy_mode = await radiolist_dialog(
+        'Select how wallets get proxies:',
+        values=PROXY_MODES,
+        default='fixed',
+        style=style
+    ).run_async()
+    if not proxy_mode:
         return
 
-    if not private_keys:
-        logger.error("Private keys not found.")
+    proxies = load_file("./proxies.txt", 'proxy')
+    if proxy_mode == 'fixed':
+        # The N-th wallet uses the N-th proxy
+        wallets = WalletSource(keys_path='./private_keys.txt', proxies_path='./proxies.txt')
+    else:
+        # Wallets share the proxies, the numbers of wallets and proxies don't have to match
+        wallets = WalletSource(keys_path='./private_keys.txt')
+
+    try:
+        wallet_count = wallets.count()
+    except FileNotFoundError as e:
+        logger.error(f"File {e.filename} was not found.")
+        return
+    except ValueError as e:
+        logger.error(str(e))
         return
 
-    if len(private_keys) != len(proxies):
-        logger.error('Not equal number of proxies and wallets.')
+    if not wallet_count:
+        logger.error("Private keys not found.")
         return
 
-    style = Style.from_dict({
-        'selected': 'bg:#00aaaa #ffffff',
-        'pointer': '#00aaaa bold',
-    })
+    if not proxies:
+        logger.error("Proxies not found.")
+        return
 
-    functions = [
-        ('claim_hype_faucet', 'Claim HYPE Faucet'),
-        # ('get_balances', 'Get token balances'),
-        ('claim_mbtc_faucet', 'Claim MBTC Faucet'),
-        ('supply_mbtc', 'Supply MBTC'),
-        ('supply_eth', 'Supply ETH'),
-        ('supply_hype', 'Supply HYPE'),
-    ]
+    logger.info(f'Imported {wallet_count} wallets')
 
     selected_function = await radiolist_dialog(
         'Select the function to perform:',
-        values=functions,
+        values=FUNCTIONS,
         style=style
     ).run_async()
+    if not selected_function:
+        return
 
-    tasks = []
-
-    for i in range(len(private_keys)):
-        tasks.append(
-            asyncio.create_task(
-                process_wallet(
-                    private_key=private_keys[i],
-                    proxy=proxies[i],
-                    api_key=api_key[0],
-                    semaphore=semaphore,
-                    selected_function=selected_function
-                )
-            ))
-
-    await asyncio.gather(*tasks)
+    await run(
+        wallets=wallets,
+        api_key=api_key[0],
+        selected_function=selected_function,
+        max_concurrent_tasks=max_concurrent_tasks,
+        proxies=None if proxy_mode == 'fixed' else proxies,
+        proxy_mode='sticky' if proxy_mode == 'fixed' else proxy_mode
+    )
 
 
 if __name__ == '__main__':
-    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
     try:
         # Try to get the running event loop
@@ -0,0 +1,79 @@
+"""
+Compares the calldata encoders of 'eth_async.calldata' with the encoding they replaced: 'encodeABI' of a web3 contract
+for approvals and concatenated hex strings for Hyperlend supplies. The outputs are checked to be equal first. The
+encoders also verify address checksums and integer ranges, which the concatenated strings didn't.
+
+Usage:
+    python -m benchmarks.calldata [--number 2000] [--repeat 5]
+"""
+import os
+import sys
+import timeit
+import argparse
+
+from web3 import Web3
+
+from eth_async.calldata import APPROVE, Calldata
+from eth_async.data.models import DefaultABIs
+
+TOKEN = '0x453b63484b11bbF0b61fC7E854f8DAC7bdE7d458'
+POOL = '0x1e85CCDf0D098a9f55b82F3E35013Eda235C8BD8'
+# The data prefixes Hyperlend had before the encoders
+TOKEN_DATA = {
+    'BTC': {'data': '0x617ba037000000000000000000000000453b63484b11bbf0b61fc7e854f8dac7bde7d458'},
+    'ETH': {'data': '0x474cf53d000000000000000000000000e0bdd7e8b7bf5b15dcda6103fcbba82a460ae2c7'},
+}
+
+
+def cases() -> dict[str, tuple]:
+    contract = Web3().eth.contract(address=TOKEN, abi=DefaultABIs.Token)
+    owner = Web3.to_checksum_address('0x' + os.urandom(20).hex())
+    amount = 123_456_789
+    supply = Calldata('supply(address,uint256,address,uint16)').bind(TOKEN)
+    deposit = Calldata('depositETH(address,address,uint16)').bind('0xe0bdd7e8b7bf5b15dcda6103fcbba82a460ae2c7')
+    return {
+        'approve': (
+            lambda: contract.encodeABI('approve', args=(POOL, amount)),
+            lambda: APPROVE.encode_hex(POOL, amount),
+        ),
+        'approve station_max': (
+            lambda: contract.encodeABI('approve', args=(POOL, amount))[:74] + '7' + ('f' * 63),
+            lambda: APPROVE.encode_hex(POOL, 2 ** 255 - 1),
+        ),
+        'supply': (
+            lambda: (f'{TOKEN_DATA.get("BTC", "").get("data", "")}'
+                     f'{amount:064x}'
+                     f'{int(owner, 16):064x}'
+                     f'{0:064x}'),
+            lambda: supply.encode_hex(amount, owner, 0),
+        ),
+        'depositETH': (
+            lambda: (f'{TOKEN_DATA.get("ETH", "").get("data", "")}'
+                     f'{int(owner, 16):064x}'
+                     f'{0:064x}'),
+            lambda: deposit.encode_hex(owner, 0),
+        ),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Calldata encoding benchmark')
+    parser.add_argument('--number', type=int, default=2000, help='encodings per measurement')
+    parser.add_argument('--repeat', type=int, default=5, help='measurements, the best one is reported')
+    args = parser.parse_args()
+
+    print(f'{"call":20} {"before us":>10} {"after us":>9} {"speedup":>8}')
+    for name, (before, after) in cases().items():
+        if before() != after():
+            print(f'{name}: outputs differ\n  {before()}\n  {after()}', file=sys.stderr)
+            return 1
+
+        before_time = min(timeit.repeat(before, number=args.number, repeat=args.repeat)) / args.number
+        after_time = min(timeit.repeat(after, number=args.number, repeat=args.repeat)) / args.number
+        print(f'{name:20} {before_time * 1e6:10.2f} {after_time * 1e6:9.2f} {before_time / after_time:7.1f}x')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
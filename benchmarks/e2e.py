@@ -0,0 +1,242 @@
+"""
+Measures how 'app.process_wallet' scales against the local mock chain: the HYPE faucet, CapMonster and quote APIs are
+redirected to it, and wallets use it as their proxy. Each wallet count runs in a fresh process, so the peak RSS is that
+of the run alone. With '--app' the wallets are run by 'app.run' with its scheduler, with '--processes' they are sharded
+with 'app.run_sharded': latencies are then estimated from the merged histograms, and with processes the peak RSS is that
+of the largest process.
+
+Usage:
+    python -m benchmarks.e2e [--wallets 100 1000 10000 100000] [--concurrency 200] [--function supply_mbtc]
+        [--latency 0.02] [--jitter 0.01] [--failure-rate 0] [--rpc-error-rate 0] [--block-time 0.5]
+        [--max-rate 500] [--processes 1] [--app] [--summary]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from statistics import median
+
+FUNCTIONS = ('claim_hype_faucet', 'claim_mbtc_faucet', 'supply_mbtc', 'supply_eth', 'supply_hype')
+RESULT_PREFIX = 'RESULT '
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def peak_rss_mb(children: bool = False) -> float | None:
+    try:
+        import resource
+    except ImportError:
+        # Windows
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if children:
+        rss = max(rss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+    # Kilobytes on Linux, bytes on macOS
+    return rss / 1024 ** 2 if sys.platform == 'darwin' else rss / 1024
+
+
+def use_mock(url: str, max_rate: float) -> None:
+    from utils import logger
+    from data import config
+    from tasks.base import Base
+    from tasks.hyperlend import Hyperlend
+    from eth_async.data.models import Network, Networks
+    from eth_async.rate_limit import rate_limiters
+
+    Networks.Hyperlend = Network(
+        name='hyperlend', rpc=url, chain_id=998, tx_type=0, coin_symbol='HYPE', decimals=18
+    )
+    Hyperlend.faucet_api_url = f'{url}ethFaucet'
+    Hyperlend.capmonster_url = url.rstrip('/')
+    Base.quote_api_url = f'{url}prod/quote'
+    rate_limiters.configure(max_rate=max_rate)
+    config.JOURNAL_PATH = ':memory:'
+    config.METRICS_PORT = 0
+    logger.remove()
+    logger.add(sys.stderr, level='ERROR', format='{level} | {message}')
+
+
+async def run_wallets(url: str, wallets: int, concurrency: int, function: str) -> dict:
+    from app import process_wallet
+    from eth_async.metrics import metrics
+    from eth_async.transport import transports
+
+    proxy = f'http://bench:bench@{url.split("://")[1].rstrip("/")}'
+    # Wallets are taken by a fixed number of workers, so the latency doesn't include the wait for a slot
+    semaphore = asyncio.Semaphore(concurrency)
+    queue = iter(range(wallets))
+    latencies = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in queue:
+            started = time.perf_counter()
+            try:
+                await process_wallet(
+                    private_key=os.urandom(32).hex(), proxy=proxy, api_key='mock' * 8, semaphore=semaphore,
+                    selected_function=function, check_proxy=False
+                )
+            except Exception:
+                errors += 1
+
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, wallets))))
+    elapsed = time.perf_counter() - started
+    await transports.close()
+    rpc_calls = sum(series['count'] for series in metrics.snapshot() if series['kind'] == 'rpc')
+    return {
+        'wallets': wallets,
+        'elapsed': elapsed,
+        'wallets_per_second': wallets / elapsed,
+        'p50': median(latencies),
+        'p99': percentile(latencies, 0.99),
+        'max': max(latencies),
+        'errors': errors,
+        'failed': sum(
+            value['value'] for value in metrics.values().get('wallets_processed', []) if value['result'] != 'done'
+        ),
+        'rpc_calls': rpc_calls,
+        'peak_rss_mb': peak_rss_mb(),
+        'summary': metrics.summary(),
+    }
+
+
+def run_app(url: str, wallets: int, concurrency: int, function: str, processes: int, max_rate: float) -> dict:
+    import app
+    from eth_async.metrics import metrics
+    from eth_async.transport import transports
+
+    proxy = f'http://bench:bench@{url.split("://")[1].rstrip("/")}'
+    kwargs = {
+        'wallets': [(os.urandom(32).hex(), proxy) for _ in range(wallets)], 'api_key': 'mock' * 8,
+        'selected_function': function, 'max_concurrent_tasks': concurrency, 'verify_proxies': False,
+    }
+    if processes > 1:
+        summary = app.run_sharded(**kwargs, processes=processes, initializer=use_mock, initargs=(url, max_rate))
+    else:
+        async def run() -> dict:
+            try:
+                return await app.run(**kwargs)
+            finally:
+                await transports.close()
+
+        summary = asyncio.run(run())
+
+    wallet = next(series for series in metrics.snapshot() if series['kind'] == 'wallet')
+    return {
+        'wallets': wallets,
+        'elapsed': summary['elapsed'],
+        'wallets_per_second': summary['wallets_per_second'],
+        'p50': wallet['p50'],
+        'p99': wallet['p99'],
+        'max': wallet['max'],
+        'errors': 0,
+        'failed': sum(count for result, count in summary['results'].items() if result != 'done'),
+        'rpc_calls': sum(series['count'] for series in metrics.snapshot() if series['kind'] == 'rpc'),
+        'peak_rss_mb': peak_rss_mb(children=processes > 1),
+        'summary': metrics.summary(),
+    }
+
+
+def run_worker(args: argparse.Namespace) -> int:
+    use_mock(args.url, args.max_rate)
+    if args.app or args.processes > 1:
+        result = run_app(args.url, args.worker, args.concurrency, args.function, args.processes, args.max_rate)
+    else:
+        result = asyncio.run(run_wallets(args.url, args.worker, args.concurrency, args.function))
+
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+    return 0
+
+
+def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+
+            time.sleep(0.1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='End-to-end wallet throughput benchmark')
+    parser.add_argument('--wallets', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--function', choices=FUNCTIONS, default='supply_mbtc')
+    parser.add_argument('--port', type=int, default=18645)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--failure-rate', type=float, default=0.)
+    parser.add_argument('--rpc-error-rate', type=float, default=0.)
+    parser.add_argument('--block-time', type=float, default=0.5)
+    parser.add_argument('--max-rate', type=float, default=500,
+                        help='the maximum rate of the rate limiter of the mock endpoint, in requests per second')
+    parser.add_argument('--processes', type=int, default=1, help='shard the wallets across processes')
+    parser.add_argument('--app', action='store_true',
+                        help="run the wallets with 'app.run' and its scheduler instead of a bare worker loop")
+    parser.add_argument('--summary', action='store_true', help='print request timings of each run')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return run_worker(args)
+
+    mock = subprocess.Popen([
+        sys.executable, '-m', 'benchmarks.mock_chain', '--port', str(args.port), '--latency', str(args.latency),
+        '--jitter', str(args.jitter), '--failure-rate', str(args.failure_rate),
+        '--rpc-error-rate', str(args.rpc_error_rate), '--block-time', str(args.block_time),
+        # The faucet only pays wallets without a balance
+        '--balance', '0' if args.function == 'claim_hype_faucet' else str(10 ** 18),
+    ])
+    url = f'http://127.0.0.1:{args.port}/'
+    try:
+        wait_for_port(args.port)
+        print(f'{"wallets":>8} {"wallets/s":>10} {"p50 s":>8} {"p99 s":>8} {"max s":>8} {"failed":>7} '
+              f'{"rpc calls":>10} {"peak RSS MB":>12}')
+        for wallets in args.wallets:
+            worker = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.e2e', '--worker', str(wallets), '--url', url,
+                 '--concurrency', str(args.concurrency), '--function', args.function, '--max-rate', str(args.max_rate),
+                 '--processes', str(args.processes), *(['--app'] if args.app else [])],
+                stdout=subprocess.PIPE, text=True
+            )
+            lines = [line for line in worker.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+            if worker.returncode or not lines:
+                print(f'{wallets:8} run failed with exit code {worker.returncode}')
+                return 1
+
+            result = json.loads(lines[-1][len(RESULT_PREFIX):])
+            rss = f'{result["peak_rss_mb"]:12.0f}' if result['peak_rss_mb'] is not None else f'{"n/a":>12}'
+            print(
+                f'{wallets:8} {result["wallets_per_second"]:10.1f} {result["p50"]:8.2f} {result["p99"]:8.2f} '
+                f'{result["max"]:8.2f} {result["failed"]:7} {result["rpc_calls"]:10} {rss}'
+            )
+            if args.summary:
+                print(result['summary'])
+
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
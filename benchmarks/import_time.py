@@ -0,0 +1,59 @@
+"""
+Measures how long importing a module takes in a fresh interpreter and checks that the import does no network I/O.
+
+Usage:
+    python -m benchmarks.import_time [--module eth_async.data.models] [--runs 5] [--budget 0.5]
+
+Exits with a non-zero code if the median import time exceeds the budget or the import opens a socket.
+"""
+import sys
+import argparse
+import subprocess
+from statistics import median
+
+
+GUARDED_IMPORT = '''
+import socket, time
+
+def forbidden(*args, **kwargs):
+    raise RuntimeError('network I/O during import')
+
+socket.socket.connect = forbidden
+socket.getaddrinfo = forbidden
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+'''
+
+
+def measure(module: str) -> float:
+    result = subprocess.run(
+        [sys.executable, '-c', GUARDED_IMPORT.format(module=module)], capture_output=True, text=True
+    )
+    if result.returncode:
+        raise RuntimeError(f'Importing {module} failed:\n{result.stderr}')
+
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Import-time benchmark')
+    parser.add_argument('--module', default='eth_async.data.models')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=0.5, help='maximum median import time, in seconds')
+    args = parser.parse_args()
+
+    try:
+        timings = [measure(args.module) for _ in range(args.runs)]
+    except RuntimeError as err:
+        print(err)
+        return 1
+
+    result = median(timings)
+    print(f'import {args.module}: median {result * 1000:.1f} ms, min {min(timings) * 1000:.1f} ms, '
+          f'max {max(timings) * 1000:.1f} ms over {args.runs} runs (budget {args.budget * 1000:.0f} ms)')
+    return 0 if result <= args.budget else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
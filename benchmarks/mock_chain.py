@@ -0,0 +1,373 @@
+"""
+A local stand-in for the Hyperlend testnet: a JSON-RPC node that implements the methods eth_async uses, the HYPE faucet
+API, the CapMonster API and the quote API, with injected latency and failures. Every route is served on one port and
+by path, so the server also works as an HTTP proxy for plain HTTP requests: wallets may point their proxy at it.
+
+Chain state is kept in memory: balances start at '--balance' and are credited by the faucet, sent transactions are
+mined in the next block and always succeed. Senders aren't recovered from signatures unless '--recover-senders' is
+set, since that costs ~15 ms per transaction without coincurve: receipts then have the zero address in 'from' and
+nonces aren't advanced, which eth_async doesn't notice because it tracks nonces locally.
+
+Usage:
+    python -m benchmarks.mock_chain [--port 8545] [--latency 0.02] [--jitter 0.01] [--failure-rate 0]
+        [--rpc-error-rate 0] [--block-time 0.5] [--balance 1000000000000000000] [--captcha-time 0]
+"""
+import sys
+import time
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass, field, fields
+
+import rlp
+from aiohttp import web
+from web3 import Web3
+from eth_abi import encode, decode
+from eth_account import Account
+
+from eth_async.multicall import MULTICALL3_ADDRESS, AGGREGATE3, GET_ETH_BALANCE, BALANCE_OF, ALLOWANCE, DECIMALS, \
+    SYMBOL, NAME
+
+ZERO_ADDRESS = '0x' + '00' * 20
+APPROVE = Web3.keccak(text='approve(address,uint256)')[:4]
+
+
+@dataclass
+class MockConfig:
+    """
+    Settings of the mock chain.
+
+    Attributes:
+        chain_id (int): the chain ID.
+        latency (float): the delay of every HTTP response, in seconds.
+        jitter (float): the maximum random delay added to the latency, in seconds.
+        failure_rate (float): the probability that an HTTP request fails with 502.
+        rpc_error_rate (float): the probability that a JSON-RPC request returns an error.
+        block_time (float): the interval between blocks, in seconds.
+        gas_price (int): the gas price, in wei.
+        gas_estimate (int): the result of 'eth_estimateGas'.
+        balance (int): the initial native balance of every address, in wei.
+        token_balance (int): the initial token balance of every address, in wei.
+        token_decimals (int): the decimals of every token.
+        faucet_amount (int): the amount the faucet sends, in wei.
+        captcha_time (float): how long a captcha takes to solve, in seconds.
+        multicall (bool): whether Multicall3 is deployed.
+        recover_senders (bool): whether senders of transactions are recovered from signatures.
+
+    """
+    chain_id: int = 998
+    latency: float = 0.02
+    jitter: float = 0.01
+    failure_rate: float = 0.
+    rpc_error_rate: float = 0.
+    block_time: float = 0.5
+    gas_price: int = 10 ** 9
+    gas_estimate: int = 150_000
+    balance: int = 10 ** 18
+    token_balance: int = 10 ** 24
+    token_decimals: int = 8
+    faucet_amount: int = 10 ** 17
+    captcha_time: float = 0.
+    multicall: bool = True
+    recover_senders: bool = False
+
+
+@dataclass
+class MockState:
+    started: float = field(default_factory=time.monotonic)
+    balances: dict[str, int] = field(default_factory=dict)
+    allowances: dict[tuple[str, str, str], int] = field(default_factory=dict)
+    nonces: dict[str, int] = field(default_factory=dict)
+    # Transaction hash: (block number, sender, recipient, nonce)
+    txs: dict[str, tuple[int, str, str | None, int]] = field(default_factory=dict)
+    tasks: dict[int, float] = field(default_factory=dict)
+    requests: int = 0
+
+
+class RPCFailure(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class MockChain:
+    """
+    The request handlers of the mock chain.
+
+    Attributes:
+        config (MockConfig): the settings.
+        state (MockState): the chain state.
+
+    """
+    config: MockConfig
+    state: MockState
+
+    def __init__(self, config: MockConfig | None = None) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            config (Optional[MockConfig]): the settings. (the default ones)
+
+        """
+        self.config = config or MockConfig()
+        self.state = MockState()
+
+    @property
+    def block_number(self) -> int:
+        return 1_000_000 + int((time.monotonic() - self.state.started) / self.config.block_time)
+
+    def balance(self, address: str) -> int:
+        return self.state.balances.get(address.lower(), self.config.balance)
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._delay])
+        app.router.add_post('/', self.rpc)
+        app.router.add_post('/ethFaucet', self.faucet)
+        app.router.add_post('/createTask', self.create_task)
+        app.router.add_post('/getTaskResult', self.get_task_result)
+        app.router.add_get('/prod/quote', self.quote)
+        return app
+
+    @web.middleware
+    async def _delay(self, request: web.Request, handler) -> web.StreamResponse:
+        self.state.requests += 1
+        await asyncio.sleep(self.config.latency + random.uniform(0, self.config.jitter))
+        if random.random() < self.config.failure_rate:
+            return web.Response(status=502, text='Bad Gateway')
+
+        return await handler(request)
+
+    async def rpc(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if isinstance(body, list):
+            return web.json_response([self._call(item) for item in body])
+
+        return web.json_response(self._call(body))
+
+    def _call(self, request: dict) -> dict:
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        method = request.get('method')
+        handler = getattr(self, f'_{method}', None)
+        try:
+            if handler is None:
+                raise RPCFailure(-32601, f'the method {method} does not exist/is not available')
+
+            if random.random() < self.config.rpc_error_rate:
+                raise RPCFailure(-32000, 'internal error')
+
+            response['result'] = handler(*request.get('params', []))
+        except RPCFailure as e:
+            response['error'] = {'code': e.code, 'message': e.message}
+
+        return response
+
+    def _eth_chainId(self) -> str:
+        return hex(self.config.chain_id)
+
+    def _eth_blockNumber(self) -> str:
+        return hex(self.block_number)
+
+    def _eth_gasPrice(self) -> str:
+        return hex(self.config.gas_price)
+
+    def _eth_maxPriorityFeePerGas(self) -> str:
+        return hex(self.config.gas_price // 10)
+
+    def _eth_feeHistory(self, block_count: str, newest_block: str, percentiles: list) -> dict:
+        count = int(block_count, 16)
+        base_fee = self.config.gas_price - self.config.gas_price // 10
+        return {
+            'oldestBlock': hex(self.block_number - count + 1),
+            'baseFeePerGas': [hex(base_fee)] * (count + 1),
+            'gasUsedRatio': [0.5] * count,
+            'reward': [[hex(self.config.gas_price // 10)] * len(percentiles)] * count,
+        }
+
+    def _eth_getBlockByNumber(self, block: str, full: bool = False) -> dict:
+        number = self.block_number if block in ('latest', 'pending') else int(block, 16)
+        return {
+            'number': hex(number),
+            'hash': '0x' + Web3.keccak(number.to_bytes(32, 'big')).hex().removeprefix('0x'),
+            'parentHash': '0x' + Web3.keccak((number - 1).to_bytes(32, 'big')).hex().removeprefix('0x'),
+            'timestamp': hex(int(time.time())),
+            'gasLimit': hex(30_000_000),
+            'gasUsed': hex(15_000_000),
+            'baseFeePerGas': hex(self.config.gas_price - self.config.gas_price // 10),
+            'transactions': [],
+        }
+
+    def _eth_getBalance(self, address: str, block: str = 'latest') -> str:
+        return hex(self.balance(address))
+
+    def _eth_getTransactionCount(self, address: str, block: str = 'latest') -> str:
+        return hex(self.state.nonces.get(address.lower(), 0))
+
+    def _eth_getCode(self, address: str, block: str = 'latest') -> str:
+        if self.config.multicall and Web3.to_checksum_address(address) == MULTICALL3_ADDRESS:
+            return '0x6080604052'
+
+        return '0x'
+
+    def _eth_estimateGas(self, tx: dict, block: str = 'latest') -> str:
+        return hex(self.config.gas_estimate)
+
+    def _eth_call(self, tx: dict, block: str = 'latest') -> str:
+        return '0x' + self._execute(tx['to'], bytes.fromhex(tx.get('data', tx.get('input', '0x'))[2:])).hex()
+
+    def _execute(self, to: str, data: bytes) -> bytes:
+        selector = data[:4]
+        if selector == AGGREGATE3 and Web3.to_checksum_address(to) == MULTICALL3_ADDRESS:
+            calls = decode(['(address,bool,bytes)[]'], data[4:])[0]
+            return encode(['(bool,bytes)[]'], [[(True, self._execute(target, call)) for target, _, call in calls]])
+
+        if selector == GET_ETH_BALANCE:
+            return encode(['uint256'], [self.balance(decode(['address'], data[4:])[0])])
+
+        if selector == BALANCE_OF:
+            return encode(['uint256'], [self.config.token_balance])
+
+        if selector == ALLOWANCE:
+            owner, spender = decode(['address', 'address'], data[4:])
+            return encode(['uint256'], [self.state.allowances.get((to.lower(), owner.lower(), spender.lower()), 0)])
+
+        if selector == DECIMALS:
+            return encode(['uint8'], [self.config.token_decimals])
+
+        if selector in (SYMBOL, NAME):
+            return encode(['string'], ['MOCK'])
+
+        return b''
+
+    def _eth_sendRawTransaction(self, raw: str) -> str:
+        raw = bytes.fromhex(raw[2:])
+        tx_hash = '0x' + Web3.keccak(raw).hex().removeprefix('0x')
+        # Legacy transactions are an RLP list, typed ones are prefixed with the type byte
+        if raw[0] >= 0xc0:
+            nonce, _, _, to, _, data = rlp.decode(raw)[:6]
+        elif raw[0] == 2:
+            _, nonce, _, _, _, to, _, data = rlp.decode(raw[1:])[:8]
+        else:
+            _, nonce, _, _, to, _, data = rlp.decode(raw[1:])[:7]
+
+        nonce = int.from_bytes(nonce, 'big')
+        to = Web3.to_checksum_address(to) if to else None
+        sender = ZERO_ADDRESS
+        if self.config.recover_senders:
+            sender = Account.recover_transaction(raw)
+            if nonce < self.state.nonces.get(sender.lower(), 0):
+                raise RPCFailure(-32000, 'nonce too low')
+
+            self.state.nonces[sender.lower()] = nonce + 1
+            if to and data[:4] == APPROVE:
+                spender, amount = decode(['address', 'uint256'], data[4:])
+                self.state.allowances[(to.lower(), sender.lower(), spender.lower())] = amount
+
+        if tx_hash in self.state.txs:
+            raise RPCFailure(-32000, 'already known')
+
+        self.state.txs[tx_hash] = (self.block_number + 1, sender, to, nonce)
+        return tx_hash
+
+    def _eth_getTransactionReceipt(self, tx_hash: str) -> dict | None:
+        tx = self.state.txs.get(tx_hash)
+        if tx is None or tx[0] > self.block_number:
+            return None
+
+        block_number, sender, to, _ = tx
+        return {
+            'transactionHash': tx_hash,
+            'transactionIndex': '0x0',
+            'blockHash': '0x' + Web3.keccak(block_number.to_bytes(32, 'big')).hex().removeprefix('0x'),
+            'blockNumber': hex(block_number),
+            'from': sender,
+            'to': to,
+            'contractAddress': None,
+            'cumulativeGasUsed': hex(self.config.gas_estimate),
+            'gasUsed': hex(self.config.gas_estimate),
+            'effectiveGasPrice': hex(self.config.gas_price),
+            'logs': [],
+            'logsBloom': '0x' + '00' * 256,
+            'status': '0x1',
+            'type': '0x0',
+        }
+
+    async def faucet(self, request: web.Request) -> web.Response:
+        user = (await request.json())['user'].lower()
+        if self.balance(user) > 0:
+            return web.json_response({'response': 'user_already_claimed'})
+
+        self.state.balances[user] = self.config.faucet_amount
+        return web.json_response({'response': {'status': 1}})
+
+    async def create_task(self, request: web.Request) -> web.Response:
+        task_id = len(self.state.tasks) + 1
+        self.state.tasks[task_id] = time.monotonic() + self.config.captcha_time
+        return web.json_response({'errorId': 0, 'taskId': task_id})
+
+    async def get_task_result(self, request: web.Request) -> web.Response:
+        ready_at = self.state.tasks.get((await request.json())['taskId'])
+        if ready_at is None:
+            return web.json_response({'errorId': 1, 'errorCode': 'ERROR_NO_SUCH_CAPCHA_ID'})
+
+        if time.monotonic() < ready_at:
+            return web.json_response({'errorId': 0, 'status': 'processing'})
+
+        token = f'mock-{random.getrandbits(64):x}'
+        return web.json_response({'errorId': 0, 'status': 'ready', 'solution': {'token': token}})
+
+    async def quote(self, request: web.Request) -> web.Response:
+        return web.json_response({'route': [[{'amountOut': request.query.get('amount', '0')}]]})
+
+
+async def start(config: MockConfig | None = None, host: str = '127.0.0.1', port: int = 8545) -> web.AppRunner:
+    """
+    Start the mock chain in the running event loop.
+
+    Args:
+        config (Optional[MockConfig]): the settings. (the default ones)
+        host (str): the host to listen on. ('127.0.0.1')
+        port (int): the port to listen on. (8545)
+
+    Returns:
+        AppRunner: the runner to clean up when done.
+
+    """
+    runner = web.AppRunner(MockChain(config).app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port, backlog=4096).start()
+    return runner
+
+
+async def serve(config: MockConfig, host: str, port: int) -> None:
+    runner = await start(config, host, port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Mock Hyperlend chain')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8545)
+    for config_field in fields(MockConfig):
+        option = f'--{config_field.name.replace("_", "-")}'
+        if config_field.type is bool:
+            parser.add_argument(option, action=argparse.BooleanOptionalAction, default=config_field.default)
+        else:
+            parser.add_argument(option, type=config_field.type, default=config_field.default)
+
+    args = parser.parse_args()
+    config = MockConfig(**{config_field.name: getattr(args, config_field.name) for config_field in fields(MockConfig)})
+    try:
+        asyncio.run(serve(config, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
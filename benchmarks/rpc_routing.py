@@ -0,0 +1,128 @@
+"""
+Measures read latency against local stub RPC servers with injected latency and failures: a single degraded endpoint,
+routing between the degraded endpoint and a steady backup, and the same routing with hedged reads.
+
+Usage:
+    python -m benchmarks.rpc_routing [--requests 2000] [--concurrency 50]
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from statistics import median
+
+from aiohttp import web
+
+from eth_async.data.models import Network
+from eth_async.transport import PooledHTTPProvider
+
+# name: (base latency, tail latency, tail probability, error probability)
+STUBS = {
+    'degraded': (0.01, 1.0, 0.08, 0.05),
+    'backup': (0.04, 0.08, 0.05, 0.),
+}
+
+
+def stub_app(base: float, tail: float, tail_probability: float, error_probability: float) -> web.Application:
+    async def handle(request: web.Request) -> web.Response:
+        body = await request.json()
+        await asyncio.sleep(tail if random.random() < tail_probability else base)
+        if random.random() < error_probability:
+            return web.Response(status=502)
+
+        return web.json_response({'jsonrpc': '2.0', 'id': body['id'], 'result': '0x10'})
+
+    app = web.Application()
+    app.router.add_post('/', handle)
+    return app
+
+
+async def start_stubs() -> tuple[dict[str, str], list[web.AppRunner]]:
+    urls = {}
+    runners = []
+    for port, (name, params) in enumerate(STUBS.items(), start=18545):
+        runner = web.AppRunner(stub_app(*params), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        urls[name] = f'http://127.0.0.1:{port}/'
+        runners.append(runner)
+
+    return urls, runners
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+async def run_scenario(network: Network, requests: int, concurrency: int) -> dict:
+    provider = PooledHTTPProvider(endpoint_uri=network.rpc, router=network.router)
+    payload = json.dumps({'jsonrpc': '2.0', 'id': 0, 'method': 'eth_blockNumber', 'params': []}).encode()
+    latencies = []
+    errors = 0
+    queue = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in queue:
+            started = time.perf_counter()
+            try:
+                await provider.post(payload)
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        'rps': requests / elapsed,
+        'p50': median(latencies),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'max': max(latencies),
+        'errors': errors,
+        'router': network.router.stats(),
+    }
+
+
+async def main_async(requests: int, concurrency: int) -> None:
+    urls, runners = await start_stubs()
+    scenarios = {
+        'single endpoint': Network(name='single', rpc=urls['degraded'], chain_id=1),
+        'routing': Network(name='routing', rpc=[(urls['degraded'], 1), (urls['backup'], 0.5)], chain_id=1),
+        'routing + hedging': Network(
+            name='hedging', rpc=[(urls['degraded'], 1), (urls['backup'], 0.5)], chain_id=1, hedge=True
+        ),
+    }
+    try:
+        for name, network in scenarios.items():
+            result = await run_scenario(network, requests, concurrency)
+            router = result['router']
+            print(
+                f'{name:18} {result["rps"]:8.0f} req/s  p50 {result["p50"] * 1000:6.1f} ms  '
+                f'p95 {result["p95"] * 1000:6.1f} ms  p99 {result["p99"] * 1000:6.1f} ms  '
+                f'max {result["max"] * 1000:6.1f} ms  errors {result["errors"]:4}  '
+                f'failovers {router["failovers"]:4}  hedges {router["hedges"]:4}  hedge wins {router["hedge_wins"]:4}'
+            )
+
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='RPC routing benchmark')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(0)
+    asyncio.run(main_async(args.requests, args.concurrency))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Compares sending transactions with inline signing against the pipeline that signs them in a process pool, on the local
+mock chain. Besides the throughput it reports the event loop lag: how late a 10 ms timer fires while transactions are
+sent, which is what other wallets' network I/O waits for.
+
+Usage:
+    python -m benchmarks.signing [--wallets 200] [--txs 5] [--processes 2 4] [--latency 0.02]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+from statistics import median
+
+from benchmarks.e2e import percentile, wait_for_port
+
+PORT = 18745
+
+
+async def measure_lag(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - started - 0.01)
+
+
+async def run_mode(network, wallets: int, txs: int, processes: int) -> dict:
+    from web3.types import TxParams
+
+    from eth_async.client import Client
+    from eth_async.pipeline import tx_pipeline
+
+    tx_pipeline.configure(processes=processes)
+    await tx_pipeline.warm_up()
+    clients = [Client(private_key=os.urandom(32).hex(), network=network) for _ in range(wallets)]
+
+    async def send_all(client: Client) -> None:
+        for _ in range(txs):
+            await client.transactions.sign_and_send(TxParams(to=client.account.address, value=1, gas=21000))
+
+    lags = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_lag(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(send_all(client) for client in clients))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    tx_pipeline.shutdown()
+    return {
+        'txs_per_second': wallets * txs / elapsed,
+        'lag_p50': median(lags),
+        'lag_p99': percentile(lags, 0.99),
+        'lag_max': max(lags),
+    }
+
+
+async def main_async(wallets: int, txs: int, processes: list[int]) -> None:
+    from eth_async.data.models import Network
+    from eth_async.rate_limit import rate_limiters
+    from eth_async.transport import transports
+
+    rate_limiters.configure(max_rate=100_000)
+    network = Network(name='mock', rpc=f'http://127.0.0.1:{PORT}/', chain_id=998, tx_type=0)
+    print(f'{"mode":22} {"txs/s":>8} {"lag p50 ms":>11} {"lag p99 ms":>11} {"lag max ms":>11}')
+    for mode in [0, *processes]:
+        result = await run_mode(network, wallets, txs, mode)
+        name = 'inline signing' if not mode else f'pipeline, {mode} processes'
+        print(
+            f'{name:22} {result["txs_per_second"]:8.1f} {result["lag_p50"] * 1000:11.1f} '
+            f'{result["lag_p99"] * 1000:11.1f} {result["lag_max"] * 1000:11.1f}'
+        )
+
+    await transports.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Transaction signing benchmark')
+    parser.add_argument('--wallets', type=int, default=200)
+    parser.add_argument('--txs', type=int, default=5, help='transactions per wallet')
+    parser.add_argument('--processes', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+
+    mock = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.mock_chain', '--port', str(PORT), '--latency', str(args.latency)]
+    )
+    try:
+        wait_for_port(PORT)
+        asyncio.run(main_async(args.wallets, args.txs, args.processes))
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Runs a Hyperlend function for all wallets without interactive dialogs, for cron jobs and containers.
+
+Heavy modules (web3, CapMonster, prompt_toolkit) are imported only after the arguments and input files are checked, so
+'--help' and input errors return at once. On Linux and macOS the event loop is uvloop if it's installed. The startup
+time is reported in the summary, the import time of this module can be checked with
+'python -m benchmarks.import_time --module cli --budget 0.1'.
+
+Usage:
+    python cli.py supply_eth [--concurrency 10] [--keys private_keys.txt] [--proxies proxies.txt]
+        [--manifest wallets.csv] [--api-key-file api_key.txt] [--amount 0.0001 0.0005] [--output text|json]
+        [--journal PATH] [--metrics-port PORT] [--no-verify-proxies] [--processes 1]
+        [--sign-processes 0] [--timeout SECONDS] [--retries 0] [--proxy-mode fixed|sticky|rotating]
+        [--per-proxy 5] [--log-level INFO]
+
+The key and proxy files, or the CSV manifest with the 'private_key' and 'proxy' columns, are read lazily, so memory
+use doesn't depend on the number of wallets.
+
+By default ('fixed') the N-th wallet uses the N-th proxy, the files must have as many lines. In the 'sticky' and
+'rotating' modes the proxies are a pool shared by the wallets, any number of wallets can use any number of proxies. A
+proxy that fails too often is quarantined for a cooldown that doubles each time. In the 'sticky' mode a wallet keeps the
+same proxy while it's healthy and has a free slot, in the 'rotating' mode each attempt takes the next free proxy, and
+'--per-proxy' limits the wallets using a proxy at once, in all processes together. In these modes wallets of a
+manifest with a proxy keep it, the rest use the pool.
+
+The first Ctrl-C stops taking new wallets and waits for the wallets in progress, the second one cancels them.
+
+Exits with 1 if any wallet failed, with 2 on invalid arguments or input files, with 130 if the run was stopped.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+started = time.perf_counter()
+
+# The same as the functions in 'app.FUNCTIONS', listed here so that parsing the arguments doesn't import the app
+ACTIONS = ('claim_hype_faucet', 'claim_mbtc_faucet', 'supply_mbtc', 'supply_eth', 'supply_hype')
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Run a Hyperlend function for all wallets')
+    parser.add_argument('action', choices=ACTIONS)
+    parser.add_argument('-c', '--concurrency', type=int, default=10, help='wallets processed at once (10)')
+    parser.add_argument('--keys', default='./private_keys.txt', help='file with private keys, one per line')
+    parser.add_argument('--proxies', default='./proxies.txt', help='file with proxies, one per line')
+    parser.add_argument('--manifest', help="CSV file with the 'private_key' and 'proxy' columns, instead of the files")
+    parser.add_argument('--api-key-file', default='./api_key.txt',
+                        help='file with the CapMonster API key, CAPMONSTER_API_KEY overrides it')
+    parser.add_argument('--amount', type=float, nargs=2, metavar=('MIN', 'MAX'),
+                        help='range of random supply amounts (the default range of the function)')
+    parser.add_argument('--output', choices=('text', 'json'), default='text',
+                        help="'json' prints the run summary as JSON to stdout and logs to stderr")
+    parser.add_argument('--journal', help='run journal path (JOURNAL_PATH)')
+    parser.add_argument('--metrics-port', type=int, help='port of the Prometheus metrics endpoint (METRICS_PORT)')
+    parser.add_argument('--no-verify-proxies', dest='verify_proxies', action='store_false',
+                        help="don't verify proxies before the run")
+    parser.add_argument('-p', '--processes', type=int, default=1,
+                        help='worker processes, each gets a shard of the wallets and of the concurrency (1)')
+    parser.add_argument('--sign-processes', type=int,
+                        help='processes that sign transactions, 0 to sign on the event loop (SIGN_PROCESSES)')
+    parser.add_argument('--timeout', type=float, help='time limit of a wallet attempt in seconds (no limit)')
+    parser.add_argument('--retries', type=int, default=0,
+                        help='times a wallet that raised an error or ran out of time is retried at the end (0)')
+    parser.add_argument('--proxy-mode', choices=('fixed', 'sticky', 'rotating'), default='fixed',
+                        help="how wallets get proxies: one each, the same healthy one or the next free one (fixed)")
+    parser.add_argument('--per-proxy', type=int, default=5,
+                        help='wallets using a proxy of the pool at once, 0 for no limit (5)')
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args(argv)
+
+    if args.concurrency <= 0:
+        parser.error('--concurrency must be positive')
+
+    if args.processes <= 0:
+        parser.error('--processes must be positive')
+
+    if args.timeout is not None and args.timeout <= 0:
+        parser.error('--timeout must be positive')
+
+    if args.retries < 0:
+        parser.error('--retries must not be negative')
+
+    if args.per_proxy < 0:
+        parser.error('--per-proxy must not be negative')
+
+    if args.proxy_mode != 'fixed' and 0 < args.per_proxy < args.processes:
+        parser.error('--per-proxy must be 0 or at least --processes, each process leases the proxies on its own')
+
+    if args.amount and not 0 < args.amount[0] <= args.amount[1]:
+        parser.error('--amount must be 0 < MIN <= MAX')
+
+    return args
+
+
+def setup_logger(output: str, level: str) -> None:
+    from utils import logger
+
+    logger.remove()
+    logger.add(
+        sys.stderr if output == 'json' else sys.stdout,
+        level=level.upper(),
+        format='<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level}</level> | <level>{message}</level>',
+        colorize=output == 'text',
+    )
+
+
+def setup_process(output: str, level: str, journal_path: str, sign_processes: int) -> None:
+    from data import config
+
+    setup_logger(output, level)
+    config.JOURNAL_PATH = journal_path
+    config.SIGN_PROCESSES = sign_processes
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    from utils import logger, load_file, WalletSource
+    from data import config
+
+    setup_logger(args.output, args.log_level)
+
+    def read(path: str, description: str) -> list[str] | None:
+        # 'load_file' prints a missing file to stdout, which is reserved for the JSON summary
+        return load_file(path, description) if os.path.isfile(path) else None
+
+    api_key = os.getenv('CAPMONSTER_API_KEY') or (read(args.api_key_file, 'API-key of Capmonster') or [None])[0]
+    proxies = None
+    if args.proxy_mode != 'fixed':
+        proxies = read(args.proxies, 'proxies')
+        # Wallets of a manifest may all have their own proxies
+        if not proxies and not args.manifest:
+            logger.error(f'Proxies not found in {args.proxies}.')
+            return 2
+
+    if args.manifest:
+        wallets = WalletSource(manifest_path=args.manifest)
+    elif args.proxy_mode == 'fixed':
+        wallets = WalletSource(keys_path=args.keys, proxies_path=args.proxies)
+    else:
+        wallets = WalletSource(keys_path=args.keys)
+
+    try:
+        # Reads the files through once, to fail before the run rather than in the middle of it
+        wallet_count = wallets.count()
+    except FileNotFoundError as e:
+        logger.error(f'File {e.filename} was not found.')
+        return 2
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+
+    if not wallet_count:
+        logger.error(f'Private keys not found in {args.manifest or args.keys}.')
+        return 2
+
+    logger.info(f'Imported {wallet_count} wallets')
+
+    if not api_key and args.action == 'claim_hype_faucet':
+        logger.error('API key from Capmonster was not found.')
+        return 2
+
+    if args.journal:
+        config.JOURNAL_PATH = args.journal
+
+    if args.metrics_port is not None:
+        config.METRICS_PORT = args.metrics_port
+
+    if args.sign_processes is not None:
+        config.SIGN_PROCESSES = args.sign_processes
+
+    import app
+
+    startup = time.perf_counter() - started
+    logger.debug(f'Started in {startup * 1000:.0f} ms')
+    kwargs = {
+        'wallets': wallets,
+        'api_key': api_key,
+        'selected_function': args.action,
+        'max_concurrent_tasks': args.concurrency,
+        'amount_range': tuple(args.amount) if args.amount else None,
+        'verify_proxies': args.verify_proxies,
+        'wallet_timeout': args.timeout,
+        'retries': args.retries,
+        'proxies': proxies,
+        'proxy_mode': 'sticky' if args.proxy_mode == 'fixed' else args.proxy_mode,
+        'max_per_proxy': args.per_proxy,
+    }
+    if args.processes > 1:
+        summary = app.run_sharded(
+            **kwargs, processes=args.processes, initializer=setup_process,
+            initargs=(args.output, args.log_level, config.JOURNAL_PATH, config.SIGN_PROCESSES)
+        )
+    else:
+        summary = app.run_loop(app.run(**kwargs))
+
+    summary['startup'] = round(startup, 3)
+
+    if args.output == 'json':
+        print(json.dumps(summary), flush=True)
+    else:
+        results = ', '.join(f'{result}: {count:g}' for result, count in sorted(summary['results'].items()))
+        logger.info(
+            f"{summary['function']}: {summary['wallets']} wallets in {summary['elapsed']:.1f} s "
+            f"({summary['wallets_per_second']} wallets/s), {results or 'nothing done'}, {summary['retried']} retries"
+            + (', stopped' if summary['stopped'] else '')
+        )
+
+    if summary['stopped']:
+        return 130
+
+    return 1 if summary['results'].get('failed') or summary['results'].get('timed_out') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,4 +13,11 @@ if getattr(sys, 'frozen', False):
 else:
     ROOT_DIR = Path(__file__).parent.parent.absolute()
 
-ABIS_DIR = os.path.join(ROOT_DIR, 'data', 'abis')
\ No newline at end of file
+ABIS_DIR = os.path.join(ROOT_DIR, 'data', 'abis')
+
+# Port of the Prometheus metrics endpoint, it's disabled if the port isn't set
+METRICS_PORT = int(os.getenv('METRICS_PORT') or 0)
+# Path of the run journal, reruns skip wallets it records as completed
+JOURNAL_PATH = os.getenv('JOURNAL_PATH') or os.path.join(ROOT_DIR, 'data', 'journal.sqlite3')
+# Number of processes that sign transactions, they are signed on the event loop if it isn't set
+SIGN_PROCESSES = int(os.getenv('SIGN_PROCESSES') or 0)
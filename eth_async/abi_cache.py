@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import os
+import json
+
+from loguru import logger
+
+from .data import config
+from .utils.files import join_path, read_json
+
+
+class ABICache:
+    """
+    A process-wide cache of parsed ABI files, optionally backed by a single JSON file with all of them, so every ABI
+        file is read and parsed at most once and only when a contract actually needs it. The cache file is plain data,
+        an entry that isn't a valid ABI or is out of date with its source file is ignored.
+
+    Attributes:
+        path (Optional[str]): the path to the JSON cache file, None to keep parsed ABIs in memory only.
+        hits (int): the number of loads served from memory or the cache file.
+        misses (int): the number of loads that parsed the JSON file.
+
+    """
+    path: str | None
+    hits: int
+    misses: int
+
+    def __init__(self, path: str | None = None) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            path (Optional[str]): the path to the JSON cache file, None to keep parsed ABIs in memory only. (None)
+
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._memory: dict[str, list[dict[str, ...]]] = {}
+        self._compiled: dict[str, list] | None = None
+
+    def _load_compiled(self) -> dict[str, list]:
+        if self._compiled is None:
+            self._compiled = {}
+            if self.path and os.path.isfile(self.path):
+                try:
+                    with open(self.path, encoding='utf-8') as f:
+                        compiled = json.load(f)
+                except (OSError, ValueError):
+                    compiled = None
+
+                if isinstance(compiled, dict):
+                    self._compiled = compiled
+
+        return self._compiled
+
+    def _save_compiled(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._compiled, f)
+
+            os.replace(tmp_path, self.path)
+        except OSError as err:
+            logger.warning(f'Failed to save ABI cache: {err}')
+
+    def load(self, path: str | tuple | list) -> list[dict[str, ...]]:
+        """
+        Get the parsed ABI from a JSON file.
+
+        Args:
+            path (Union[str, tuple, list]): the path to the JSON file.
+
+        Returns:
+            List[Dict[str, Any]]: the ABI.
+
+        """
+        path = os.path.abspath(join_path(path))
+        abi = self._memory.get(path)
+        if abi is not None:
+            self.hits += 1
+            return abi
+
+        if not self.path:
+            self.misses += 1
+            abi = self._memory[path] = read_json(path)
+            return abi
+
+        stat = os.stat(path)
+        compiled = self._load_compiled()
+        entry = compiled.get(path)
+        if _is_valid_entry(entry) and entry[:2] == [stat.st_mtime_ns, stat.st_size]:
+            self.hits += 1
+            abi = self._memory[path] = entry[2]
+            return abi
+
+        self.misses += 1
+        abi = self._memory[path] = read_json(path)
+        compiled[path] = [stat.st_mtime_ns, stat.st_size, abi]
+        self._save_compiled()
+        return abi
+
+
+def _is_valid_entry(entry) -> bool:
+    return (
+            isinstance(entry, list) and len(entry) == 3 and isinstance(entry[2], list)
+            and all(isinstance(item, dict) for item in entry[2])
+    )
+
+
+abi_cache = ABICache(path=os.path.join(config.CACHE_DIR, 'abis.json'))
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import json
+import asyncio
+from typing import TYPE_CHECKING, Any, Iterable
+
+import aiohttp
+from web3 import Web3
+from hexbytes import HexBytes
+from eth_typing import ChecksumAddress
+
+from . import exceptions
+from .data import types
+from .data.models import TokenAmount
+
+if TYPE_CHECKING:
+    from .client import Client
+
+
+class BatchReader:
+    """
+    Packs many read requests into JSON-RPC batch arrays.
+
+    Attributes:
+        client (Client): the Client instance whose transport is used.
+        max_batch_size (int): the maximum number of requests in a single batch.
+
+    """
+    client: Client
+    max_batch_size: int
+
+    def __init__(self, client: Client, max_batch_size: int = 100) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            client (Client): the Client instance whose transport is used.
+            max_batch_size (int): the maximum number of requests in a single batch. (100)
+
+        """
+        self.client = client
+        self.max_batch_size = max_batch_size
+
+    async def _send(self, requests: list[tuple[str, list]]) -> list[dict[str, Any]]:
+        provider = self.client.w3.provider
+        payload = json.dumps([
+            {'jsonrpc': '2.0', 'id': i, 'method': method, 'params': params}
+            for i, (method, params) in enumerate(requests)
+        ]).encode()
+        methods = {method for method, _ in requests}
+        raw_response = await provider.post(
+            payload, coalesce_key=payload, method=methods.pop() if len(methods) == 1 else 'batch'
+        )
+        response = json.loads(raw_response)
+        if not isinstance(response, list):
+            raise exceptions.RPCError(error=response.get('error', response), method='batch')
+
+        responses = {item.get('id'): item for item in response}
+        if len(responses) != len(requests):
+            raise exceptions.RPCError(error={'message': 'incomplete batch response'}, method='batch')
+
+        return [responses[i] for i in range(len(requests))]
+
+    async def _execute_chunk(self, requests: list[tuple[str, list]], return_errors: bool) -> list[Any]:
+        try:
+            responses = await self._send(requests)
+        except (exceptions.RPCError, aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            if len(requests) == 1:
+                raise
+
+            middle = len(requests) // 2
+            return (
+                    await self._execute_chunk(requests[:middle], return_errors) +
+                    await self._execute_chunk(requests[middle:], return_errors)
+            )
+
+        results = [response.get('result') for response in responses]
+        failed = [i for i, response in enumerate(responses) if 'error' in response]
+        if failed:
+            if len(requests) == 1:
+                return [self._error(requests[0], responses[0], return_errors)]
+
+            # A failed request is resent once on its own, a request that always fails (e.g. a reverted call) isn't
+            # resent again and again
+            retried = await asyncio.gather(*(self._execute_one(requests[i], return_errors) for i in failed))
+            for i, result in zip(failed, retried):
+                results[i] = result
+
+        return results
+
+    async def _execute_one(self, request: tuple[str, list], return_errors: bool) -> Any:
+        response, = await self._send([request])
+        if 'error' in response:
+            return self._error(request, response, return_errors)
+
+        return response.get('result')
+
+    @staticmethod
+    def _error(request: tuple[str, list], response: dict[str, Any], return_errors: bool) -> exceptions.RPCError:
+        error = exceptions.RPCError(error=response['error'], method=request[0])
+        if return_errors:
+            return error
+
+        raise error
+
+    async def execute(self, requests: Iterable[tuple[str, list]], return_errors: bool = False) -> list[Any]:
+        """
+        Send requests in JSON-RPC batches of at most 'max_batch_size' requests. Batches that fail as a whole are
+            split in halves, requests that fail inside a batch are resent once, each on its own.
+
+        Args:
+            requests (Iterable[Tuple[str, list]]): pairs of a JSON-RPC method and its parameters.
+            return_errors (bool): return an RPCError in place of the result of a failed request instead of
+                raising it. (False)
+
+        Returns:
+            List[Any]: the raw results in the order of the requests.
+
+        """
+        requests = list(requests)
+        chunks = [requests[i:i + self.max_batch_size] for i in range(0, len(requests), self.max_batch_size)]
+        results = await asyncio.gather(*(self._execute_chunk(chunk, return_errors) for chunk in chunks))
+        return [result for chunk_results in results for result in chunk_results]
+
+    async def balances(
+            self, addresses: Iterable[types.Address], decimals: int = 18, block: str | int = 'latest'
+    ) -> dict[ChecksumAddress, TokenAmount]:
+        """
+        Get native coin balances of many addresses.
+
+        Args:
+            addresses (Iterable[Address]): the addresses.
+            decimals (int): the coin decimals. (18)
+            block (Union[str, int]): the block number or tag. ('latest')
+
+        Returns:
+            Dict[ChecksumAddress, TokenAmount]: balances by address.
+
+        """
+        addresses = [Web3.to_checksum_address(address) for address in addresses]
+        block = hex(block) if isinstance(block, int) else block
+        results = await self.execute(('eth_getBalance', [address, block]) for address in addresses)
+        return {
+            address: TokenAmount(amount=int(result, 16), decimals=decimals, wei=True)
+            for address, result in zip(addresses, results)
+        }
+
+    async def nonces(
+            self, addresses: Iterable[types.Address], block: str | int = 'latest'
+    ) -> dict[ChecksumAddress, int]:
+        """
+        Get nonces of many addresses.
+
+        Args:
+            addresses (Iterable[Address]): the addresses.
+            block (Union[str, int]): the block number or tag. ('latest')
+
+        Returns:
+            Dict[ChecksumAddress, int]: nonces by address.
+
+        """
+        addresses = [Web3.to_checksum_address(address) for address in addresses]
+        block = hex(block) if isinstance(block, int) else block
+        results = await self.execute(('eth_getTransactionCount', [address, block]) for address in addresses)
+        return {address: int(result, 16) for address, result in zip(addresses, results)}
+
+    async def calls(
+            self, calls: Iterable[tuple[types.Address, str | bytes]], block: str | int = 'latest'
+    ) -> list[HexBytes]:
+        """
+        Execute many 'eth_call' requests.
+
+        Args:
+            calls (Iterable[Tuple[Address, Union[str, bytes]]]): pairs of a target address and calldata.
+            block (Union[str, int]): the block number or tag. ('latest')
+
+        Returns:
+            List[HexBytes]: the returned data in the order of the calls.
+
+        """
+        block = hex(block) if isinstance(block, int) else block
+        results = await self.execute(
+            ('eth_call', [{'to': Web3.to_checksum_address(to), 'data': HexBytes(data).hex()}, block])
+            for to, data in calls
+        )
+        return [HexBytes(result) for result in results]
+
+    async def token_balances(
+            self, token: types.Contract, addresses: Iterable[types.Address], block: str | int = 'latest'
+    ) -> dict[ChecksumAddress, TokenAmount]:
+        """
+        Get token balances of many addresses.
+
+        Args:
+            token (Contract): the contract address or instance of token.
+            addresses (Iterable[Address]): the addresses.
+            block (Union[str, int]): the block number or tag. ('latest')
+
+        Returns:
+            Dict[ChecksumAddress, TokenAmount]: balances by address.
+
+        """
+        token_address, abi = await self.client.contracts.get_contract_attributes(token)
+        addresses = [Web3.to_checksum_address(address) for address in addresses]
+        selector = Web3.keccak(text='balanceOf(address)')[:4]
+        results = await self.calls(
+            [(token_address, selector + HexBytes(address).rjust(32, b'\0')) for address in addresses], block=block
+        )
+        decimals = await self.client.transactions.get_decimals(contract=token_address)
+        return {
+            address: TokenAmount(amount=int.from_bytes(result, 'big'), decimals=decimals, wei=True)
+            for address, result in zip(addresses, results)
+        }
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+
+from web3 import Web3
+
+from .data import types
+
+UINT256_MAX = 2 ** 256 - 1
+
+_SIGNATURE = re.compile(r'^(\w+)\((.*)\)$')
+_STATIC_TYPE = re.compile(r'^(address|bool|bytes32|uint(\d{1,3})?)$')
+
+
+@lru_cache(maxsize=1024)
+def selector(signature: str) -> bytes:
+    """
+    Get the 4-byte selector of a function.
+
+    Args:
+        signature (str): the function signature without spaces and argument names, e.g. 'approve(address,uint256)'.
+
+    Returns:
+        bytes: the selector.
+
+    """
+    return bytes(Web3.keccak(text=signature)[:4])
+
+
+@lru_cache(maxsize=4096)
+def address_word(address: types.Address) -> bytes:
+    """
+    Get an address left-padded to a 32-byte ABI word. The checksum of mixed-case addresses is verified.
+
+    Args:
+        address (Address): the address.
+
+    Returns:
+        bytes: the ABI word.
+
+    """
+    checksum_address = Web3.to_checksum_address(address)
+    digits = address[2:] if isinstance(address, str) and address.startswith('0x') else address
+    if isinstance(digits, str) and digits != digits.lower() and digits != digits.upper() and \
+            address != checksum_address:
+        raise ValueError(f'Invalid checksum of the address {address}')
+
+    return bytes(12) + bytes.fromhex(checksum_address[2:])
+
+
+class Calldata:
+    """
+    An encoder of calls of a function with static arguments (address, bool, bytes32, uint<N>). The selector and the
+        bound leading arguments are encoded once, each call only writes the rest of the arguments into a buffer of
+        the final size.
+
+    Attributes:
+        signature (str): the function signature, e.g. 'approve(address,uint256)'.
+        types (Tuple[str, ...]): ABI types of the arguments that are left to pass to 'encode'.
+        prefix (bytes): the selector followed by the bound arguments.
+        size (int): the calldata size in bytes.
+
+    """
+    signature: str
+    types: tuple[str, ...]
+    prefix: bytes
+    size: int
+
+    def __init__(
+            self, signature: str, arg_types: tuple[str, ...] | None = None, prefix: bytes | None = None
+    ) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            signature (str): the function signature without spaces and argument names, e.g. 'approve(address,uint256)'.
+            arg_types (Optional[Tuple[str, ...]]): ABI types of the unbound arguments. (parsed from the signature)
+            prefix (Optional[bytes]): the selector followed by the bound arguments. (the selector)
+
+        """
+        match = _SIGNATURE.match(signature)
+        if not match:
+            raise ValueError(f'Invalid function signature: {signature}')
+
+        if arg_types is None:
+            arg_types = tuple(match.group(2).split(',')) if match.group(2) else ()
+            for type_ in arg_types:
+                type_match = _STATIC_TYPE.match(type_)
+                if not type_match or type_match.group(2) and not (
+                        0 < int(type_match.group(2)) <= 256 and int(type_match.group(2)) % 8 == 0):
+                    raise ValueError(f'Unsupported argument type {type_!r} of {signature}')
+
+        self.signature = signature
+        self.types = arg_types
+        self.prefix = prefix if prefix is not None else selector(signature)
+        self.size = len(self.prefix) + 32 * len(arg_types)
+        # The prefix is copied with the zeroed words in one go, booleans and small integers only set a few bytes
+        self._template = self.prefix + bytes(32 * len(arg_types))
+        offsets = range(len(self.prefix), self.size, 32)
+        self._slots = tuple(
+            (start, start + 32, type_, _limit(type_)) for start, type_ in zip(offsets, arg_types)
+        )
+
+    def bind(self, *args) -> Calldata:
+        """
+        Encode the leading arguments once, e.g. the asset of a pool function.
+
+        Args:
+            *args: values of the leading arguments.
+
+        Returns:
+            Calldata: the encoder of the rest of the arguments.
+
+        """
+        if len(args) > len(self.types):
+            raise ValueError(f'{self.signature} takes {len(self.types)} more arguments, {len(args)} given')
+
+        prefix = self.prefix + Calldata(self.signature, self.types[:len(args)], b'').encode(*args)
+        return Calldata(self.signature, self.types[len(args):], prefix)
+
+    def encode(self, *args) -> bytes:
+        """
+        Encode a call.
+
+        Args:
+            *args: values of the unbound arguments: addresses as strings, integers, booleans or 32 bytes.
+
+        Returns:
+            bytes: the calldata.
+
+        """
+        return bytes(self._fill(args))
+
+    def encode_hex(self, *args) -> str:
+        """
+        Encode a call as a '0x'-prefixed hex string, the form 'data' of the transaction parameters has everywhere else.
+        """
+        return '0x' + self._fill(args).hex()
+
+    def _fill(self, args: tuple) -> bytearray:
+        if len(args) != len(self._slots):
+            raise ValueError(f'{self.signature} takes {len(self._slots)} arguments, {len(args)} given')
+
+        buffer = bytearray(self._template)
+        with memoryview(buffer) as view:
+            for (start, end, type_, limit), value in zip(self._slots, args):
+                if limit is not None:
+                    if not isinstance(value, int):
+                        raise ValueError(f'{type_} value must be an integer, got {value!r}')
+
+                    if not 0 <= value < limit:
+                        raise ValueError(f'{value} is out of the {type_} range')
+
+                    view[start:end] = value.to_bytes(32, 'big')
+                elif type_ == 'address':
+                    view[start:end] = address_word(value)
+                elif type_ == 'bool':
+                    buffer[end - 1] = 1 if value else 0
+                elif len(value) == 32:
+                    view[start:end] = value
+                else:
+                    raise ValueError(f'bytes32 value must be 32 bytes long, got {len(value)}')
+
+        return buffer
+
+    def __repr__(self) -> str:
+        return f'Calldata({self.signature!r}, unbound={len(self.types)})'
+
+
+def _limit(type_: str) -> int | None:
+    if not type_.startswith('uint'):
+        return None
+
+    return 2 ** int(type_[4:] or 256)
+
+
+APPROVE = Calldata('approve(address,uint256)')
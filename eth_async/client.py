@@ -1,6 +1,6 @@
 import random
+from functools import cache
 
-import requests
 from web3 import Web3
 from web3.eth import AsyncEth
 from fake_useragent import UserAgent
@@ -8,11 +8,20 @@ from eth_account.signers.local import LocalAccount
 
 from . import exceptions
 from .wallet import Wallet
+from .batch import BatchReader
+from .multicall import Multicall
 from .contracts import Contracts
 from .transactions import Transactions
+from .transport import PooledHTTPProvider
+from .proxies import normalize_proxy, proxy_verifier
 from .data.models import Networks, Network
 
 
+@cache
+def _user_agent() -> UserAgent:
+    return UserAgent()
+
+
 class Client:
     network: Network
     account: LocalAccount | None
@@ -30,24 +39,25 @@ class Client:
             'accept': '*/*',
             'accept-language': 'en-US,en;q=0.9',
             'content-type': 'application/json',
-            'user-agent': UserAgent().chrome
+            'user-agent': _user_agent().chrome
         }
         self.proxy = proxy
         if self.proxy:
-            if 'http' not in self.proxy:
-                self.proxy = f'http://{self.proxy}'
+            self.proxy = normalize_proxy(self.proxy)
 
             if check_proxy:
-                your_ip = requests.get(
-                    'http://eth0.me/', proxies={'http': self.proxy, 'https': self.proxy}, timeout=10
-                ).text.rstrip()
-                if your_ip not in proxy:
-                    raise exceptions.InvalidProxy(f"Proxy doesn't work! Your IP is {your_ip}.")
+                # Proxies verified beforehand with 'verify_proxy' or 'proxy_verifier.verify_many' are only looked up
+                # in the cache, the rest are verified here, blocking as the synchronous check did
+                status = proxy_verifier.verify_blocking(self.proxy)
+                if not status.ok:
+                    raise exceptions.InvalidProxy(f"Proxy doesn't work! {status.error}.")
 
         self.w3 = Web3(
-            provider=Web3.AsyncHTTPProvider(
+            provider=PooledHTTPProvider(
                 endpoint_uri=self.network.rpc,
-                request_kwargs={'proxy': self.proxy, 'headers': self.headers}
+                proxy=self.proxy,
+                headers=self.headers,
+                router=self.network.router
             ),
             modules={'eth': (AsyncEth,)},
             middlewares=[]
@@ -63,3 +73,18 @@ class Client:
         self.wallet = Wallet(self)
         self.contracts = Contracts(self)
         self.transactions = Transactions(self)
+        self.batch = BatchReader(self)
+        self.multicall = Multicall(self)
+
+    async def verify_proxy(self) -> None:
+        """
+        Verify the proxy of the client without blocking the event loop.
+
+        Raises:
+            InvalidProxy: if the proxy doesn't work.
+
+        """
+        if self.proxy:
+            status = await proxy_verifier.verify(self.proxy)
+            if not status.ok:
+                raise exceptions.InvalidProxy(f"Proxy doesn't work! {status.error}.")
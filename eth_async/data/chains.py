@@ -0,0 +1,61 @@
+import os
+import json
+
+from eth_async.data import config
+
+
+CHAINS_URL = 'https://chainid.network/chains.json'
+BUNDLED_CHAINS_PATH = os.path.join(os.path.dirname(__file__), 'chains.json')
+CACHED_CHAINS_PATH = os.path.join(config.CACHE_DIR, 'chains.json')
+
+_chains: dict[str, dict[int, dict]] = {}
+
+
+def _load(path: str) -> dict[int, dict]:
+    if path not in _chains:
+        try:
+            with open(path, encoding='utf-8') as f:
+                _chains[path] = {chain['chainId']: chain for chain in json.load(f)}
+        except (OSError, ValueError, KeyError, TypeError):
+            _chains[path] = {}
+
+    return _chains[path]
+
+
+async def _download() -> dict[int, dict]:
+    import aiohttp
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+        async with session.get(CHAINS_URL) as response:
+            response.raise_for_status()
+            chains = await response.json(content_type=None)
+
+    try:
+        os.makedirs(os.path.dirname(CACHED_CHAINS_PATH), exist_ok=True)
+        with open(CACHED_CHAINS_PATH, 'w', encoding='utf-8') as f:
+            json.dump(chains, f)
+    except OSError:
+        pass
+
+    _chains[CACHED_CHAINS_PATH] = {chain['chainId']: chain for chain in chains}
+    return _chains[CACHED_CHAINS_PATH]
+
+
+async def get_chain_info(chain_id: int) -> dict | None:
+    """
+    Get the chains.json entry of a chain. The entry is looked up in the cached copy of chains.json, then in the
+        bundled one, and chains.json is downloaded only if the chain is in neither of them.
+
+    Args:
+        chain_id (int): the chain ID.
+
+    Returns:
+        Optional[dict]: the chain entry or None if the chain is unknown.
+
+    """
+    for path in (CACHED_CHAINS_PATH, BUNDLED_CHAINS_PATH):
+        chain = _load(path).get(chain_id)
+        if chain:
+            return chain
+
+    return (await _download()).get(chain_id)
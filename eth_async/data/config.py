@@ -1,9 +1,16 @@
 import os
+import sys
+from pathlib import Path
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
+if getattr(sys, 'frozen', False):
+    ROOT_DIR = Path(sys.executable).parent.absolute()
+else:
+    ROOT_DIR = Path(__file__).parent.parent.parent.absolute()
+
 ETHEREUM_API_KEY = str(os.getenv('ETHEREUM_API_KEY'))
 ARBITRUM_API_KEY = str(os.getenv('ARBITRUM_API_KEY'))
 OPTIMISM_API_KEY = str(os.getenv('OPTIMISM_API_KEY'))
@@ -19,3 +26,12 @@ GOERLI_API_KEY = str(os.getenv('GOERLI_API_KEY'))
 SEPOLIA_API_KEY = str(os.getenv('SEPOLIA_API_KEY'))
 LINEA_API_KEY = str(os.getenv('LINEA_API_KEY'))
 BASE_API_KEY = str(os.getenv('BASE_API_KEY'))
+
+CACHE_DIR = os.getenv('ETH_ASYNC_CACHE_DIR') or os.path.join(ROOT_DIR, 'data', 'cache')
+
+# Extra RPC endpoints of Hyperlend, routed to besides the default one: comma-separated URLs, each optionally followed
+# by a space and its routing weight, e.g. 'https://rpc.hyperliquid-testnet.xyz/evm 0.5'
+HYPERLEND_EXTRA_RPCS = [
+    (parts[0], float(parts[1]) if len(parts) > 1 else 1.)
+    for parts in (entry.split() for entry in (os.getenv('HYPERLEND_EXTRA_RPCS') or '').split(',')) if parts
+]
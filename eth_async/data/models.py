@@ -1,15 +1,24 @@
+from __future__ import annotations
+
 import json
 from decimal import Decimal
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Sequence
 
-import requests
-from web3 import Web3
 from eth_typing import ChecksumAddress
+from eth_utils import to_checksum_address
 
 from eth_async import exceptions
 from eth_async.data import config
+from eth_async.data.chains import get_chain_info
 from eth_async.classes import AutoRepr
-from eth_async.blockscan_api import APIFunctions
+from eth_async.abi_cache import abi_cache
+
+if TYPE_CHECKING:
+    from eth_async.gas import GasOracle
+    from eth_async.receipts import ReceiptWatcher
+    from eth_async.routing import EndpointRouter
+    from eth_async.blockscan_api import APIFunctions
 
 
 class TokenAmount:
@@ -117,71 +126,165 @@ class API:
         key (str): an API-key.
         url (str): an API entrypoint URL.
         docs (str): a docs URL.
-        functions (Optional[APIFunctions]): the functions instance.
+        functions (Optional[APIFunctions]): the functions instance, created on first access.
 
     """
     key: str
     url: str
     docs: str | None = None
-    functions: APIFunctions | None = None
+    _functions: APIFunctions | None = field(default=None, repr=False, compare=False)
+
+    def __init__(self, key: str, url: str, docs: str | None = None, functions: APIFunctions | None = None) -> None:
+        self.key = key
+        self.url = url
+        self.docs = docs
+        self._functions = functions
+
+    @property
+    def functions(self) -> APIFunctions | None:
+        if self._functions is None and self.key and self.url:
+            from eth_async.blockscan_api import APIFunctions
+
+            self._functions = APIFunctions(self.key, self.url)
+
+        return self._functions
+
+    @functions.setter
+    def functions(self, functions: APIFunctions | None) -> None:
+        self._functions = functions
 
 
 class Network:
+    """
+    An instance of a network. Creating it does no I/O: the chain ID, coin symbol and decimals that weren't specified
+        are resolved on the first call of 'resolve'.
+
+    Attributes:
+        name (str): a network name.
+        rpc (str): the URL of the first RPC endpoint.
+        endpoints (List[Tuple[str, float]]): URLs and routing weights of all RPC endpoints.
+        hedge (bool): whether slow reads are hedged by a second request to another endpoint.
+        chain_id (Optional[int]): a chain ID.
+        tx_type (int): a transaction type.
+        coin_symbol (Optional[str]): a native coin symbol.
+        explorer (Optional[str]): an explorer URL.
+        decimals (Optional[int]): native coin decimals.
+        api (Optional[API]): the explorer API.
+        gas_oracle (GasOracle): the gas price oracle shared by all clients of the network.
+        receipt_watcher (ReceiptWatcher): the receipt watcher shared by all clients of the network.
+        router (EndpointRouter): the RPC endpoint router shared by all clients of the network.
+
+    """
+
     def __init__(
             self,
             name: str,
-            rpc: str,
+            rpc: str | Sequence[str | tuple[str, float]],
             decimals: int | None = None,
             chain_id: int | None = None,
             tx_type: int = 0,
             coin_symbol: str | None = None,
             explorer: str | None = None,
             api: API | None = None,
+            hedge: bool = False,
     ) -> None:
         self.name: str = name.lower()
-        self.rpc: str = rpc
+        self.endpoints: list[tuple[str, float]] = [
+            (endpoint, 1.) if isinstance(endpoint, str) else (endpoint[0], float(endpoint[1]))
+            for endpoint in ([rpc] if isinstance(rpc, str) else rpc)
+        ]
+        self.rpc: str = self.endpoints[0][0]
+        self.hedge: bool = hedge
         self.chain_id: int | None = chain_id
         self.tx_type: int = tx_type
-        self.coin_symbol: str | None = coin_symbol
+        self.coin_symbol: str | None = coin_symbol.upper() if coin_symbol else coin_symbol
         self.explorer: str | None = explorer
         self.decimals = decimals
         self.api = api
-        # todo: добавить поле decimals
+        self._gas_oracle: GasOracle | None = None
+        self._receipt_watcher: ReceiptWatcher | None = None
+        self._router: EndpointRouter | None = None
+
+    @property
+    def router(self) -> EndpointRouter:
+        """
+        The RPC endpoint router shared by all clients of the network.
+        """
+        if self._router is None:
+            from eth_async.routing import EndpointRouter
+
+            self._router = EndpointRouter(endpoints=self.endpoints, hedge=self.hedge)
+
+        return self._router
+
+    @property
+    def gas_oracle(self) -> GasOracle:
+        """
+        The gas price oracle shared by all clients of the network.
+        """
+        if self._gas_oracle is None:
+            from eth_async.gas import GasOracle
+
+            self._gas_oracle = GasOracle(network=self)
+
+        return self._gas_oracle
+
+    @property
+    def receipt_watcher(self) -> ReceiptWatcher:
+        """
+        The receipt watcher shared by all clients of the network.
+        """
+        if self._receipt_watcher is None:
+            from eth_async.receipts import ReceiptWatcher
+
+            self._receipt_watcher = ReceiptWatcher(network=self)
+
+        return self._receipt_watcher
+
+    @property
+    def resolved(self) -> bool:
+        return bool(self.chain_id and self.coin_symbol and self.decimals)
+
+    async def resolve(self) -> Network:
+        """
+        Get the chain ID from the RPC and the coin symbol and decimals from chains.json if they weren't specified.
+
+        Returns:
+            Network: the network itself.
+
+        """
+        if self.resolved:
+            return self
 
         if not self.chain_id:
             try:
-                self.chain_id = Web3(Web3.HTTPProvider(self.rpc)).eth.chain_id
+                request = {'jsonrpc': '2.0', 'method': 'eth_chainId', 'params': [], 'id': 0}
+                response = json.loads(await self.router.post(
+                    json.dumps(request).encode(), headers={'content-type': 'application/json'}, method='eth_chainId'
+                ))
+                self.chain_id = int(response['result'], 16)
             except Exception as err:
                 raise exceptions.WrongChainID(f'Can not get chain id: {err}')
 
         if not self.coin_symbol or not self.decimals:
             try:
-                network = None
-                networks_info_response = requests.get('https://chainid.network/chains.json').json()
-                for network_ in networks_info_response:
-                    if network_['chainId'] == self.chain_id:
-                        network = network_
-                        break
-
+                network = await get_chain_info(self.chain_id)
                 if not self.coin_symbol:
-                    self.coin_symbol = network['nativeCurrency']['symbol']
+                    self.coin_symbol = network['nativeCurrency']['symbol'].upper()
                 if not self.decimals:
                     self.decimals = int(network['nativeCurrency']['decimals'])
 
             except Exception as err:
                 raise exceptions.WrongCoinSymbol(f'Can not get coin symbol: {err}')
 
-        if self.coin_symbol:
-            self.coin_symbol = self.coin_symbol.upper()
-
-        self.set_api_functions()
+        return self
 
     def set_api_functions(self) -> None:
         """
         Update API functions after API key change.
         """
-        if self.api and self.api.key and self.api.url:
-            self.api.functions = APIFunctions(self.api.key, self.api.url)
+        if self.api:
+            self.api._functions = None
 
 
 class Networks:
@@ -379,7 +482,7 @@ class Networks:
 
     Hyperlend = Network(
         name='hyperlend',
-        rpc='https://rpc-testnet.hyperlend.finance/main/evm/998',
+        rpc=[('https://rpc-testnet.hyperlend.finance/main/evm/998', 1), *config.HYPERLEND_EXTRA_RPCS],
         chain_id=998,
         tx_type=0,
         coin_symbol='HYPE',
@@ -396,13 +499,17 @@ class RawContract(AutoRepr):
         title str: a contract title.
         address (ChecksumAddress): a contract address.
         abi list[dict[str, Any]] | str: an ABI of the contract.
+        abi_path (Optional[Union[str, tuple, list]]): a path to the ABI file, loaded on first access to 'abi'.
 
     """
     title: str
     address: ChecksumAddress
-    abi: list[dict[str, ...]]
+    abi_path: str | tuple | list | None
 
-    def __init__(self, address: str, abi: list[dict[str, ...]] | str | None = None, title: str = '') -> None:
+    def __init__(
+            self, address: str, abi: list[dict[str, ...]] | str | None = None, title: str = '',
+            abi_path: str | tuple | list | None = None
+    ) -> None:
         """
         Initialize the class.
 
@@ -410,11 +517,20 @@ class RawContract(AutoRepr):
             title (str): a contract title.
             address (str): a contract address.
             abi (Union[List[Dict[str, Any]], str]): an ABI of the contract.
+            abi_path (Optional[Union[str, tuple, list]]): a path to the ABI file, used if 'abi' isn't specified.
 
         """
         self.title = title
-        self.address = Web3.to_checksum_address(address)
-        self.abi = json.loads(abi) if isinstance(abi, str) else abi
+        self.address = to_checksum_address(address)
+        self.abi_path = abi_path
+        self._abi = json.loads(abi) if isinstance(abi, str) else abi
+
+    @property
+    def abi(self) -> list[dict[str, ...]] | None:
+        if self._abi is None and self.abi_path:
+            self._abi = abi_cache.load(self.abi_path)
+
+        return self._abi
 
     def __eq__(self, other) -> bool:
         if self.address == other.address and self.abi == other.abi:
@@ -49,3 +49,55 @@ class HTTPException(Exception):
         """
         self.response = response
         self.status_code = status_code
+
+
+class RPCError(ClientException):
+    """
+    An exception that occurs when a JSON-RPC request returns an error.
+
+    Attributes:
+        error (Dict[str, Any]): the 'error' object of the response.
+        method (Optional[str]): the JSON-RPC method.
+
+    """
+    error: dict[str, ...]
+    method: str | None
+
+    def __init__(self, error: dict[str, ...], method: str | None = None) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            error (Dict[str, Any]): the 'error' object of the response.
+            method (Optional[str]): the JSON-RPC method. (None)
+
+        """
+        super().__init__(f'{method}: {error}' if method else str(error))
+        self.error = error
+        self.method = method
+
+
+class RateLimited(ClientException):
+    """
+    An exception that occurs when an endpoint keeps rate limiting a request after all retries.
+
+    Attributes:
+        endpoint (str): the endpoint URL.
+        retry_after (Optional[float]): the last 'Retry-After' value, in seconds.
+
+    """
+    endpoint: str
+    retry_after: float | None
+
+    def __init__(self, endpoint: str, retry_after: float | None = None) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            endpoint (str): the endpoint URL.
+            retry_after (Optional[float]): the last 'Retry-After' value, in seconds. (None)
+
+        """
+        super().__init__(f'{endpoint} is rate limiting requests')
+        self.endpoint = endpoint
+        self.retry_after = retry_after
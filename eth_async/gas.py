@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from . import exceptions
+from .transport import RequestCoalescer
+
+if TYPE_CHECKING:
+    from .client import Client
+    from .data.models import Network
+
+
+@dataclass
+class GasFees:
+    """
+    Fee values of a network at some moment.
+
+    Attributes:
+        gas_price (int): the network gas price in Wei.
+        legacy_gas_price (int): the 'gasPrice' to use in legacy transactions in Wei.
+        base_fee (Optional[int]): the base fee of the latest block in Wei.
+        max_priority_fee (Optional[int]): the 'maxPriorityFeePerGas' to use in EIP-1559 transactions in Wei.
+        max_fee (Optional[int]): the 'maxFeePerGas' to use in EIP-1559 transactions in Wei.
+        block_number (Optional[int]): the number of the latest block.
+        fetched_at (float): the monotonic time of the refresh.
+
+    """
+    gas_price: int
+    legacy_gas_price: int
+    base_fee: int | None
+    max_priority_fee: int | None
+    max_fee: int | None
+    block_number: int | None
+    fetched_at: float
+
+
+class PriorityFeeEstimator:
+    """
+    Estimates the 'maxPriorityFeePerGas' from the reward percentiles of 'eth_feeHistory' over a window of recent
+        blocks. Estimates are cached by the newest block of the window.
+
+    Attributes:
+        block_count (int): the number of blocks in the window.
+        percentile (float): the reward percentile of each block.
+        cache_size (int): the maximum number of cached estimates.
+        requests (int): the number of 'eth_feeHistory' requests.
+        hits (int): the number of estimates served from the cache.
+
+    """
+    block_count: int
+    percentile: float
+    cache_size: int
+    requests: int
+    hits: int
+
+    def __init__(self, block_count: int = 20, percentile: float = 50, cache_size: int = 64) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            block_count (int): the number of blocks in the window. (20)
+            percentile (float): the reward percentile of each block. (50)
+            cache_size (int): the maximum number of cached estimates. (64)
+
+        """
+        self.block_count = block_count
+        self.percentile = percentile
+        self.cache_size = cache_size
+        self.requests = 0
+        self.hits = 0
+        self._estimates: OrderedDict[int, int] = OrderedDict()
+        self._coalescer = RequestCoalescer()
+
+    def request(self, block_number: int | None = None) -> tuple[str, list]:
+        """
+        Get the 'eth_feeHistory' request for a batch.
+
+        Args:
+            block_number (Optional[int]): the newest block of the window. (the latest one)
+
+        Returns:
+            Tuple[str, list]: the method and the params.
+
+        """
+        newest_block = 'latest' if block_number is None else hex(block_number)
+        return 'eth_feeHistory', [hex(self.block_count), newest_block, [self.percentile]]
+
+    def parse(self, fee_history: dict) -> tuple[int, int, int]:
+        """
+        Estimate the priority fee from an 'eth_feeHistory' result and cache the estimate.
+
+        Args:
+            fee_history (dict): the 'eth_feeHistory' result.
+
+        Returns:
+            Tuple[int, int, int]: the newest block number of the window, the base fee of the next block and the
+                priority fee in Wei.
+
+        """
+        self.requests += 1
+        rewards = [int(reward[0], 16) for reward in fee_history.get('reward') or [] if reward]
+        newest_block = int(fee_history['oldestBlock'], 16) + len(fee_history.get('reward') or [None]) - 1
+        base_fees = fee_history.get('baseFeePerGas') or ['0x0']
+        next_base_fee = int(base_fees[-1], 16)
+
+        # Empty blocks report zero rewards and would drag the estimate down
+        rewards = sorted(reward for reward in rewards if reward) or [0]
+        priority_fee = rewards[len(rewards) // 2]
+
+        self._estimates[newest_block] = priority_fee
+        self._estimates.move_to_end(newest_block)
+        while len(self._estimates) > self.cache_size:
+            self._estimates.popitem(last=False)
+
+        return newest_block, next_base_fee, priority_fee
+
+    async def estimate(self, client: Client, block_number: int | None = None) -> int:
+        """
+        Estimate the priority fee. Concurrent estimates of the same window share a single request, a client whose
+            shared request failed, e.g. because of the proxy of another client, sends its own.
+
+        Args:
+            client (Client): the Client instance used for the request.
+            block_number (Optional[int]): the newest block of the window. (the latest block the gas oracle of the
+                network knows, else the latest one)
+
+        Returns:
+            int: the priority fee in Wei.
+
+        """
+        if block_number is None:
+            block_number = client.network.gas_oracle.latest_block()
+
+        if block_number is not None and block_number in self._estimates:
+            self.hits += 1
+            return self._estimates[block_number]
+
+        return await self._coalescer.run(
+            'latest' if block_number is None else block_number,
+            lambda: self._fetch(client, block_number),
+            fallback=lambda: self._fetch(client, block_number)
+        )
+
+    async def _fetch(self, client: Client, block_number: int | None) -> int:
+        fee_history = (await client.batch.execute([self.request(block_number)]))[0]
+        return self.parse(fee_history)[2]
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get the estimator counters.
+
+        Returns:
+            Dict[str, int]: the counters.
+
+        """
+        return {'requests': self.requests, 'hits': self.hits, 'cached_blocks': len(self._estimates)}
+
+
+class GasOracle:
+    """
+    A network-scoped gas price oracle. All clients of the network read the cached fees, which are refreshed at most
+        once per 'ttl' seconds or when a new block is seen.
+
+    Attributes:
+        network (Network): the network.
+        ttl (float): how long fetched fees are served, in seconds.
+        gas_price_multiplier (float): the multiplier of the network gas price for legacy transactions.
+        base_fee_multiplier (float): the multiplier of the base fee in 'maxFeePerGas'.
+        priority_fees (PriorityFeeEstimator): the source of 'maxPriorityFeePerGas' in EIP-1559 transactions.
+        refreshes (int): the number of fee refreshes.
+        hits (int): the number of reads served from the cache.
+        max_staleness (float): the age of the oldest fees that were served, in seconds.
+
+    """
+    network: Network
+    ttl: float
+    gas_price_multiplier: float
+    base_fee_multiplier: float
+    priority_fees: PriorityFeeEstimator
+    refreshes: int
+    hits: int
+    max_staleness: float
+
+    def __init__(
+            self, network: Network, ttl: float = 3, gas_price_multiplier: float = 1.5, base_fee_multiplier: float = 2,
+            priority_fees: PriorityFeeEstimator | None = None
+    ) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            network (Network): the network.
+            ttl (float): how long fetched fees are served, in seconds. (3)
+            gas_price_multiplier (float): the multiplier of the network gas price for legacy transactions. (1.5)
+            base_fee_multiplier (float): the multiplier of the base fee in 'maxFeePerGas'. (2)
+            priority_fees (Optional[PriorityFeeEstimator]): the source of 'maxPriorityFeePerGas'. (a 20-block median)
+
+        """
+        self.network = network
+        self.ttl = ttl
+        self.gas_price_multiplier = gas_price_multiplier
+        self.base_fee_multiplier = base_fee_multiplier
+        self.priority_fees = priority_fees or PriorityFeeEstimator()
+        self.refreshes = 0
+        self.hits = 0
+        self.max_staleness = 0.
+        self._fees: GasFees | None = None
+        self._invalidated = False
+        self._coalescer = RequestCoalescer()
+
+    def is_fresh(self) -> bool:
+        return bool(self._fees) and not self._invalidated and time.monotonic() - self._fees.fetched_at <= self.ttl
+
+    def latest_block(self) -> int | None:
+        """
+        Get the number of the latest block while the cached fees are fresh.
+
+        Returns:
+            Optional[int]: the block number, None if it's unknown or the fees are stale.
+
+        """
+        return self._fees.block_number if self.is_fresh() else None
+
+    def on_new_block(self, block_number: int) -> None:
+        """
+        Invalidate the cached fees if they were fetched before the block.
+
+        Args:
+            block_number (int): the number of the new block.
+
+        """
+        if self._fees and (self._fees.block_number is None or self._fees.block_number < block_number):
+            self._invalidated = True
+
+    async def fees(self, client: Client) -> GasFees:
+        """
+        Get the current fees, refreshing them through the client if the cached ones are stale. Concurrent callers
+            share a single refresh, a caller whose shared refresh failed, e.g. because of the proxy of another client,
+            refreshes them through its own client.
+
+        Args:
+            client (Client): the Client instance used for the refresh.
+
+        Returns:
+            GasFees: the fees.
+
+        """
+        if self.is_fresh():
+            self.hits += 1
+            self.max_staleness = max(self.max_staleness, time.monotonic() - self._fees.fetched_at)
+            return self._fees
+
+        return await self._coalescer.run('fees', lambda: self._refresh(client), fallback=lambda: self._refresh(client))
+
+    async def _refresh(self, client: Client) -> GasFees:
+        requests = [('eth_gasPrice', [])]
+        if self.network.tx_type == 2:
+            requests.append(self.priority_fees.request())
+
+        results = await client.batch.execute(requests, return_errors=True)
+        if isinstance(results[0], exceptions.RPCError):
+            raise results[0]
+
+        gas_price = int(results[0], 16)
+        base_fee = max_priority_fee = max_fee = block_number = None
+        if self.network.tx_type == 2:
+            if not isinstance(results[1], exceptions.RPCError) and results[1]:
+                block_number, base_fee, max_priority_fee = self.priority_fees.parse(results[1])
+            else:
+                block_number, base_fee, max_priority_fee = await self._legacy_priority_fee(client, gas_price)
+
+            max_fee = int(base_fee * self.base_fee_multiplier) + max_priority_fee
+
+        self._fees = GasFees(
+            gas_price=gas_price,
+            legacy_gas_price=int(gas_price * self.gas_price_multiplier),
+            base_fee=base_fee,
+            max_priority_fee=max_priority_fee,
+            max_fee=max_fee,
+            block_number=block_number,
+            fetched_at=time.monotonic()
+        )
+        self._invalidated = False
+        self.refreshes += 1
+        return self._fees
+
+    @staticmethod
+    async def _legacy_priority_fee(client: Client, gas_price: int) -> tuple[int | None, int, int]:
+        # The node doesn't support 'eth_feeHistory'
+        block, priority_fee = await client.batch.execute(
+            [('eth_getBlockByNumber', ['latest', False]), ('eth_maxPriorityFeePerGas', [])], return_errors=True
+        )
+        block_number = None
+        base_fee = 0
+        if not isinstance(block, exceptions.RPCError) and block:
+            block_number = int(block['number'], 16)
+            base_fee = int(block.get('baseFeePerGas') or '0x0', 16)
+
+        if not isinstance(priority_fee, exceptions.RPCError) and priority_fee:
+            return block_number, base_fee, int(priority_fee, 16)
+
+        # Use what is above the base fee in the gas price
+        return block_number, base_fee, max(gas_price - base_fee, 0)
+
+    def stats(self) -> dict[str, float | int | None]:
+        """
+        Get the oracle counters.
+
+        Returns:
+            Dict[str, Union[float, int, None]]: the counters.
+
+        """
+        return {
+            'refreshes': self.refreshes,
+            'hits': self.hits,
+            'age': time.monotonic() - self._fees.fetched_at if self._fees else None,
+            'max_staleness': self.max_staleness,
+        }
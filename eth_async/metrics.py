@@ -0,0 +1,470 @@
+from __future__ import annotations
+
+import time
+import math
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator
+from urllib.parse import urlsplit
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+
+def endpoint_label(url: str | None) -> str | None:
+    """
+    Get the label of an endpoint: its host without the scheme, path and query, which may contain API keys.
+
+    Args:
+        url (Optional[str]): the endpoint URL.
+
+    Returns:
+        Optional[str]: the label.
+
+    """
+    return urlsplit(url).netloc or url if url else None
+
+
+def proxy_label(proxy: str | None) -> str | None:
+    """
+    Get the label of a proxy: its host and port without the credentials.
+
+    Args:
+        proxy (Optional[str]): the proxy URL.
+
+    Returns:
+        Optional[str]: the label.
+
+    """
+    if not proxy:
+        return None
+
+    return proxy.rsplit('@', 1)[-1].split('://')[-1]
+
+
+class Histogram:
+    """
+    A latency histogram with fixed buckets.
+
+    Attributes:
+        buckets (Tuple[float, ...]): upper bounds of the buckets, in seconds.
+        counts (List[int]): the number of observations in each bucket.
+        count (int): the number of observations.
+        errors (int): the number of failed calls.
+        sum (float): the sum of the observations, in seconds.
+        max (float): the largest observation, in seconds.
+
+    """
+    buckets: tuple[float, ...]
+    counts: list[int]
+    count: int
+    errors: int
+    sum: float
+    max: float
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            buckets (Tuple[float, ...]): upper bounds of the buckets, in seconds. (BUCKETS)
+
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.errors = 0
+        self.sum = 0.
+        self.max = 0.
+
+    def observe(self, value: float, error: bool = False) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.errors += error
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def add(self, other: Histogram) -> None:
+        """
+        Add the observations of another histogram with the same buckets.
+        """
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.errors += other.errors
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket it falls into.
+
+        Args:
+            q (float): the quantile, e.g. 0.95.
+
+        Returns:
+            float: the estimate in seconds, at most the largest observation.
+
+        """
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+    def snapshot(self) -> dict[str, ...]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'max': self.max,
+            'buckets': dict(zip(self.buckets, self.counts)),
+        }
+
+
+def _format_labels(labels: dict[str, str | None]) -> str:
+    labels = {
+        key: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        for key, value in labels.items() if value is not None
+    }
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}' if labels else ''
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """
+    Latency histograms of calls by kind ('rpc' or 'http'), name (a JSON-RPC method or a request), endpoint and proxy,
+        and labeled counters and gauges of the application. The Prometheus format merges the histograms over proxies,
+        there may be thousands of them.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            buckets (Tuple[float, ...]): upper bounds of the histogram buckets, in seconds. (BUCKETS)
+
+        """
+        self.buckets = buckets
+        self._series: dict[tuple[str, str, str | None, str | None], Histogram] = {}
+        self._counters: dict[str, dict[tuple[tuple[str, str], ...], float]] = {}
+        self._gauges: dict[str, dict[tuple[tuple[str, str], ...], float | Callable[[], float]]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """
+        Increase a counter.
+
+        Args:
+            name (str): the counter name.
+            value (float): the increment. (1)
+            **labels: the counter labels.
+
+        """
+        series = self._counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def total(self, name: str) -> float:
+        """
+        Get the sum of a counter over all labels.
+
+        Args:
+            name (str): the counter name.
+
+        Returns:
+            float: the sum.
+
+        """
+        return sum(self._counters.get(name, {}).values())
+
+    def set_gauge(self, name: str, value: float | Callable[[], float], **labels: str) -> None:
+        """
+        Set a gauge.
+
+        Args:
+            name (str): the gauge name.
+            value (Union[float, Callable[[], float]]): the value or a function that returns it when metrics are read.
+            **labels: the gauge labels.
+
+        """
+        self._gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    def observe(
+            self, kind: str, name: str, duration: float, error: bool = False, endpoint: str | None = None,
+            proxy: str | None = None
+    ) -> None:
+        """
+        Record a finished call.
+
+        Args:
+            kind (str): the kind of the call, e.g. 'rpc' or 'http'.
+            name (str): the JSON-RPC method or the request name.
+            duration (float): the call duration, in seconds.
+            error (bool): whether the call failed. (False)
+            endpoint (Optional[str]): the endpoint URL. (None)
+            proxy (Optional[str]): the proxy URL. (None)
+
+        """
+        key = (kind, name, endpoint_label(endpoint), proxy_label(proxy))
+        histogram = self._series.get(key)
+        if histogram is None:
+            histogram = self._series[key] = Histogram(self.buckets)
+
+        histogram.observe(duration, error)
+
+    @contextmanager
+    def timer(self, kind: str, name: str, endpoint: str | None = None, proxy: str | None = None) -> Iterator[None]:
+        """
+        Record the duration of the block of code, the call is failed if the block raises.
+
+        Args:
+            kind (str): the kind of the call, e.g. 'rpc' or 'http'.
+            name (str): the JSON-RPC method or the request name.
+            endpoint (Optional[str]): the endpoint URL. (None)
+            proxy (Optional[str]): the proxy URL. (None)
+
+        """
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(kind, name, time.perf_counter() - started, error=error, endpoint=endpoint, proxy=proxy)
+
+    def snapshot(self) -> list[dict[str, ...]]:
+        """
+        Get the current state of all series.
+
+        Returns:
+            List[Dict[str, Any]]: the series with their labels and histogram values.
+
+        """
+        return [
+            {'kind': kind, 'name': name, 'endpoint': endpoint, 'proxy': proxy, **histogram.snapshot()}
+            for (kind, name, endpoint, proxy), histogram in self._series.items()
+        ]
+
+    def values(self) -> dict[str, list[dict[str, ...]]]:
+        """
+        Get the current values of all counters and gauges.
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: the values with their labels by the name.
+
+        """
+        values = {}
+        for name, series in self._counters.items():
+            values[name] = [{**dict(labels), 'value': value} for labels, value in series.items()]
+
+        for name, series in self._gauges.items():
+            values[name] = [
+                {**dict(labels), 'value': value() if callable(value) else value} for labels, value in series.items()
+            ]
+
+        return values
+
+    def prometheus(self, prefix: str = 'eth_async') -> str:
+        """
+        Format all metrics in the Prometheus text exposition format.
+
+        Args:
+            prefix (str): the prefix of the metric names. ('eth_async')
+
+        Returns:
+            str: the metrics.
+
+        """
+        lines = []
+        if self._series:
+            # A series per proxy would make the number of series grow with the number of proxies
+            merged: dict[tuple[str, str, str | None], Histogram] = {}
+            for (kind, name, endpoint, _), histogram in self._series.items():
+                merged.setdefault((kind, name, endpoint), Histogram(self.buckets)).add(histogram)
+
+            histogram_name = f'{prefix}_request_duration_seconds'
+            lines += [
+                f'# HELP {histogram_name} Duration of RPC calls, HTTP calls and wallet tasks.',
+                f'# TYPE {histogram_name} histogram'
+            ]
+            errors = []
+            for (kind, name, endpoint), histogram in merged.items():
+                labels = {'kind': kind, 'name': name, 'endpoint': endpoint}
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    bucket_labels = _format_labels({**labels, 'le': _format_value(bound)})
+                    lines.append(f'{histogram_name}_bucket{bucket_labels} {cumulative}')
+
+                lines.append(f'{histogram_name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}')
+                lines.append(f'{histogram_name}_count{_format_labels(labels)} {histogram.count}')
+                errors.append(f'{prefix}_request_errors_total{_format_labels(labels)} {histogram.errors}')
+
+            lines += [
+                f'# HELP {prefix}_request_errors_total Failed RPC calls, HTTP calls and wallet tasks.',
+                f'# TYPE {prefix}_request_errors_total counter',
+                *errors
+            ]
+
+        for name, series in self._counters.items():
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            for labels, value in series.items():
+                lines.append(f'{prefix}_{name}_total{_format_labels(dict(labels))} {_format_value(value)}')
+
+        for name, series in self._gauges.items():
+            lines.append(f'# TYPE {prefix}_{name} gauge')
+            for labels, value in series.items():
+                value = value() if callable(value) else value
+                lines.append(f'{prefix}_{name}{_format_labels(dict(labels))} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> str:
+        """
+        Format series merged over endpoints and proxies as a table, the slowest in total first.
+
+        Returns:
+            str: the table.
+
+        """
+        merged: dict[tuple[str, str], Histogram] = {}
+        for (kind, name, _, _), histogram in self._series.items():
+            merged.setdefault((kind, name), Histogram(self.buckets)).add(histogram)
+
+        lines = [f'{"kind":8} {"name":40} {"count":>7} {"errors":>7} {"total s":>9} {"p50 ms":>8} {"p95 ms":>8} '
+                 f'{"max ms":>9}']
+        for (kind, name), histogram in sorted(merged.items(), key=lambda item: -item[1].sum):
+            lines.append(
+                f'{kind:8} {name[:40]:40} {histogram.count:7} {histogram.errors:7} {histogram.sum:9.2f} '
+                f'{histogram.quantile(0.5) * 1000:8.0f} {histogram.quantile(0.95) * 1000:8.0f} '
+                f'{histogram.max * 1000:9.0f}'
+            )
+
+        return '\n'.join(lines)
+
+    def export(self) -> dict[str, list]:
+        """
+        Get the raw state of all metrics to merge it into the metrics of another process. Gauges are evaluated.
+
+        Returns:
+            Dict[str, list]: the picklable state.
+
+        """
+        return {
+            'series': [
+                (key, h.buckets, h.counts, h.count, h.errors, h.sum, h.max) for key, h in self._series.items()
+            ],
+            'counters': [
+                (name, labels, value) for name, series in self._counters.items() for labels, value in series.items()
+            ],
+            'gauges': [
+                (name, labels, value() if callable(value) else value)
+                for name, series in self._gauges.items() for labels, value in series.items()
+            ],
+        }
+
+    def merge(self, state: dict[str, list]) -> None:
+        """
+        Add the metrics exported by another process: histograms and counters are added up, gauges are summed with
+            values of other merged processes.
+
+        Args:
+            state (Dict[str, list]): the state returned by 'export'.
+
+        """
+        for key, buckets, counts, count, errors, total, maximum in state['series']:
+            histogram = self._series.get(key)
+            if histogram is None:
+                histogram = self._series[key] = Histogram(tuple(buckets))
+
+            histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+            histogram.count += count
+            histogram.errors += errors
+            histogram.sum += total
+            histogram.max = max(histogram.max, maximum)
+
+        for name, labels, value in state['counters']:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+        for name, labels, value in state['gauges']:
+            series = self._gauges.setdefault(name, {})
+            current = series.get(labels, 0)
+            series[labels] = (current() if callable(current) else current) + value
+
+    def reset(self) -> None:
+        self._series.clear()
+        self._counters.clear()
+        self._gauges.clear()
+
+
+metrics = Metrics()
+
+
+class MetricsServer:
+    """
+    A small HTTP server that serves metrics in the Prometheus text format at '/metrics'. It runs in the event loop it
+        was started in.
+
+    Attributes:
+        registry (Metrics): the metrics to serve.
+        host (str): the host to listen on.
+        port (int): the port to listen on.
+
+    """
+    registry: Metrics
+    host: str
+    port: int
+
+    def __init__(self, registry: Metrics | None = None, host: str = '127.0.0.1', port: int = 9100) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            registry (Optional[Metrics]): the metrics to serve. (the process-wide ones)
+            host (str): the host to listen on. ('127.0.0.1')
+            port (int): the port to listen on. (9100)
+
+        """
+        self.registry = registry or metrics
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self) -> None:
+        """
+        Start serving.
+        """
+        from aiohttp import web
+
+        async def handle(_: web.Request) -> web.Response:
+            return web.Response(text=self.registry.prometheus(), content_type='text/plain', charset='utf-8')
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self) -> None:
+        """
+        Stop serving.
+        """
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
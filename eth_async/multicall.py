@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterable
+
+from web3 import Web3
+from eth_abi import encode, decode
+from hexbytes import HexBytes
+from eth_typing import ChecksumAddress
+
+from . import exceptions
+from .data import types
+from .calldata import address_word
+
+if TYPE_CHECKING:
+    from .client import Client
+
+
+MULTICALL3_ADDRESS = Web3.to_checksum_address('0xcA11bde05977b3631167028862bE2a173976CA11')
+
+AGGREGATE3 = Web3.keccak(text='aggregate3((address,bool,bytes)[])')[:4]
+GET_ETH_BALANCE = Web3.keccak(text='getEthBalance(address)')[:4]
+BALANCE_OF = Web3.keccak(text='balanceOf(address)')[:4]
+ALLOWANCE = Web3.keccak(text='allowance(address,address)')[:4]
+DECIMALS = Web3.keccak(text='decimals()')[:4]
+SYMBOL = Web3.keccak(text='symbol()')[:4]
+NAME = Web3.keccak(text='name()')[:4]
+
+
+@dataclass
+class Call:
+    """
+    A single read executed through Multicall3.
+
+    Attributes:
+        target (ChecksumAddress): the contract address to call.
+        data (bytes): the calldata.
+        output_types (Tuple[str, ...]): ABI types of the returned values. (('uint256',))
+        allow_failure (bool): whether a revert of this call returns None instead of failing the whole batch. (True)
+
+    """
+    target: ChecksumAddress
+    data: bytes
+    output_types: tuple[str, ...] = ('uint256',)
+    allow_failure: bool = True
+
+    def decode(self, return_data: bytes) -> Any:
+        values = decode(self.output_types, return_data)
+        return values[0] if len(values) == 1 else values
+
+
+@dataclass
+class TextCall(Call):
+    """
+    A read of a token symbol or name. Most tokens return a string, some older ones (e.g. MKR) return bytes32, and a
+        result that is neither is decoded as None instead of failing the whole batch.
+    """
+    output_types: tuple[str, ...] = ('string',)
+
+    def decode(self, return_data: bytes) -> str | None:
+        try:
+            return decode(['string'], return_data)[0]
+        except Exception:
+            pass
+
+        if len(return_data) == 32:
+            try:
+                return return_data.rstrip(b'\0').decode() or None
+            except UnicodeDecodeError:
+                pass
+
+        return None
+
+
+class Multicall:
+    """
+    Aggregates many contract reads into one or a few 'eth_call' requests to the Multicall3 contract. On networks
+        without Multicall3 the reads are sent as a JSON-RPC batch instead.
+
+    Attributes:
+        client (Client): the Client instance.
+        address (ChecksumAddress): the Multicall3 contract address.
+        max_calls (int): the maximum number of reads in a single 'eth_call'.
+
+    """
+    client: Client
+    address: ChecksumAddress
+    max_calls: int
+    _deployed: dict[tuple[int, str], bool] = {}
+
+    def __init__(self, client: Client, address: types.Address = MULTICALL3_ADDRESS, max_calls: int = 500) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            client (Client): the Client instance.
+            address (Address): the Multicall3 contract address. (the canonical deployment address)
+            max_calls (int): the maximum number of reads in a single 'eth_call'. (500)
+
+        """
+        self.client = client
+        self.address = Web3.to_checksum_address(address)
+        self.max_calls = max_calls
+
+    def eth_balance(self, owner: types.Address) -> Call:
+        """
+        Get a call returning the native coin balance of the address.
+        """
+        return Call(target=self.address, data=GET_ETH_BALANCE + address_word(owner))
+
+    @staticmethod
+    def balance_of(token: types.Address, owner: types.Address) -> Call:
+        """
+        Get a call returning the token balance of the address.
+        """
+        return Call(target=Web3.to_checksum_address(token), data=BALANCE_OF + address_word(owner))
+
+    @staticmethod
+    def allowance(token: types.Address, owner: types.Address, spender: types.Address) -> Call:
+        """
+        Get a call returning the amount of the token the spender is allowed to spend on behalf of the owner.
+        """
+        return Call(
+            target=Web3.to_checksum_address(token),
+            data=ALLOWANCE + address_word(owner) + address_word(spender)
+        )
+
+    @staticmethod
+    def decimals(token: types.Address) -> Call:
+        """
+        Get a call returning the token decimals.
+        """
+        return Call(target=Web3.to_checksum_address(token), data=DECIMALS)
+
+    @staticmethod
+    def symbol(token: types.Address) -> Call:
+        """
+        Get a call returning the token symbol.
+        """
+        return TextCall(target=Web3.to_checksum_address(token), data=SYMBOL)
+
+    @staticmethod
+    def name(token: types.Address) -> Call:
+        """
+        Get a call returning the token name.
+        """
+        return TextCall(target=Web3.to_checksum_address(token), data=NAME)
+
+    async def is_deployed(self) -> bool:
+        """
+        Check if the Multicall3 contract is deployed on the network of the client. The result is cached per network.
+
+        Returns:
+            bool: True if the contract is deployed.
+
+        """
+        key = ((await self.client.network.resolve()).chain_id, self.address)
+        if key not in self._deployed:
+            self._deployed[key] = len(await self.client.w3.eth.get_code(self.address)) > 0
+
+        return self._deployed[key]
+
+    async def aggregate(self, calls: Iterable[Call], block: str | int = 'latest') -> list[Any]:
+        """
+        Execute the reads and decode their results.
+
+        Args:
+            calls (Iterable[Call]): the reads.
+            block (Union[str, int]): the block number or tag. ('latest')
+
+        Returns:
+            List[Any]: decoded results in the order of the calls, None for failed calls that allow failure.
+
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+
+        if not await self.is_deployed():
+            return await self._aggregate_batch(calls, block=block)
+
+        chunks = [calls[i:i + self.max_calls] for i in range(0, len(calls), self.max_calls)]
+        return_data = await self.client.batch.calls(
+            [(self.address, _encode_aggregate3(chunk)) for chunk in chunks], block=block
+        )
+        results = []
+        for chunk, data in zip(chunks, return_data):
+            for call, (success, call_data) in zip(chunk, decode(['(bool,bytes)[]'], data)[0]):
+                results.append(call.decode(call_data) if success and call_data else None)
+
+        return results
+
+    async def _aggregate_batch(self, calls: list[Call], block: str | int) -> list[Any]:
+        block = hex(block) if isinstance(block, int) else block
+        requests = []
+        for call in calls:
+            if call.target == self.address and call.data[:4] == GET_ETH_BALANCE:
+                requests.append(('eth_getBalance', [Web3.to_checksum_address(call.data[-20:]), block]))
+            else:
+                requests.append(('eth_call', [{'to': call.target, 'data': HexBytes(call.data).hex()}, block]))
+
+        results = []
+        for call, result in zip(calls, await self.client.batch.execute(requests, return_errors=True)):
+            if isinstance(result, exceptions.RPCError):
+                if not call.allow_failure:
+                    raise result
+
+                results.append(None)
+                continue
+
+            data = HexBytes(result)
+            results.append(call.decode(data.rjust(32, b'\0') if len(data) < 32 else data) if data else None)
+
+        return results
+
+
+def _encode_aggregate3(calls: list[Call]) -> bytes:
+    return AGGREGATE3 + encode(
+        ['(address,bool,bytes)[]'], [[(call.target, call.allow_failure, call.data) for call in calls]]
+    )
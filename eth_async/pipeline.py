@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+from hexbytes import HexBytes
+from web3.types import TxParams
+
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    from .client import Client
+
+
+def sign_serialized(tx_params: dict[str, Any], private_key: bytes) -> tuple[bytes, bytes]:
+    """
+    Sign a transaction in a worker process, only the parameters and the key are sent to it.
+
+    Args:
+        tx_params (Dict[str, Any]): parameters of the transaction with all values filled.
+        private_key (bytes): the private key.
+
+    Returns:
+        Tuple[bytes, bytes]: the raw signed transaction and its hash.
+
+    """
+    from eth_account import Account
+
+    signed = Account.sign_transaction(tx_params, private_key)
+    return bytes(signed.rawTransaction), bytes(signed.hash)
+
+
+class Stage:
+    """
+    A stage of the transaction pipeline: at most 'concurrency' items are processed at once, and at most 'queue_size'
+        more wait for a slot, the rest wait to enter the queue, which holds back earlier stages.
+
+    Attributes:
+        name (str): the stage name, a label of its metrics.
+        concurrency (int): the maximum number of items processed at once.
+        queue_size (int): the maximum number of items waiting for a slot.
+        queued (int): the number of items waiting for a slot.
+        in_flight (int): the number of items being processed.
+        processed (int): the number of processed items.
+
+    """
+    name: str
+    concurrency: int
+    queue_size: int
+    queued: int
+    in_flight: int
+    processed: int
+
+    def __init__(self, name: str, concurrency: int, queue_size: int) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            name (str): the stage name, a label of its metrics.
+            concurrency (int): the maximum number of items processed at once.
+            queue_size (int): the maximum number of items waiting for a slot.
+
+        """
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queued = 0
+        self.in_flight = 0
+        self.processed = 0
+        self._slots: asyncio.Semaphore | None = None
+        self._admission: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        metrics.set_gauge('pipeline_queue_depth', lambda: self.queued, stage=name)
+        metrics.set_gauge('pipeline_in_flight', lambda: self.in_flight, stage=name)
+
+    async def run(self, function: Callable[..., Awaitable[Any]], *args) -> Any:
+        """
+        Process an item.
+
+        Args:
+            function (Callable[..., Awaitable[Any]]): the coroutine function that processes the item.
+            *args: its arguments.
+
+        Returns:
+            Any: its result.
+
+        """
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._admission = asyncio.Semaphore(self.concurrency + self.queue_size)
+            self._loop = loop
+
+        async with self._admission:
+            self.queued += 1
+            queued_at = time.perf_counter()
+            try:
+                await self._slots.acquire()
+            finally:
+                self.queued -= 1
+
+            started = time.perf_counter()
+            metrics.observe('pipeline', f'{self.name} wait', started - queued_at)
+            self.in_flight += 1
+            error = False
+            try:
+                return await function(*args)
+            except BaseException:
+                error = True
+                raise
+            finally:
+                self.in_flight -= 1
+                self.processed += 1
+                self._slots.release()
+                metrics.observe('pipeline', self.name, time.perf_counter() - started, error=error)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'queued': self.queued,
+            'in_flight': self.in_flight,
+            'processed': self.processed,
+        }
+
+
+class TxPipeline:
+    """
+    Sends transactions in three stages with their own limits: parameters are filled on the event loop, transactions
+        are signed in a process pool if 'processes' is set, and broadcast through the pooled transport of the client.
+        Without processes transactions are signed inline, as before.
+
+    Parameters are filled per transaction rather than in JSON-RPC batches: wallets use different proxies, so their
+        calls can't share a batch, and the fee requests of the gas oracle and the nonces of the nonce manager are
+        already shared, so concurrent fills only estimate gas on their own.
+
+    Attributes:
+        processes (int): the number of signing processes, 0 to sign on the event loop.
+        fill (Stage): the stage that fills the nonce, fees and gas.
+        sign (Stage): the signing stage.
+        broadcast (Stage): the stage that sends signed transactions.
+
+    """
+    processes: int
+    fill: Stage
+    sign: Stage
+    broadcast: Stage
+
+    def __init__(
+            self, processes: int = 0, fill_concurrency: int = 1000, sign_concurrency: int | None = None,
+            broadcast_concurrency: int = 1000, queue_size: int = 10_000
+    ) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            processes (int): the number of signing processes, 0 to sign on the event loop. (0)
+            fill_concurrency (int): the maximum number of transactions whose parameters are filled at once. (1000)
+            sign_concurrency (Optional[int]): the maximum number of transactions signed at once. (twice the
+                processes, so each process has the next transaction ready)
+            broadcast_concurrency (int): the maximum number of transactions sent at once. (1000)
+            queue_size (int): the maximum number of transactions waiting in each stage. (10000)
+
+        """
+        self.processes = processes
+        self.fill = Stage('fill', fill_concurrency, queue_size)
+        self.sign = Stage('sign', sign_concurrency or max(processes * 2, 1), queue_size)
+        self.broadcast = Stage('broadcast', broadcast_concurrency, queue_size)
+        self._executor: ProcessPoolExecutor | None = None
+
+    def configure(self, processes: int | None = None, **limits: int) -> None:
+        """
+        Change the number of signing processes or the limits of stages before sending transactions. The process pool is
+            recreated on the next transaction.
+
+        Args:
+            processes (Optional[int]): the number of signing processes. (unchanged)
+            **limits: 'fill_concurrency', 'sign_concurrency', 'broadcast_concurrency' or 'queue_size'.
+
+        """
+        if processes is not None:
+            self.processes = processes
+            self.shutdown()
+            if 'sign_concurrency' not in limits:
+                self.sign.concurrency = max(processes * 2, 1)
+                self.sign._slots = None
+
+        for key, value in limits.items():
+            stage, _, setting = key.partition('_')
+            if key == 'queue_size':
+                for each in (self.fill, self.sign, self.broadcast):
+                    each.queue_size = value
+                    each._slots = None
+            elif stage in ('fill', 'sign', 'broadcast') and setting == 'concurrency':
+                getattr(self, stage).concurrency = value
+                getattr(self, stage)._slots = None
+            else:
+                raise ValueError(f'Unknown pipeline setting: {key}')
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned processes don't inherit the event loop, sessions and locks of this one
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context('spawn')
+            )
+
+        return self._executor
+
+    async def warm_up(self) -> None:
+        """
+        Start the signing processes and import the signing code in them, so the first transactions don't wait for it.
+        """
+        if not self.processes:
+            return
+
+        loop = asyncio.get_running_loop()
+        params = {'to': '0x' + '00' * 20, 'value': 0, 'gas': 21000, 'gasPrice': 0, 'nonce': 0, 'chainId': 1}
+        await asyncio.gather(*(
+            loop.run_in_executor(self.executor, sign_serialized, params, b'\x01' * 32) for _ in range(self.processes)
+        ))
+
+    async def _sign(self, client: Client, tx_params: TxParams) -> tuple[bytes, bytes]:
+        if not self.processes:
+            signed = await client.transactions.sign_transaction(tx_params)
+            return signed.rawTransaction, signed.hash
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, sign_serialized, dict(tx_params), bytes(client.account.key)
+        )
+
+    async def prepare(self, client: Client, tx_params: TxParams) -> bytes:
+        """
+        Fill the missing parameters of a transaction in place and sign it.
+
+        Args:
+            client (Client): the Client instance.
+            tx_params (TxParams): parameters of the transaction.
+
+        Returns:
+            bytes: the raw signed transaction.
+
+        """
+        await self.fill.run(client.transactions.auto_add_params, tx_params)
+        raw_tx, _ = await self.sign.run(self._sign, client, tx_params)
+        return raw_tx
+
+    async def submit(self, client: Client, raw_tx: bytes) -> HexBytes:
+        """
+        Send a signed transaction.
+
+        Args:
+            client (Client): the Client instance.
+            raw_tx (bytes): the raw signed transaction.
+
+        Returns:
+            HexBytes: the transaction hash.
+
+        """
+        return await self.broadcast.run(client.w3.eth.send_raw_transaction, raw_tx)
+
+    async def send(self, client: Client, tx_params: TxParams) -> HexBytes:
+        """
+        Fill the missing parameters of a transaction in place, sign and send it.
+
+        Args:
+            client (Client): the Client instance.
+            tx_params (TxParams): parameters of the transaction.
+
+        Returns:
+            HexBytes: the transaction hash.
+
+        """
+        return await self.submit(client, await self.prepare(client, tx_params))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        Get the counters of all stages.
+
+        Returns:
+            Dict[str, Dict[str, int]]: the counters by the stage.
+
+        """
+        return {stage.name: stage.stats() for stage in (self.fill, self.sign, self.broadcast)}
+
+
+tx_pipeline = TxPipeline()
@@ -0,0 +1,539 @@
+from __future__ import annotations
+
+import time
+import zlib
+import asyncio
+from dataclasses import dataclass
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Literal
+
+import aiohttp
+from loguru import logger
+
+from .metrics import metrics, proxy_label
+
+
+def normalize_proxy(proxy: str) -> str:
+    """
+    Add the 'http://' scheme to a proxy string if it has none.
+
+    Args:
+        proxy (str): the proxy string, e.g. 'username:password@server:port'.
+
+    Returns:
+        str: the proxy URL.
+
+    """
+    if 'http' not in proxy:
+        return f'http://{proxy}'
+
+    return proxy
+
+
+@dataclass
+class ProxyStatus:
+    """
+    The result of a proxy verification.
+
+    Attributes:
+        ok (bool): whether the proxy works.
+        ip (Optional[str]): the IP address seen by the "what is my IP" endpoint.
+        checked_at (float): the monotonic time of the verification.
+        error (Optional[str]): the reason of the failure.
+
+    """
+    ok: bool
+    ip: str | None
+    checked_at: float
+    error: str | None = None
+
+
+class ProxyVerifier:
+    """
+    Verifies proxies asynchronously and caches the results for 'ttl' seconds.
+
+    Attributes:
+        ip_endpoint (Union[str, Callable[[str], Awaitable[str]]]): the "what is my IP" URL that returns the IP as
+            plain text, or a coroutine function that takes a proxy and returns the IP seen through it.
+        ttl (float): how long a verification result stays valid, in seconds.
+        timeout (float): the timeout of a single verification, in seconds.
+        concurrency (int): the maximum number of simultaneous verifications.
+
+    """
+    ip_endpoint: str | Callable[[str], Awaitable[str]]
+    ttl: float
+    timeout: float
+    concurrency: int
+
+    def __init__(
+            self, ip_endpoint: str | Callable[[str], Awaitable[str]] = 'http://eth0.me/', ttl: float = 600,
+            timeout: float = 10, concurrency: int = 100
+    ) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            ip_endpoint (Union[str, Callable[[str], Awaitable[str]]]): the "what is my IP" URL or coroutine function.
+                ('http://eth0.me/')
+            ttl (float): how long a verification result stays valid, in seconds. (600)
+            timeout (float): the timeout of a single verification, in seconds. (10)
+            concurrency (int): the maximum number of simultaneous verifications. (100)
+
+        """
+        self.ip_endpoint = ip_endpoint
+        self.ttl = ttl
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self._statuses: dict[str, ProxyStatus] = {}
+        self._pending: dict[str, asyncio.Future] = {}
+
+    def cached(self, proxy: str) -> ProxyStatus | None:
+        """
+        Get the cached verification result of the proxy without any I/O.
+
+        Args:
+            proxy (str): the proxy.
+
+        Returns:
+            Optional[ProxyStatus]: the result or None if the proxy wasn't verified or the result has expired.
+
+        """
+        status = self._statuses.get(normalize_proxy(proxy))
+        if status and time.monotonic() - status.checked_at <= self.ttl:
+            return status
+
+        return None
+
+    async def _get_ip(self, proxy: str, session: aiohttp.ClientSession) -> str:
+        if callable(self.ip_endpoint):
+            return await self.ip_endpoint(proxy)
+
+        async with session.get(self.ip_endpoint, proxy=proxy) as response:
+            response.raise_for_status()
+            return (await response.text()).strip()
+
+    async def _verify(self, proxy: str, session: aiohttp.ClientSession) -> ProxyStatus:
+        try:
+            ip = await asyncio.wait_for(self._get_ip(proxy, session), timeout=self.timeout)
+        except Exception as err:
+            return ProxyStatus(ok=False, ip=None, checked_at=time.monotonic(), error=str(err) or type(err).__name__)
+
+        if ip not in proxy:
+            return ProxyStatus(ok=False, ip=ip, checked_at=time.monotonic(), error=f'Your IP is {ip}')
+
+        return ProxyStatus(ok=True, ip=ip, checked_at=time.monotonic())
+
+    async def verify(self, proxy: str, force: bool = False) -> ProxyStatus:
+        """
+        Verify the proxy by requesting the "what is my IP" endpoint through it. Concurrent verifications of a proxy
+            share one request, so wallets that use the same proxy can verify it as they start.
+
+        Args:
+            proxy (str): the proxy.
+            force (bool): verify the proxy even if there is a valid cached result. (False)
+
+        Returns:
+            ProxyStatus: the result.
+
+        """
+        proxy = normalize_proxy(proxy)
+        if not force:
+            status = self.cached(proxy)
+            if status:
+                return status
+
+        pending = self._pending.get(proxy)
+        if pending is None or force:
+            pending = asyncio.ensure_future(self.verify_many([proxy], force=force))
+            self._pending[proxy] = pending
+            pending.add_done_callback(
+                lambda future: self._pending.pop(proxy) if self._pending.get(proxy) is future else None
+            )
+
+        # A cancelled waiter doesn't cancel the verification the others wait for
+        return (await asyncio.shield(pending))[proxy]
+
+    def verify_blocking(self, proxy: str) -> ProxyStatus:
+        """
+        Verify the proxy from synchronous code unless there is a valid cached result, blocking until the result is
+            known. The verification runs in its own event loop in a thread, so it works inside a running loop too.
+
+        Args:
+            proxy (str): the proxy.
+
+        Returns:
+            ProxyStatus: the result.
+
+        """
+        proxy = normalize_proxy(proxy)
+        status = self.cached(proxy)
+        if status:
+            return status
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.verify_many([proxy])).result()[proxy]
+
+    async def verify_many(self, proxies: Iterable[str], force: bool = False) -> dict[str, ProxyStatus]:
+        """
+        Verify many proxies concurrently.
+
+        Args:
+            proxies (Iterable[str]): the proxies.
+            force (bool): verify proxies even if there are valid cached results. (False)
+
+        Returns:
+            Dict[str, ProxyStatus]: results by the proxy URL.
+
+        """
+        proxies = list(dict.fromkeys(normalize_proxy(proxy) for proxy in proxies))
+        results = {}
+        to_verify = []
+        for proxy in proxies:
+            status = None if force else self.cached(proxy)
+            if status:
+                results[proxy] = status
+            else:
+                to_verify.append(proxy)
+
+        if to_verify:
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def verify_one(proxy_: str, session_: aiohttp.ClientSession) -> None:
+                async with semaphore:
+                    self._statuses[proxy_] = results[proxy_] = await self._verify(proxy_, session_)
+
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+                await asyncio.gather(*(verify_one(proxy, session) for proxy in to_verify))
+
+        return results
+
+
+proxy_verifier = ProxyVerifier()
+
+
+@dataclass
+class ProxyHealth:
+    """
+    The health of a proxy in a pool.
+
+    Attributes:
+        proxy (str): the proxy URL.
+        in_use (int): the number of leases of the proxy.
+        latency (Optional[float]): the moving average of the request duration, in seconds.
+        failure_rate (float): the moving average of failures, from 0 to 1.
+        requests (int): the number of requests through the proxy.
+        failures (int): the number of requests that got no response.
+        consecutive_failures (int): the number of failures since the last response.
+        strikes (int): the number of quarantines since the proxy was last healthy, the cooldown doubles with each one.
+        quarantined_until (float): the monotonic time the quarantine ends.
+        reason (Optional[str]): the reason of the last quarantine.
+
+    """
+    proxy: str
+    in_use: int = 0
+    latency: float | None = None
+    failure_rate: float = 0.
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    strikes: int = 0
+    quarantined_until: float = 0.
+    reason: str | None = None
+
+
+class ProxyPool:
+    """
+    Assigns proxies of a pool to wallets, so any number of wallets can share any number of proxies. The pool tracks
+        the latency and the failure rate of every proxy from the requests sent through it, and puts a proxy that fails
+        into quarantine, each time for twice as long, until it's healthy again. A proxy is leased to at most
+        'max_per_proxy' wallets at once, a wallet waits only if no proxy has a free slot.
+
+    Modes:
+        - 'sticky': a wallet always gets the same proxy, picked by the hash of its key, unless the proxy is
+            quarantined or has no free slot, then the next healthy proxy of the pool with a free slot.
+        - 'rotating': a wallet gets the next proxy with a free slot in turn.
+
+    Attributes:
+        mode (str): 'sticky' or 'rotating'.
+        max_per_proxy (int): the maximum number of leases of a proxy at once, 0 for no limit.
+        failure_threshold (float): the failure rate at which a proxy is quarantined.
+        max_consecutive_failures (int): the number of failures in a row at which a proxy is quarantined.
+        min_requests (int): the number of requests a proxy needs before its failure rate is trusted.
+        cooldown (float): the first quarantine of a proxy, in seconds.
+        max_cooldown (float): the longest quarantine, in seconds.
+        smoothing (float): the weight of the latest request in the moving averages.
+        verify (bool): whether a proxy is verified with the proxy verifier before it's leased for the first time.
+
+    """
+    mode: Literal['sticky', 'rotating']
+    max_per_proxy: int
+    failure_threshold: float
+    max_consecutive_failures: int
+    min_requests: int
+    cooldown: float
+    max_cooldown: float
+    smoothing: float
+    verify: bool
+
+    def __init__(
+            self, proxies: Iterable[str] = (), mode: Literal['sticky', 'rotating'] = 'sticky', max_per_proxy: int = 5,
+            failure_threshold: float = 0.5, max_consecutive_failures: int = 3, min_requests: int = 5,
+            cooldown: float = 30, max_cooldown: float = 900, smoothing: float = 0.2, verify: bool = False,
+            verifier: ProxyVerifier | None = None
+    ) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            proxies (Iterable[str]): the proxies. (none)
+            mode (str): 'sticky' or 'rotating'. ('sticky')
+            max_per_proxy (int): the maximum number of leases of a proxy at once, 0 for no limit. (5)
+            failure_threshold (float): the failure rate at which a proxy is quarantined. (0.5)
+            max_consecutive_failures (int): the number of failures in a row at which a proxy is quarantined. (3)
+            min_requests (int): the number of requests a proxy needs before its failure rate is trusted. (5)
+            cooldown (float): the first quarantine of a proxy, in seconds. (30)
+            max_cooldown (float): the longest quarantine, in seconds. (900)
+            smoothing (float): the weight of the latest request in the moving averages. (0.2)
+            verify (bool): whether a proxy is verified before it's leased for the first time. (False)
+            verifier (Optional[ProxyVerifier]): the proxy verifier. (the process-wide one)
+
+        """
+        self.mode = mode
+        self.max_per_proxy = max_per_proxy
+        self.failure_threshold = failure_threshold
+        self.max_consecutive_failures = max_consecutive_failures
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.smoothing = smoothing
+        self.verify = verify
+        self.verifier = verifier or proxy_verifier
+        self._proxies: list[ProxyHealth] = []
+        self._health: dict[str, ProxyHealth] = {}
+        self._next = 0
+        self._changed: asyncio.Condition | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.set_proxies(proxies)
+        metrics.set_gauge('proxy_pool_size', lambda: len(self._proxies))
+        metrics.set_gauge('proxy_pool_quarantined', lambda: self.quarantined())
+        metrics.set_gauge('proxy_pool_in_use', lambda: sum(health.in_use for health in self._proxies))
+
+    def configure(self, proxies: Iterable[str] | None = None, **settings) -> None:
+        """
+        Change the proxies or the settings of the pool before a run.
+
+        Args:
+            proxies (Optional[Iterable[str]]): the proxies, the health of the ones already in the pool is kept.
+                (unchanged)
+            **settings: 'mode', 'max_per_proxy', 'failure_threshold', 'max_consecutive_failures', 'min_requests',
+                'cooldown', 'max_cooldown', 'smoothing' or 'verify'.
+
+        """
+        for key, value in settings.items():
+            if key not in ProxyPool.__annotations__:
+                raise ValueError(f'Unknown proxy pool setting: {key}')
+
+            setattr(self, key, value)
+
+        if self.mode not in ('sticky', 'rotating'):
+            raise ValueError(f'Unknown proxy pool mode: {self.mode}')
+
+        if proxies is not None:
+            self.set_proxies(proxies)
+
+    def set_proxies(self, proxies: Iterable[str]) -> None:
+        proxies = list(dict.fromkeys(normalize_proxy(proxy) for proxy in proxies))
+        self._proxies = [self._health.get(proxy) or ProxyHealth(proxy=proxy) for proxy in proxies]
+        self._health = {health.proxy: health for health in self._proxies}
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self._proxies)
+
+    def __contains__(self, proxy: str) -> bool:
+        return normalize_proxy(proxy) in self._health
+
+    def health(self, proxy: str) -> ProxyHealth | None:
+        return self._health.get(normalize_proxy(proxy))
+
+    def quarantined(self, now: float | None = None) -> int:
+        now = time.monotonic() if now is None else now
+        return sum(1 for health in self._proxies if health.quarantined_until > now)
+
+    def observe(self, proxy: str | None, duration: float, ok: bool) -> None:
+        """
+        Record a request through a proxy, requests through proxies that aren't in the pool are ignored.
+
+        Args:
+            proxy (Optional[str]): the proxy URL.
+            duration (float): the request duration, in seconds.
+            ok (bool): whether the request got a response.
+
+        """
+        health = self._health.get(proxy) if proxy else None
+        if health is None:
+            return
+
+        health.requests += 1
+        health.failure_rate += self.smoothing * ((not ok) - health.failure_rate)
+        if ok:
+            health.consecutive_failures = 0
+            health.latency = duration if health.latency is None else \
+                health.latency + self.smoothing * (duration - health.latency)
+            if health.strikes and health.failure_rate < self.failure_threshold / 2:
+                health.strikes = 0
+
+            return
+
+        health.failures += 1
+        health.consecutive_failures += 1
+        if health.consecutive_failures >= self.max_consecutive_failures:
+            self.quarantine(proxy, f'{health.consecutive_failures} failures in a row')
+        elif health.requests >= self.min_requests and health.failure_rate >= self.failure_threshold:
+            self.quarantine(proxy, f'failure rate {health.failure_rate:.0%}')
+
+    def quarantine(self, proxy: str, reason: str) -> None:
+        """
+        Stop leasing a proxy for the cooldown, which doubles with each quarantine until the proxy is healthy again.
+
+        Args:
+            proxy (str): the proxy URL.
+            reason (str): the reason, it's logged.
+
+        """
+        health = self._health.get(normalize_proxy(proxy))
+        now = time.monotonic()
+        if health is None or health.quarantined_until > now:
+            return
+
+        cooldown = min(self.cooldown * 2 ** health.strikes, self.max_cooldown)
+        health.strikes += 1
+        health.consecutive_failures = 0
+        health.quarantined_until = now + cooldown
+        health.reason = reason
+        metrics.inc('proxy_quarantines')
+        logger.warning(f'Proxy {proxy_label(health.proxy)} is quarantined for {cooldown:.0f} s: {reason}')
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._changed is None or self._loop is not loop:
+            self._changed = asyncio.Condition()
+            self._loop = loop
+
+        return self._changed
+
+    def _pick(self, key: str | None, now: float) -> ProxyHealth | None:
+        count = len(self._proxies)
+        if self.mode == 'sticky' and key is not None:
+            start = zlib.crc32(key.encode()) % count
+            for i in range(count):
+                health = self._proxies[(start + i) % count]
+                # A busy proxy moves the wallet to the next one with a free slot rather than blocking the worker
+                if health.quarantined_until <= now and (not self.max_per_proxy or health.in_use < self.max_per_proxy):
+                    return health
+
+            return None
+
+        for i in range(count):
+            health = self._proxies[(self._next + i) % count]
+            if health.quarantined_until <= now and (not self.max_per_proxy or health.in_use < self.max_per_proxy):
+                self._next = (self._next + i + 1) % count
+                return health
+
+        return None
+
+    async def acquire(self, key: str | None = None) -> str:
+        """
+        Lease a proxy, waiting until one is available.
+
+        Args:
+            key (Optional[str]): the key a sticky proxy is picked by, e.g. the private key. (the next proxy in turn)
+
+        Returns:
+            str: the proxy URL.
+
+        """
+        if not self._proxies:
+            raise ValueError('The proxy pool is empty')
+
+        changed = self._condition()
+        while True:
+            async with changed:
+                while True:
+                    now = time.monotonic()
+                    health = self._pick(key, now)
+                    if health:
+                        health.in_use += 1
+                        break
+
+                    # Waits for a release or the end of the nearest quarantine
+                    ends = [h.quarantined_until - now for h in self._proxies if h.quarantined_until > now]
+                    try:
+                        await asyncio.wait_for(changed.wait(), timeout=min(ends) if ends else None)
+                    except TimeoutError:
+                        pass
+
+            if not self.verify:
+                return health.proxy
+
+            status = self.verifier.cached(health.proxy)
+            if status is None or not status.ok:
+                status = await self.verifier.verify(health.proxy, force=status is not None)
+
+            if status.ok:
+                return health.proxy
+
+            await self.release(health.proxy)
+            self.quarantine(health.proxy, f"doesn't work: {status.error}")
+
+    async def release(self, proxy: str) -> None:
+        health = self._health.get(proxy)
+        if health:
+            health.in_use -= 1
+
+        changed = self._condition()
+        async with changed:
+            changed.notify_all()
+
+    @asynccontextmanager
+    async def lease(self, key: str | None = None) -> AsyncIterator[str]:
+        """
+        Lease a proxy for the duration of the context.
+
+        Args:
+            key (Optional[str]): the key a sticky proxy is picked by, e.g. the private key. (the next proxy in turn)
+
+        Returns:
+            AsyncIterator[str]: the proxy URL.
+
+        """
+        proxy = await self.acquire(key)
+        try:
+            yield proxy
+        finally:
+            await self.release(proxy)
+
+    def stats(self) -> list[dict[str, Any]]:
+        """
+        Get the health of every proxy.
+
+        Returns:
+            List[Dict[str, Any]]: the health of the proxies, the worst first.
+
+        """
+        now = time.monotonic()
+        return sorted((
+            {
+                'proxy': proxy_label(health.proxy),
+                'in_use': health.in_use,
+                'latency': round(health.latency, 3) if health.latency is not None else None,
+                'failure_rate': round(health.failure_rate, 3),
+                'requests': health.requests,
+                'failures': health.failures,
+                'quarantined_for': round(max(health.quarantined_until - now, 0.), 1),
+            } for health in self._proxies
+        ), key=lambda item: (-item['quarantined_for'], -item['failure_rate']))
+
+
+proxy_pool = ProxyPool()
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import time
+import asyncio
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# JSON-RPC error codes and messages that public RPCs and explorers use for rate limiting
+RATE_LIMIT_CODES = {429, -32005, -32029, -32090}
+RATE_LIMIT_MESSAGES = ('rate limit', 'too many requests', 'limit exceeded', 'exceeded the quota', 'request limit')
+
+
+def is_rate_limit_error(error: dict | str | None) -> bool:
+    """
+    Check if a JSON-RPC 'error' object or an explorer API response says that the request was rate limited.
+
+    Args:
+        error (Optional[Union[dict, str]]): the 'error' object, the API response or an error message.
+
+    Returns:
+        bool: True if the request was rate limited.
+
+    """
+    if not error:
+        return False
+
+    if isinstance(error, dict):
+        if error.get('code') in RATE_LIMIT_CODES:
+            return True
+
+        error = ' '.join(str(error.get(key)) for key in ('message', 'result') if isinstance(error.get(key), str))
+
+    error = str(error).lower()
+    return any(message in error for message in RATE_LIMIT_MESSAGES)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse the 'Retry-After' header.
+
+    Args:
+        value (Optional[str]): the header value, either a number of seconds or an HTTP date.
+
+    Returns:
+        Optional[float]: the number of seconds to wait or None if the header is missing or malformed.
+
+    """
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.)
+    except ValueError:
+        pass
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    A token bucket whose rate adapts to the endpoint: it grows additively while requests succeed and is cut
+        multiplicatively when the endpoint reports rate limiting (AIMD). 'Retry-After' pauses all requests.
+
+    Attributes:
+        rate (float): the current rate, in requests per second.
+        min_rate (float): the minimum rate.
+        max_rate (float): the maximum rate.
+        burst (int): the number of requests that can be sent at once after a pause.
+        increase (float): how much the rate grows per second of successful requests.
+        decrease (float): the multiplier of the rate on rate limiting.
+        decrease_interval (float): the minimum interval between rate cuts, so a burst of rejections cuts the rate
+            once, in seconds.
+        max_retries (int): how many times a rate limited request is retried.
+        requests (int): the number of acquired tokens.
+        waits (int): the number of requests that waited for a token.
+        rate_limited (int): the number of rate limited responses.
+
+    """
+    rate: float
+    min_rate: float
+    max_rate: float
+    burst: int
+    increase: float
+    decrease: float
+    decrease_interval: float
+    max_retries: int
+    requests: int
+    waits: int
+    rate_limited: int
+
+    def __init__(
+            self, rate: float | None = None, min_rate: float = 1, max_rate: float = 500, burst: int = 10,
+            increase: float = 5, decrease: float = 0.5, decrease_interval: float = 1, max_retries: int = 5
+    ) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            rate (Optional[float]): the initial rate, in requests per second. (max_rate)
+            min_rate (float): the minimum rate. (1)
+            max_rate (float): the maximum rate. (500)
+            burst (int): the number of requests that can be sent at once after a pause. (10)
+            increase (float): how much the rate grows per second of successful requests. (5)
+            decrease (float): the multiplier of the rate on rate limiting. (0.5)
+            decrease_interval (float): the minimum interval between rate cuts, in seconds. (1)
+            max_retries (int): how many times a rate limited request is retried. (5)
+
+        """
+        self.rate = rate or max_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.decrease_interval = decrease_interval
+        self.max_retries = max_retries
+        self.requests = 0
+        self.waits = 0
+        self.rate_limited = 0
+        # The theoretical arrival time of the next request
+        self._tat = 0.
+        self._blocked_until = 0.
+        self._last_decrease = 0.
+
+    async def acquire(self) -> None:
+        """
+        Wait for a token.
+        """
+        now = time.monotonic()
+        interval = 1 / self.rate
+        tat = max(self._tat, now)
+        self._tat = tat + interval
+        self.requests += 1
+        delay = max(tat - (self.burst - 1) * interval - now, self._blocked_until - now)
+        if delay > 0:
+            self.waits += 1
+            await asyncio.sleep(delay)
+
+        # 'Retry-After' may have been received while waiting
+        while (delay := self._blocked_until - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self) -> None:
+        self.rate = min(self.rate + self.increase / self.rate, self.max_rate)
+
+    def on_rate_limited(self, retry_after: float | None = None) -> None:
+        """
+        Cut the rate and pause requests if the endpoint asked for it.
+
+        Args:
+            retry_after (Optional[float]): the 'Retry-After' value, in seconds. (None)
+
+        """
+        now = time.monotonic()
+        self.rate_limited += 1
+        if now - self._last_decrease >= self.decrease_interval:
+            self._last_decrease = now
+            self.rate = max(self.rate * self.decrease, self.min_rate)
+
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def stats(self) -> dict[str, float | int]:
+        return {
+            'rate': self.rate,
+            'requests': self.requests,
+            'waits': self.waits,
+            'rate_limited': self.rate_limited,
+        }
+
+
+class RateLimiterRegistry:
+    """
+    A process-wide registry of rate limiters keyed by the endpoint URL without the query.
+
+    Attributes:
+        defaults (Dict[str, Any]): arguments of new rate limiters.
+
+    """
+    defaults: dict[str, ...]
+
+    def __init__(self, **defaults) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            **defaults: arguments of new rate limiters.
+
+        """
+        self.defaults = defaults
+        self._limiters: dict[str, RateLimiter] = {}
+
+    @staticmethod
+    def key(url: str) -> str:
+        url = urlsplit(url)
+        return f'{url.scheme}://{url.netloc}{url.path}'
+
+    def configure(self, url: str | None = None, **kwargs) -> None:
+        """
+        Change arguments of new rate limiters or settings of the rate limiter of an endpoint.
+
+        Args:
+            url (Optional[str]): the endpoint URL. (all new rate limiters)
+            **kwargs: arguments of RateLimiter.
+
+        """
+        if url is None:
+            self.defaults.update(kwargs)
+            return
+
+        limiter = self.get(url)
+        for key, value in kwargs.items():
+            if not hasattr(limiter, key):
+                raise ValueError(f'Unknown rate limiter setting: {key}')
+
+            setattr(limiter, key, value)
+
+    def get(self, url: str) -> RateLimiter:
+        """
+        Get the rate limiter of the endpoint, creating it if there is none.
+
+        Args:
+            url (str): the endpoint URL.
+
+        Returns:
+            RateLimiter: the shared rate limiter.
+
+        """
+        key = self.key(url)
+        if key not in self._limiters:
+            self._limiters[key] = RateLimiter(**self.defaults)
+
+        return self._limiters[key]
+
+    def stats(self) -> dict[str, dict[str, float | int]]:
+        """
+        Get the counters of all rate limiters.
+
+        Returns:
+            Dict[str, Dict[str, Union[float, int]]]: the counters by the endpoint.
+
+        """
+        return {key: limiter.stats() for key, limiter in self._limiters.items()}
+
+
+rate_limiters = RateLimiterRegistry()
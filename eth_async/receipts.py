@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from hexbytes import HexBytes
+from loguru import logger
+from web3.exceptions import TimeExhausted
+from web3.types import _Hash32
+from web3._utils.method_formatters import receipt_formatter
+
+from . import exceptions
+from .metrics import metrics
+
+if TYPE_CHECKING:
+    from .client import Client
+    from .data.models import Network
+
+
+@dataclass
+class _Pending:
+    future: asyncio.Future
+    client: Client
+    waiters: int = 0
+    poll_latency: float | None = None
+
+
+class ReceiptWatcher:
+    """
+    A network-scoped watcher of transaction receipts. A single poll loop follows the block number and, on every tick,
+        fetches the receipts of all pending transactions in JSON-RPC batches.
+
+    Attributes:
+        network (Network): the network.
+        poll_interval (float): how often the block number and the receipts are requested, in seconds.
+        blocks_seen (int): the number of new blocks seen.
+        receipt_requests (int): the number of receipts requested.
+
+    """
+    network: Network
+    poll_interval: float
+    blocks_seen: int
+    receipt_requests: int
+
+    def __init__(self, network: Network, poll_interval: float = 0.5) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            network (Network): the network.
+            poll_interval (float): how often the block number and the receipts are requested, in seconds. (0.5)
+
+        """
+        self.network = network
+        self.poll_interval = poll_interval
+        self.blocks_seen = 0
+        self.receipt_requests = 0
+        self._pending: dict[HexBytes, _Pending] = {}
+        self._last_block: int | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        metrics.set_gauge('pending_receipts', lambda: len(self._pending), network=network.name)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def wait(
+            self, client: Client, tx_hash: str | _Hash32, timeout: int | float = 120, poll_latency: float | None = None
+    ) -> dict[str, Any]:
+        """
+        Wait for the transaction receipt.
+
+        Args:
+            client (Client): the Client instance that sent the transaction, used for requests while it's pending.
+            tx_hash (Union[str, _Hash32]): the transaction hash.
+            timeout (Union[int, float]): the receipt waiting timeout. (120)
+            poll_latency (Optional[float]): how often the receipt is requested, the watcher polls at the shortest
+                interval any pending transaction asks for. (the poll interval)
+
+        Returns:
+            Dict[str, Any]: the transaction receipt.
+
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Futures and the poll task of a previous event loop can't be awaited in this one
+            self._pending = {}
+            self._task = None
+            self._last_block = None
+            self._loop = loop
+
+        tx_hash = HexBytes(tx_hash)
+        pending = self._pending.get(tx_hash)
+        if pending is None:
+            pending = self._pending[tx_hash] = _Pending(future=loop.create_future(), client=client)
+
+        pending.waiters += 1
+        if poll_latency is not None:
+            pending.poll_latency = min(poll_latency, pending.poll_latency or poll_latency)
+
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(pending.future), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise TimeExhausted(
+                f'Transaction {tx_hash.hex()} is not in the chain after {timeout} seconds'
+            ) from None
+        finally:
+            pending.waiters -= 1
+            # The transaction is watched until its last waiter gives up
+            if not pending.waiters and not pending.future.done() and self._pending.get(tx_hash) is pending:
+                del self._pending[tx_hash]
+
+    def _interval(self) -> float:
+        latencies = [pending.poll_latency for pending in self._pending.values() if pending.poll_latency is not None]
+        return min(latencies + [self.poll_interval])
+
+    def _next_client(self, failed: Client | None = None) -> Client:
+        """
+        Pick the client of a pending transaction to make the requests with.
+
+        Args:
+            failed (Optional[Client]): the client whose requests failed, its proxy may be dead, so a client with
+                another proxy is picked if there is one. (None, the client of the latest pending transaction is
+                picked)
+
+        Returns:
+            Client: the client.
+
+        """
+        clients = [pending.client for pending in self._pending.values()]
+        if failed is None or failed not in clients:
+            return clients[-1]
+
+        # The clients after the failed one come first, so that dead proxies are tried in turn rather than again
+        start = clients.index(failed) + 1
+        clients = clients[start:] + clients[:start]
+        return next((client for client in clients if client.proxy != failed.proxy), clients[0])
+
+    async def _run(self) -> None:
+        client = None
+        while self._pending:
+            # The client keeps making the requests while it works and any of its transactions is pending
+            if client is None or all(pending.client is not client for pending in self._pending.values()):
+                client = self._next_client()
+
+            try:
+                block_number = int(await client.w3.eth.block_number)
+                if self._last_block is None or block_number > self._last_block:
+                    self._last_block = block_number
+                    self.blocks_seen += 1
+                    self.network.gas_oracle.on_new_block(block_number)
+
+                # Receipts are requested on every tick, a transaction may be mined in the block already seen
+                await self._fetch_receipts(client)
+
+            except Exception as err:
+                logger.warning(f'Receipt watcher request failed: {err}')
+                if self._pending:
+                    client = self._next_client(failed=client)
+
+            if self._pending:
+                await asyncio.sleep(self._interval())
+
+    async def _fetch_receipts(self, client: Client) -> None:
+        tx_hashes = list(self._pending)
+        self.receipt_requests += len(tx_hashes)
+        results = await client.batch.execute(
+            (('eth_getTransactionReceipt', [tx_hash.hex()]) for tx_hash in tx_hashes), return_errors=True
+        )
+        for tx_hash, result in zip(tx_hashes, results):
+            if not result or isinstance(result, exceptions.RPCError):
+                continue
+
+            pending = self._pending.pop(tx_hash, None)
+            if pending and not pending.future.done():
+                pending.future.set_result(dict(receipt_formatter(result)))
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import time
+import asyncio
+from collections import deque
+from typing import Sequence
+
+import aiohttp
+
+from . import exceptions
+from .transport import TransportRegistry, transports
+
+# Failures that say something about the endpoint rather than about the request
+ENDPOINT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, OSError, exceptions.RateLimited)
+# Failures after which the request certainly didn't reach the node, the only ones writes fail over on: a sent
+# transaction that timed out may be in the mempool, and sending it again elsewhere gets "already known"
+UNSENT_ERRORS = (aiohttp.ClientConnectorError, exceptions.RateLimited)
+
+
+class Endpoint:
+    """
+    An RPC endpoint of a network with its health statistics.
+
+    Attributes:
+        url (str): the RPC endpoint URL.
+        weight (float): the routing weight, an endpoint with a higher weight is preferred at equal latency.
+        latency (Optional[float]): the exponentially weighted moving average of the successful request latency,
+            in seconds.
+        error_rate (float): the exponentially weighted moving average of the request failure rate.
+        requests (int): the number of finished requests.
+        errors (int): the number of failed requests.
+        last_error_at (Optional[float]): the monotonic time of the last failure.
+
+    """
+    url: str
+    weight: float
+    latency: float | None
+    error_rate: float
+    requests: int
+    errors: int
+    last_error_at: float | None
+
+    def __init__(self, url: str, weight: float = 1, window: int = 200) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            url (str): the RPC endpoint URL.
+            weight (float): the routing weight. (1)
+            window (int): the number of recent latencies the percentiles are calculated over. (200)
+
+        """
+        self.url = url
+        self.weight = weight
+        self.latency = None
+        self.error_rate = 0.
+        self.requests = 0
+        self.errors = 0
+        self.last_error_at = None
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._percentiles: dict[float, float] = {}
+
+    def record(self, latency: float, ok: bool, alpha: float) -> None:
+        """
+        Record a finished request.
+
+        Args:
+            latency (float): the request latency, in seconds.
+            ok (bool): whether the request succeeded.
+            alpha (float): the smoothing factor of the moving averages.
+
+        """
+        self.requests += 1
+        self.error_rate += alpha * ((0. if ok else 1.) - self.error_rate)
+        if ok:
+            self.latency = latency if self.latency is None else self.latency + alpha * (latency - self.latency)
+            self._latencies.append(latency)
+            self._percentiles.clear()
+        else:
+            self.errors += 1
+            self.last_error_at = time.monotonic()
+
+    def percentile(self, q: float) -> float | None:
+        """
+        Get a percentile of the recent successful request latencies.
+
+        Args:
+            q (float): the percentile as a fraction, e.g. 0.95.
+
+        Returns:
+            Optional[float]: the latency in seconds or None if there are no measurements.
+
+        """
+        if not self._latencies:
+            return None
+
+        if q not in self._percentiles:
+            latencies = sorted(self._latencies)
+            self._percentiles[q] = latencies[min(int(len(latencies) * q), len(latencies) - 1)]
+
+        return self._percentiles[q]
+
+    def is_healthy(self, max_error_rate: float, cooldown: float) -> bool:
+        # An unhealthy endpoint gets a probe request again after the cooldown
+        return (
+                self.error_rate < max_error_rate or
+                self.last_error_at is None or
+                time.monotonic() - self.last_error_at > cooldown
+        )
+
+    def score(self) -> float:
+        # Endpoints without measurements score best, so every endpoint gets measured
+        return (self.latency or 0.) / self.weight
+
+    def stats(self) -> dict[str, float | int | None]:
+        return {
+            'weight': self.weight,
+            'latency': self.latency,
+            'p95': self.percentile(0.95),
+            'error_rate': self.error_rate,
+            'requests': self.requests,
+            'errors': self.errors,
+        }
+
+
+class EndpointRouter:
+    """
+    Routes requests of a network to the fastest healthy endpoint, fails over to the next ones on endpoint errors and
+        optionally hedges slow reads by sending a second request to the next endpoint after a p95 delay.
+
+    Attributes:
+        endpoints (List[Endpoint]): the endpoints.
+        hedge (bool): whether reads are hedged.
+        hedge_percentile (float): the latency percentile of the endpoint after which a read is hedged.
+        min_hedge_delay (float): the minimum hedge delay, in seconds.
+        alpha (float): the smoothing factor of the moving averages.
+        max_error_rate (float): the error rate from which an endpoint is unhealthy.
+        cooldown (float): how long an unhealthy endpoint isn't routed to after its last failure, in seconds.
+        registry (TransportRegistry): the transport registry.
+        failovers (int): the number of requests repeated on another endpoint after a failure.
+        hedges (int): the number of hedge requests sent.
+        hedge_wins (int): the number of hedge requests that answered first.
+
+    """
+    endpoints: list[Endpoint]
+    hedge: bool
+    hedge_percentile: float
+    min_hedge_delay: float
+    alpha: float
+    max_error_rate: float
+    cooldown: float
+    registry: TransportRegistry
+    failovers: int
+    hedges: int
+    hedge_wins: int
+
+    def __init__(
+            self, endpoints: Sequence[tuple[str, float]], hedge: bool = False, hedge_percentile: float = 0.95,
+            min_hedge_delay: float = 0.05, alpha: float = 0.2, max_error_rate: float = 0.5, cooldown: float = 10,
+            registry: TransportRegistry | None = None
+    ) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            endpoints (Sequence[Tuple[str, float]]): URLs and weights of the endpoints.
+            hedge (bool): whether reads are hedged. (False)
+            hedge_percentile (float): the latency percentile after which a read is hedged. (0.95)
+            min_hedge_delay (float): the minimum hedge delay, in seconds. (0.05)
+            alpha (float): the smoothing factor of the moving averages. (0.2)
+            max_error_rate (float): the error rate from which an endpoint is unhealthy. (0.5)
+            cooldown (float): how long an unhealthy endpoint isn't routed to, in seconds. (10)
+            registry (Optional[TransportRegistry]): the transport registry. (the process-wide one)
+
+        """
+        if not endpoints:
+            raise ValueError('At least one endpoint is required')
+
+        self.endpoints = [Endpoint(url=url, weight=weight) for url, weight in endpoints]
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.registry = registry or transports
+        self.failovers = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def ranked(self) -> list[Endpoint]:
+        """
+        Get the endpoints in the routing order: healthy ones by latency divided by weight, then unhealthy ones.
+
+        Returns:
+            List[Endpoint]: the endpoints.
+
+        """
+        if len(self.endpoints) == 1:
+            return self.endpoints
+
+        return sorted(
+            self.endpoints,
+            key=lambda endpoint: (not endpoint.is_healthy(self.max_error_rate, self.cooldown), endpoint.score())
+        )
+
+    def hedge_delay(self, endpoint: Endpoint) -> float:
+        delay = endpoint.percentile(self.hedge_percentile)
+        return max(delay if delay is not None else self.registry.config.request_timeout, self.min_hedge_delay)
+
+    async def _attempt(
+            self, endpoint: Endpoint, data: bytes, headers: dict[str, str] | None, proxy: str | None, method: str | None
+    ) -> bytes:
+        started = time.monotonic()
+        try:
+            response = await self.registry.get(endpoint.url, proxy).post(data, headers=headers, method=method)
+        except ENDPOINT_ERRORS:
+            endpoint.record(time.monotonic() - started, ok=False, alpha=self.alpha)
+            raise
+
+        endpoint.record(time.monotonic() - started, ok=True, alpha=self.alpha)
+        return response
+
+    async def post(
+            self, data: bytes, headers: dict[str, str] | None = None, proxy: str | None = None, hedge: bool = True,
+            method: str | None = None
+    ) -> bytes:
+        """
+        Send a POST request to the best endpoint.
+
+        Args:
+            data (bytes): the encoded request body.
+            headers (Optional[Dict[str, str]]): the request headers. (None)
+            proxy (Optional[str]): the proxy URL. (None)
+            hedge (bool): whether the request may be hedged, pass False for requests that aren't reads. Such requests
+                fail over to the next endpoint only if they didn't reach the previous one. (True)
+            method (Optional[str]): the JSON-RPC method the request is recorded under in the metrics. ('unknown')
+
+        Returns:
+            bytes: the raw response body.
+
+        """
+        ranked = self.ranked()
+        if len(ranked) == 1:
+            return await self._attempt(ranked[0], data, headers, proxy, method)
+
+        if hedge and self.hedge:
+            return await self._hedged(ranked, data, headers, proxy, method)
+
+        retryable = ENDPOINT_ERRORS if hedge else UNSENT_ERRORS
+        last_error = None
+        for endpoint in ranked:
+            if last_error:
+                self.failovers += 1
+
+            try:
+                return await self._attempt(endpoint, data, headers, proxy, method)
+            except retryable as err:
+                last_error = err
+
+        raise last_error
+
+    async def _hedged(
+            self, ranked: list[Endpoint], data: bytes, headers: dict[str, str] | None, proxy: str | None,
+            method: str | None
+    ) -> bytes:
+        candidates = iter(ranked)
+        tasks: dict[asyncio.Future, Endpoint] = {}
+
+        def launch() -> bool:
+            endpoint = next(candidates, None)
+            if endpoint:
+                tasks[asyncio.ensure_future(self._attempt(endpoint, data, headers, proxy, method))] = endpoint
+
+            return endpoint is not None
+
+        launch()
+        delay = self.hedge_delay(ranked[0])
+        hedged = False
+        hedge_task = None
+        last_error = None
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(
+                    tasks, timeout=None if hedged else delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    if launch():
+                        self.hedges += 1
+                        hedge_task = list(tasks)[-1]
+
+                    continue
+
+                for task in done:
+                    tasks.pop(task)
+                    if task.exception() is None:
+                        if task is hedge_task:
+                            self.hedge_wins += 1
+
+                        return task.result()
+
+                    if not isinstance(task.exception(), ENDPOINT_ERRORS):
+                        raise task.exception()
+
+                    last_error = task.exception()
+
+                if not tasks and launch():
+                    self.failovers += 1
+
+            raise last_error
+
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict[str, int | dict]:
+        """
+        Get the router counters and the endpoint statistics.
+
+        Returns:
+            Dict[str, Union[int, dict]]: the counters.
+
+        """
+        return {
+            'failovers': self.failovers,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'endpoints': {endpoint.url: endpoint.stats() for endpoint in self.endpoints},
+        }
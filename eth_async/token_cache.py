@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import os
+import json
+from dataclasses import dataclass, asdict
+from collections import OrderedDict
+
+from web3 import Web3
+from loguru import logger
+
+from .data import config
+from .data import types
+
+
+@dataclass
+class TokenMetadata:
+    """
+    Immutable on-chain metadata of a token.
+
+    Attributes:
+        decimals (int): the token decimals.
+        symbol (Optional[str]): the token symbol.
+        name (Optional[str]): the token name.
+
+    """
+    decimals: int
+    symbol: str | None = None
+    name: str | None = None
+
+
+class TokenMetadataCache:
+    """
+    A two-level cache of token metadata keyed by (chain_id, address): an in-memory LRU in front of a JSON file, so
+        later runs start warm.
+
+    Attributes:
+        path (Optional[str]): the path to the JSON file, None to keep the cache in memory only.
+        max_size (int): the maximum number of entries in the in-memory layer.
+        hits (int): the number of lookups served from memory or disk.
+        misses (int): the number of lookups that found nothing.
+
+    """
+    path: str | None
+    max_size: int
+    hits: int
+    misses: int
+
+    def __init__(self, path: str | None = None, max_size: int = 1024) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            path (Optional[str]): the path to the JSON file, None to keep the cache in memory only. (None)
+            max_size (int): the maximum number of entries in the in-memory layer. (1024)
+
+        """
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, TokenMetadata] = OrderedDict()
+        self._disk: dict[str, dict] | None = None
+
+    @staticmethod
+    def _key(chain_id: int, address: types.Address) -> str:
+        return f'{chain_id}:{Web3.to_checksum_address(address)}'
+
+    def _load_disk(self) -> dict[str, dict]:
+        if self._disk is None:
+            self._disk = {}
+            if self.path and os.path.isfile(self.path):
+                try:
+                    with open(self.path, encoding='utf-8') as f:
+                        self._disk = json.load(f)
+                except (OSError, ValueError):
+                    self._disk = {}
+
+        return self._disk
+
+    def _remember(self, key: str, metadata: TokenMetadata) -> None:
+        self._memory[key] = metadata
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def get(self, chain_id: int, address: types.Address) -> TokenMetadata | None:
+        """
+        Get cached metadata of the token.
+
+        Args:
+            chain_id (int): the chain ID.
+            address (Address): the token address.
+
+        Returns:
+            Optional[TokenMetadata]: the metadata or None if the token isn't cached.
+
+        """
+        key = self._key(chain_id, address)
+        metadata = self._memory.get(key)
+        if metadata:
+            self.hits += 1
+            self._memory.move_to_end(key)
+            return metadata
+
+        stored = self._load_disk().get(key)
+        if stored:
+            self.hits += 1
+            metadata = TokenMetadata(**stored)
+            self._remember(key, metadata)
+            return metadata
+
+        self.misses += 1
+        return None
+
+    def set(self, chain_id: int, address: types.Address, metadata: TokenMetadata) -> None:
+        """
+        Cache metadata of the token in memory and on disk.
+
+        Args:
+            chain_id (int): the chain ID.
+            address (Address): the token address.
+            metadata (TokenMetadata): the metadata.
+
+        """
+        key = self._key(chain_id, address)
+        self._remember(key, metadata)
+        disk = self._load_disk()
+        disk[key] = asdict(metadata)
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                tmp_path = f'{self.path}.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(disk, f, indent=2)
+
+                os.replace(tmp_path, self.path)
+            except OSError as err:
+                logger.warning(f'Failed to save token metadata cache: {err}')
+
+
+token_cache = TokenMetadataCache(path=os.path.join(config.CACHE_DIR, 'tokens.json'))
@@ -1,23 +1,67 @@
 from __future__ import annotations
+import heapq
+import asyncio
 from typing import TYPE_CHECKING, Any
+
+import aiohttp
 from hexbytes import HexBytes
 from loguru import logger
 
 from web3 import Web3, AsyncWeb3
-# from web3.middleware import geth_poa_middleware
 from web3.types import TxReceipt, _Hash32, TxParams
+from eth_typing import ChecksumAddress
 from eth_account.datastructures import SignedTransaction
 
 from .data import types
 from . import exceptions
 from .classes import AutoRepr
 from .utils.utils import api_key_required
-from .data.models import TokenAmount, CommonValues, TxArgs
+from .metrics import metrics
+from .pipeline import tx_pipeline
+from .transport import RequestCoalescer
+from .calldata import APPROVE, UINT256_MAX
+from .multicall import Multicall, Call, DECIMALS
+from .token_cache import TokenMetadata, token_cache
+from .data.models import TokenAmount, CommonValues
 
 if TYPE_CHECKING:
     from .client import Client
 
 
+# The amount 'station_max' approvals set, the highest bit is left unset
+STATION_MAX = UINT256_MAX >> 1
+
+
+def is_nonce_error(err: Exception) -> bool:
+    """
+    Check if a send error means that the nonce of the transaction is out of sync with the network.
+    """
+    message = str(err).lower()
+    return 'nonce too low' in message or 'nonce too high' in message or 'invalid nonce' in message
+
+
+def is_rejected_error(err: Exception) -> bool:
+    """
+    Check if a send error proves that the transaction never reached the network: the node answered with an error, the
+        connection was refused or the request was rate limited. After other errors, e.g. timeouts and dropped
+        connections, the transaction may have been broadcast.
+    """
+    if isinstance(err, (aiohttp.ClientConnectorError, exceptions.RateLimited)):
+        return True
+
+    if isinstance(err, exceptions.RPCError):
+        error = err.error
+    elif isinstance(err, ValueError) and err.args and isinstance(err.args[0], dict):
+        # web3 raises the 'error' object of the response
+        error = err.args[0]
+    else:
+        return False
+
+    # The node already has a transaction with this hash, e.g. a duplicate of a send that timed out
+    message = str(error.get('message', '')).lower()
+    return 'already known' not in message and 'known transaction' not in message
+
+
 class Tx(AutoRepr):
     """
     An instance of transaction for easy execution of actions on it.
@@ -82,26 +126,25 @@ class Tx(AutoRepr):
         return self.params
 
     async def wait_for_receipt(
-            self, client, timeout: int | float = 120, poll_latency: float = 0.1
+            self, client, timeout: int | float = 120, poll_latency: float | None = None
     ) -> dict[str, Any]:
         """
-        Wait for the transaction receipt.
+        Wait for the transaction receipt using the receipt watcher of the client network.
 
         Args:
             client (Client): the Client instance.
             timeout (Union[int, float]): the receipt waiting timeout. (120 sec)
-            poll_latency (float): the poll latency. (0.1 sec)
+            poll_latency (Optional[float]): how often the receipt is requested. (the poll interval of the receipt
+                watcher)
 
         Returns:
             Dict[str, Any]: the transaction receipt.
 
         """
-        self.receipt = await client.transactions.wait_for_receipt(
-            w3=client.w3,
-            tx_hash=self.hash,
-            timeout=timeout,
-            poll_latency=poll_latency
+        self.receipt = await client.network.receipt_watcher.wait(
+            client=client, tx_hash=self.hash, timeout=timeout, poll_latency=poll_latency
         )
+        metrics.inc('txs_confirmed' if self.receipt.get('status', 1) else 'txs_reverted', network=client.network.name)
         return self.receipt
 
     async def decode_input_data(self):
@@ -114,42 +157,144 @@ class Tx(AutoRepr):
         pass
 
 
+class NonceManager:
+    """
+    Hands out sequential nonces of a single account locally, so several transactions can be sent back-to-back without
+        requesting the nonce before each of them.
+
+    Attributes:
+        address (ChecksumAddress): the account address.
+
+    """
+    address: ChecksumAddress
+    _managers: dict[tuple[int, str], NonceManager] = {}
+
+    def __init__(self, address: ChecksumAddress) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            address (ChecksumAddress): the account address.
+
+        """
+        self.address = address
+        self._next: int | None = None
+        self._released: list[int] = []
+        self._lock: asyncio.Lock | None = None
+
+    @classmethod
+    def for_account(cls, chain_id: int, address: ChecksumAddress) -> NonceManager:
+        """
+        Get the nonce manager of the account on the chain, shared by all clients of this account.
+
+        Args:
+            chain_id (int): the chain ID.
+            address (ChecksumAddress): the account address.
+
+        Returns:
+            NonceManager: the nonce manager.
+
+        """
+        if chain_id is None:
+            # Accounts of different networks would share nonces
+            raise ValueError('The chain ID is unknown, resolve the network first')
+
+        key = (chain_id, address)
+        if key not in cls._managers:
+            cls._managers[key] = cls(address=address)
+
+        return cls._managers[key]
+
+    @classmethod
+    def evict(cls, chain_id: int | None, address: ChecksumAddress) -> None:
+        """
+        Forget the nonce manager of the account once it has nothing left to send, so a run over many wallets doesn't
+            keep a manager of each of them. The next one is created with the nonce requested from the network.
+
+        Args:
+            chain_id (Optional[int]): the chain ID.
+            address (ChecksumAddress): the account address.
+
+        """
+        cls._managers.pop((chain_id, address), None)
+
+    async def acquire(self, client: Client) -> int:
+        """
+        Get the next nonce. Nonces released after failed sends are handed out first.
+
+        Args:
+            client (Client): the Client instance used to request the nonce on the first call or after a resync.
+
+        Returns:
+            int: the nonce.
+
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self._released:
+                return heapq.heappop(self._released)
+
+            if self._next is None:
+                self._next = await client.w3.eth.get_transaction_count(self.address, 'pending')
+
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def release(self, nonce: int) -> None:
+        """
+        Return a nonce that wasn't used because the transaction wasn't sent, so the next transaction fills the gap.
+
+        Args:
+            nonce (int): the nonce.
+
+        """
+        if self._next is not None and nonce < self._next and nonce not in self._released:
+            heapq.heappush(self._released, nonce)
+
+    def resync(self) -> None:
+        """
+        Forget the local state, so the next nonce is requested from the network again.
+        """
+        self._next = None
+        self._released.clear()
+
+
 class Transactions:
+    _metadata_requests: RequestCoalescer = RequestCoalescer()
+
     def __init__(self, client: Client) -> None:
         self.client = client
 
+    @property
+    def nonce_manager(self) -> NonceManager:
+        return NonceManager.for_account(self.client.network.chain_id, self.client.account.address)
+
     async def gas_price(self) -> TokenAmount:
         """
         Get the current gas price
         :return: gas price
         """
-        return TokenAmount(amount=await self.client.w3.eth.gas_price, wei=True)
+        return TokenAmount(amount=(await self.client.network.gas_oracle.fees(self.client)).gas_price, wei=True)
 
     async def max_priority_fee(self, block: dict | None = None) -> TokenAmount:
-        w3 = Web3(provider=Web3.HTTPProvider(endpoint_uri=self.client.network.rpc))
-        w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+        """
+        Estimate the max priority fee from the 'eth_feeHistory' rewards of recent blocks.
 
-        if not block:
-            block = w3.eth.get_block('latest')
+        Args:
+            block (Optional[dict]): the newest block of the window. (the latest one)
 
-        block_number = block['number']
-        latest_block_transaction_count = w3.eth.get_block_transaction_count(block_number)
-        max_priority_fee_per_gas_lst = []
-        for i in range(latest_block_transaction_count):
-            try:
-                transaction = w3.eth.get_transaction_by_block(block_number, i)
-                if 'maxPriorityFeePerGas' in transaction:
-                    max_priority_fee_per_gas_lst.append(transaction['maxPriorityFeePerGas'])
-            except Exception:
-                continue
-
-        if not max_priority_fee_per_gas_lst:
-            # max_priority_fee_per_gas = w3.eth.max_priority_fee
-            max_priority_fee_per_gas = 0
-        else:
-            max_priority_fee_per_gas_lst.sort()
-            max_priority_fee_per_gas = max_priority_fee_per_gas_lst[len(max_priority_fee_per_gas_lst) // 2]
-        return TokenAmount(amount=max_priority_fee_per_gas, wei=True)
+        Returns:
+            Wei: the max priority fee.
+
+        """
+        block_number = int(block['number']) if block else None
+        return TokenAmount(
+            amount=await self.client.network.gas_oracle.priority_fees.estimate(self.client, block_number=block_number),
+            wei=True
+        )
 
     async def max_priority_fee_(self) -> TokenAmount:
         """
@@ -190,28 +335,34 @@ class Transactions:
 
         """
 
+        # The chain ID keys the nonce manager, so it's resolved even if 'chainId' is given
+        if 'chainId' not in tx_params or self.client.network.chain_id is None:
+            await self.client.network.resolve()
+
         if 'chainId' not in tx_params:
             tx_params['chainId'] = self.client.network.chain_id
 
-        if not tx_params.get('nonce'):
-            tx_params['nonce'] = await self.client.wallet.nonce()
+        if tx_params.get('nonce') is None:
+            tx_params['nonce'] = await self.nonce_manager.acquire(self.client)
 
         if 'from' not in tx_params:
             tx_params['from'] = self.client.account.address
 
         if 'gasPrice' not in tx_params and 'maxFeePerGas' not in tx_params:
-            gas_price = (await self.gas_price()).Wei
-            # if self.client.network.tx_type == 2:
-            #     tx_params['maxFeePerGas'] = gas_price
-            # else:
-            tx_params['gasPrice'] = int(gas_price * 1.5)
+            fees = await self.client.network.gas_oracle.fees(self.client)
+            if self.client.network.tx_type == 2:
+                tx_params['maxPriorityFeePerGas'] = fees.max_priority_fee
+                tx_params['maxFeePerGas'] = fees.max_fee
+            else:
+                tx_params['gasPrice'] = fees.legacy_gas_price
 
         elif 'gasPrice' in tx_params and not int(tx_params['gasPrice']):
             tx_params['gasPrice'] = (await self.gas_price()).Wei
 
-        # if 'maxFeePerGas' in tx_params and 'maxPriorityFeePerGas' not in tx_params:
-        #     tx_params['maxPriorityFeePerGas'] = (await self.max_priority_fee()).Wei
-        #     tx_params['maxFeePerGas'] = tx_params['maxFeePerGas'] + tx_params['maxPriorityFeePerGas']
+        if 'maxFeePerGas' in tx_params and 'maxPriorityFeePerGas' not in tx_params:
+            fees = await self.client.network.gas_oracle.fees(self.client)
+            tx_params['maxPriorityFeePerGas'] = fees.max_priority_fee
+            tx_params['maxFeePerGas'] = tx_params['maxFeePerGas'] + tx_params['maxPriorityFeePerGas']
 
         if 'gas' not in tx_params or not int(tx_params['gas']):
             tx_params['gas'] = (await self.estimate_gas(tx_params=tx_params)).Wei
@@ -245,12 +396,50 @@ class Transactions:
             Tx: the instance of the sent transaction.
 
         """
-        await self.auto_add_params(tx_params=tx_params)
-
-        signed_tx = await self.sign_transaction(tx_params)
-        tx_hash = await self.client.w3.eth.send_raw_transaction(transaction=signed_tx.rawTransaction)
-
-        return Tx(tx_hash=tx_hash, params=tx_params)
+        managed_nonce = tx_params.get('nonce') is None
+        for attempt in range(2):
+            broadcasting = False
+            try:
+                # Fills the parameters, signs and sends the transaction in stages, see 'TxPipeline'
+                raw_tx = await tx_pipeline.prepare(self.client, tx_params)
+                broadcasting = True
+                tx_hash = await tx_pipeline.submit(self.client, raw_tx)
+
+            except asyncio.CancelledError:
+                # The deadline of the wallet or the second Ctrl-C, the nonce is settled the same way as after an error
+                if managed_nonce and tx_params.get('nonce') is not None:
+                    if broadcasting:
+                        self.nonce_manager.resync()
+                        del tx_params['nonce']
+                    else:
+                        self.nonce_manager.release(tx_params.pop('nonce'))
+
+                raise
+
+            except Exception as err:
+                if managed_nonce and tx_params.get('nonce') is not None:
+                    if is_nonce_error(err):
+                        # The local nonce diverged from the network, request it again and retry once
+                        self.nonce_manager.resync()
+                        del tx_params['nonce']
+                        if attempt == 0:
+                            logger.warning(f'{err} | resyncing nonce | {self.client.account.address}')
+                            continue
+
+                    elif not broadcasting or is_rejected_error(err):
+                        self.nonce_manager.release(tx_params.pop('nonce'))
+
+                    else:
+                        # The transaction may have been broadcast, so its nonce can't be handed out again
+                        self.nonce_manager.resync()
+                        del tx_params['nonce']
+
+                # Only the error that leaves this method is a failed transaction, a retried one isn't
+                metrics.inc('txs_failed', network=self.client.network.name)
+                raise
+
+            metrics.inc('txs_submitted', network=self.client.network.name)
+            return Tx(tx_hash=tx_hash, params=tx_params)
 
     async def approved_amount(
             self, token: types.Contract, spender: types.Contract, owner: types.Address | None = None
@@ -317,34 +506,34 @@ class Transactions:
             amount (Optional[TokenAmount]): an amount to approve. (infinity)
             gas_limit (Optional[GasLimit]): the gas limit in Wei. (parsed from the network)
             nonce (Optional[int]): a nonce of the sender address. (get it using the 'nonce' function)
+            max (Optional[bool]): approve the maximum uint256 amount instead of the given one. (False)
+            station_max (Optional[bool]): approve the maximum amount without the highest bit instead of the given one.
+                (False)
 
         Returns:
             Tx: the instance of the sent transaction.
 
         """
-        spender = Web3.to_checksum_address(spender)
         contract_address, abi = await self.client.contracts.get_contract_attributes(token)
-        contract = await self.client.contracts.default_token(contract_address)
 
-        if amount is None:
+        if station_max:
+            amount = STATION_MAX
+        elif max:
+            amount = UINT256_MAX
+        elif amount is None:
             amount = CommonValues.InfinityInt
         elif isinstance(amount, (int, float)):
             amount = TokenAmount(
                 amount=amount,
-                decimals=await self.client.transactions.get_decimals(contract=contract.address)
+                decimals=await self.client.transactions.get_decimals(contract=contract_address)
             ).Wei
         else:
             amount = amount.Wei
 
-        tx_args = TxArgs(
-            spender=spender,
-            amount=amount
-        )
-
         tx_params = {
             'nonce': nonce,
-            'to': contract.address,
-            'data': contract.encodeABI('approve', args=tx_args.tuple())
+            'to': contract_address,
+            'data': APPROVE.encode_hex(spender, amount)
         }
 
         if gas_limit:
@@ -352,18 +541,45 @@ class Transactions:
                 gas_limit = TokenAmount(amount=gas_limit, wei=True)
             tx_params['gas'] = gas_limit.Wei
 
-        if max:
-            tx_params['data'] = tx_params['data'][:74] + ('f' * 64)
+        return await self.sign_and_send(tx_params=tx_params)
+
+    async def get_token_metadata(self, contract: types.Contract) -> TokenMetadata:
+        """
+        Get decimals, symbol and name of a token. The metadata is read from the token metadata cache, and is requested
+            from the network in a single call only on a cache miss.
 
-        if station_max:
-            tx_params['data'] = tx_params['data'][:74] + '7' + ('f' * 63)
+        Args:
+            contract (Contract): the contract address or instance of token.
 
-        return await self.sign_and_send(tx_params=tx_params)
+        Returns:
+            TokenMetadata: the token metadata.
 
-    async def get_decimals(self, contract: types.Contract) -> int:
+        """
         contract_address, abi = await self.client.contracts.get_contract_attributes(contract)
-        contract = await self.client.contracts.default_token(contract_address=contract_address)
-        return await contract.functions.decimals().call()
+        chain_id = (await self.client.network.resolve()).chain_id
+        metadata = token_cache.get(chain_id, contract_address)
+        if metadata:
+            return metadata
+
+        # A client whose shared request failed, e.g. because of the proxy of another client, sends its own
+        return await self._metadata_requests.run(
+            (chain_id, contract_address),
+            lambda: self._fetch_token_metadata(contract_address),
+            fallback=lambda: self._fetch_token_metadata(contract_address)
+        )
+
+    async def _fetch_token_metadata(self, contract_address: ChecksumAddress) -> TokenMetadata:
+        decimals, symbol, name = await self.client.multicall.aggregate([
+            Call(target=contract_address, data=DECIMALS, allow_failure=False),
+            Multicall.symbol(token=contract_address),
+            Multicall.name(token=contract_address),
+        ])
+        metadata = TokenMetadata(decimals=decimals, symbol=symbol, name=name)
+        token_cache.set(self.client.network.chain_id, contract_address, metadata)
+        return metadata
+
+    async def get_decimals(self, contract: types.Contract) -> int:
+        return (await self.get_token_metadata(contract=contract)).decimals
 
     async def sign_message(self):
         pass
@@ -0,0 +1,505 @@
+from __future__ import annotations
+
+import json
+import time
+import asyncio
+from dataclasses import dataclass
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Hashable
+
+import aiohttp
+from eth_typing import URI
+from web3.types import RPCEndpoint, RPCResponse
+from web3.providers.async_rpc import AsyncHTTPProvider
+
+from . import exceptions
+from .metrics import metrics
+from .proxies import proxy_pool
+from .rate_limit import RateLimiter, RateLimiterRegistry, is_rate_limit_error, parse_retry_after, rate_limiters
+
+if TYPE_CHECKING:
+    from .routing import EndpointRouter
+
+# Requests that must not be sent twice by hedging
+WRITE_METHODS = {'eth_sendRawTransaction', 'eth_sendTransaction'}
+# Requests whose results depend on the server-side state of the caller and can't be shared
+STATEFUL_METHODS = {
+    'eth_newFilter', 'eth_newBlockFilter', 'eth_newPendingTransactionFilter', 'eth_getFilterChanges',
+    'eth_uninstallFilter', 'eth_subscribe', 'eth_unsubscribe',
+}
+
+
+@dataclass
+class TransportConfig:
+    """
+    Settings of the shared JSON-RPC transports.
+
+    Attributes:
+        pool_size (int): the maximum number of keep-alive connections of a single transport. (100)
+        keepalive_timeout (float): how long an unused connection stays open, in seconds. (30)
+        idle_timeout (float): how long an unused transport stays in the registry, in seconds. (300)
+        max_transports (int): the maximum number of transports kept in the registry. (10000)
+        request_timeout (float): the total timeout of a single HTTP request, in seconds. (30)
+
+    """
+    pool_size: int = 100
+    keepalive_timeout: float = 30
+    idle_timeout: float = 300
+    max_transports: int = 10_000
+    request_timeout: float = 30
+
+
+class Transport:
+    """
+    A keep-alive HTTP session to a single JSON-RPC endpoint through a single proxy.
+
+    Attributes:
+        endpoint (str): the RPC endpoint URL.
+        proxy (Optional[str]): the proxy URL.
+        config (TransportConfig): the transport settings.
+        last_used (float): the monotonic time of the last request.
+        in_flight (int): the number of requests currently being sent.
+
+    """
+    endpoint: str
+    proxy: str | None
+    config: TransportConfig
+    last_used: float
+    in_flight: int
+
+    def __init__(self, endpoint: str, proxy: str | None, config: TransportConfig, registry: TransportRegistry) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            endpoint (str): the RPC endpoint URL.
+            proxy (Optional[str]): the proxy URL.
+            config (TransportConfig): the transport settings.
+            registry (TransportRegistry): the registry that owns the transport.
+
+        """
+        self.endpoint = endpoint
+        self.proxy = proxy
+        self.config = config
+        self.registry = registry
+        self.last_used = time.monotonic()
+        self.in_flight = 0
+        self._session: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_create(*_) -> None:
+            self.registry.connections_created += 1
+
+        async def on_reuse(*_) -> None:
+            self.registry.connections_reused += 1
+
+        trace_config.on_connection_create_end.append(on_create)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        return trace_config
+
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Get the HTTP session of the transport, creating it for the running event loop if needed.
+
+        Returns:
+            aiohttp.ClientSession: the session.
+
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.pool_size,
+                keepalive_timeout=self.config.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.config.request_timeout),
+                trace_configs=[self._trace_config()]
+            )
+            self._loop = loop
+
+        return self._session
+
+    @property
+    def limiter(self) -> RateLimiter:
+        return self.registry.limiters.get(self.endpoint)
+
+    async def post(self, data: bytes, headers: dict[str, str] | None = None, method: str | None = None) -> bytes:
+        """
+        Send a POST request to the endpoint at the rate allowed by its rate limiter. Rate limited requests are
+            retried after a rate cut and the 'Retry-After' pause. Every attempt is recorded in the metrics.
+
+        Args:
+            data (bytes): the encoded request body.
+            headers (Optional[Dict[str, str]]): the request headers. (None)
+            method (Optional[str]): the JSON-RPC method the attempts are recorded under. ('unknown')
+
+        Returns:
+            bytes: the raw response body.
+
+        """
+        limiter = self.limiter
+        retry_after = None
+        for _ in range(limiter.max_retries + 1):
+            await limiter.acquire()
+            self.in_flight += 1
+            self.last_used = time.monotonic()
+            started = time.perf_counter()
+            body = None
+            responded = False
+            try:
+                async with self.session().post(
+                        self.endpoint, data=data, headers=headers, proxy=self.proxy
+                ) as response:
+                    # 407 is the proxy refusing the credentials
+                    responded = response.status != 407
+                    if response.status == 429:
+                        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    else:
+                        response.raise_for_status()
+                        body = await response.read()
+
+            except asyncio.CancelledError:
+                # A cancelled request says nothing about the proxy
+                responded = None
+                raise
+
+            finally:
+                self.in_flight -= 1
+                self.last_used = time.monotonic()
+                failed, some_limited, all_limited = self._errors(body) if body is not None else (True, False, False)
+                duration = time.perf_counter() - started
+                metrics.observe(
+                    'rpc', method or 'unknown', duration, error=failed, endpoint=self.endpoint, proxy=self.proxy
+                )
+                # Only requests without a response count against the proxy, errors of the node don't
+                if responded is not None:
+                    proxy_pool.observe(self.proxy, duration, ok=responded)
+
+            if body is None:
+                limiter.on_rate_limited(retry_after)
+                continue
+
+            if some_limited:
+                limiter.on_rate_limited()
+                if all_limited:
+                    continue
+
+            else:
+                limiter.on_success()
+
+            return body
+
+        raise exceptions.RateLimited(endpoint=self.endpoint, retry_after=retry_after)
+
+    @staticmethod
+    def _errors(body: bytes) -> tuple[bool, bool, bool]:
+        # Returns whether there are errors, whether some of them and whether all of them are rate limiting. Most
+        # responses have no errors, so the body is parsed only if there is an error in it.
+        if b'"error"' not in body:
+            return False, False, False
+
+        try:
+            response = json.loads(body)
+        except ValueError:
+            return True, False, False
+
+        items = response if isinstance(response, list) else [response]
+        errors = [item.get('error') for item in items if isinstance(item, dict)]
+        limited = [is_rate_limit_error(error) for error in errors]
+        return any(errors), any(limited), bool(items) and len(limited) == len(items) and all(limited)
+
+    def is_idle(self, now: float) -> bool:
+        return not self.in_flight and now - self.last_used > self.config.idle_timeout
+
+    async def close(self) -> None:
+        """
+        Close the HTTP session of the transport.
+        """
+        if self._session and not self._session.closed and self._loop and not self._loop.is_closed():
+            await self._session.close()
+
+        self._session = None
+        self._loop = None
+
+
+class RequestCoalescer:
+    """
+    Shares a single upstream call between identical requests that are in flight at the same time.
+
+    Attributes:
+        upstream (int): the number of upstream calls made.
+        coalesced (int): the number of requests that joined an in-flight call, i.e. the upstream calls saved.
+
+    """
+    upstream: int
+    coalesced: int
+
+    def __init__(self) -> None:
+        """
+        Initialize the class.
+        """
+        self.upstream = 0
+        self.coalesced = 0
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+
+    async def run(
+            self, key: Hashable, call: Callable[[], Awaitable[Any]],
+            fallback: Callable[[], Awaitable[Any]] | None = None
+    ) -> Any:
+        """
+        Make the call or join the identical one that is in flight.
+
+        Args:
+            key (Hashable): the identity of the request.
+            call (Callable[[], Awaitable[Any]]): the function that makes the upstream call.
+            fallback (Optional[Callable[[], Awaitable[Any]]]): the function that makes the call on its own if the
+                joined call fails, e.g. through the proxy of this caller rather than the one of the caller that started
+                it. (the error of the joined call is raised)
+
+        Returns:
+            Any: the result of the call, e.g. the raw response body.
+
+        """
+        future = self._in_flight.get(key)
+        if future is None:
+            self.upstream += 1
+            future = asyncio.ensure_future(call())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._done(key, future))
+            return await asyncio.shield(future)
+
+        self.coalesced += 1
+        if fallback is None:
+            return await asyncio.shield(future)
+
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            return await fallback()
+
+    def _done(self, key: Hashable, future: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        if not future.cancelled():
+            # Retrieves the error, so that a call whose waiters were all cancelled isn't logged as never retrieved
+            future.exception()
+
+    def stats(self) -> dict[str, int]:
+        return {'upstream': self.upstream, 'coalesced': self.coalesced, 'in_flight': len(self._in_flight)}
+
+
+class TransportRegistry:
+    """
+    A process-wide registry of transports keyed by (endpoint, proxy).
+
+    Attributes:
+        config (TransportConfig): the settings applied to new transports.
+        limiters (RateLimiterRegistry): the rate limiters of the endpoints.
+        coalescer (RequestCoalescer): the coalescer of identical in-flight reads.
+        hits (int): the number of times an existing transport was reused.
+        misses (int): the number of times a new transport was created.
+        evictions (int): the number of transports closed as idle or over the limit.
+        connections_created (int): the number of TCP connections opened.
+        connections_reused (int): the number of requests served by an already open connection.
+
+    """
+    config: TransportConfig
+    limiters: RateLimiterRegistry
+    coalescer: RequestCoalescer
+    hits: int
+    misses: int
+    evictions: int
+    connections_created: int
+    connections_reused: int
+
+    def __init__(self, config: TransportConfig | None = None, limiters: RateLimiterRegistry | None = None) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            config (Optional[TransportConfig]): the transport settings. (default settings)
+            limiters (Optional[RateLimiterRegistry]): the rate limiters of the endpoints. (the process-wide ones)
+
+        """
+        self.config = config or TransportConfig()
+        self.limiters = limiters or rate_limiters
+        self.coalescer = RequestCoalescer()
+        self._transports: OrderedDict[tuple[str, str | None], Transport] = OrderedDict()
+        self._last_eviction = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    def configure(self, **kwargs) -> None:
+        """
+        Change the transport settings. Transports that are already open keep their previous settings.
+
+        Args:
+            **kwargs: fields of TransportConfig.
+
+        """
+        for key, value in kwargs.items():
+            if not hasattr(self.config, key):
+                raise ValueError(f'Unknown transport setting: {key}')
+
+            setattr(self.config, key, value)
+
+    def get(self, endpoint: str, proxy: str | None = None) -> Transport:
+        """
+        Borrow a transport for the endpoint and proxy, creating it if there is none.
+
+        Args:
+            endpoint (str): the RPC endpoint URL.
+            proxy (Optional[str]): the proxy URL. (None)
+
+        Returns:
+            Transport: the shared transport.
+
+        """
+        key = (endpoint, proxy)
+        transport = self._transports.get(key)
+        if transport:
+            self.hits += 1
+            self._transports.move_to_end(key)
+
+        else:
+            self.misses += 1
+            transport = Transport(endpoint=endpoint, proxy=proxy, config=self.config, registry=self)
+            self._transports[key] = transport
+
+        self.evict()
+        return transport
+
+    def evict(self) -> None:
+        """
+        Close transports that were idle for longer than 'idle_timeout' and the least recently used ones over
+            'max_transports'.
+        """
+        now = time.monotonic()
+        evicted = []
+        while len(self._transports) > self.config.max_transports:
+            key, transport = next(iter(self._transports.items()))
+            if transport.in_flight:
+                break
+
+            evicted.append(self._transports.pop(key))
+
+        if now - self._last_eviction > min(self.config.idle_timeout, 60):
+            self._last_eviction = now
+            for key, transport in list(self._transports.items()):
+                if transport.is_idle(now):
+                    evicted.append(self._transports.pop(key))
+
+        for transport in evicted:
+            self.evictions += 1
+            if transport._loop and transport._loop.is_running():
+                transport._loop.create_task(transport.close())
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get the registry counters.
+
+        Returns:
+            Dict[str, int]: the counters.
+
+        """
+        return {
+            'transports': len(self._transports),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'connections_created': self.connections_created,
+            'connections_reused': self.connections_reused,
+            'coalesced': self.coalescer.coalesced,
+        }
+
+    async def close(self) -> None:
+        """
+        Close all transports.
+        """
+        transports = list(self._transports.values())
+        self._transports.clear()
+        for transport in transports:
+            await transport.close()
+
+
+transports = TransportRegistry()
+
+
+class PooledHTTPProvider(AsyncHTTPProvider):
+    """
+    An async HTTP provider that sends requests through a transport borrowed from the shared registry instead of
+        owning an HTTP session. If a router is given, requests go to the endpoint chosen by it.
+    """
+
+    def __init__(
+            self, endpoint_uri: URI | str, proxy: str | None = None, headers: dict[str, str] | None = None,
+            registry: TransportRegistry | None = None, router: EndpointRouter | None = None
+    ) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            endpoint_uri (Union[URI, str]): the RPC endpoint URL.
+            proxy (Optional[str]): the proxy URL. (None)
+            headers (Optional[Dict[str, str]]): the request headers. (default web3 headers)
+            registry (Optional[TransportRegistry]): the transport registry. (the process-wide one)
+            router (Optional[EndpointRouter]): the endpoint router of the network. (None)
+
+        """
+        super().__init__(endpoint_uri=endpoint_uri, request_kwargs={'headers': headers} if headers else None)
+        self.proxy = proxy
+        self.registry = registry or transports
+        self.router = router
+
+    @property
+    def transport(self) -> Transport:
+        return self.registry.get(self.endpoint_uri, self.proxy)
+
+    async def post(
+            self, data: bytes, hedge: bool = True, coalesce_key: Hashable | None = None, method: str | None = None
+    ) -> bytes:
+        """
+        Send an encoded request.
+
+        Args:
+            data (bytes): the encoded request body.
+            hedge (bool): whether the router may hedge the request. (True)
+            coalesce_key (Optional[Hashable]): the identity of a read that may share the upstream call with identical
+                in-flight reads of the same endpoints through the same proxy. (not shared)
+            method (Optional[str]): the JSON-RPC method the request is recorded under in the metrics. ('unknown')
+
+        Returns:
+            bytes: the raw response body.
+
+        """
+        if coalesce_key is not None:
+            # Reads through different proxies aren't shared: a dead proxy would fail the reads of every wallet that
+            # joined it, and the health of the other proxies wouldn't be seen by the proxy pool
+            return await self.registry.coalescer.run(
+                (self.router or self.endpoint_uri, self.proxy, coalesce_key),
+                lambda: self.post(data, hedge=hedge, method=method)
+            )
+
+        headers = self.get_request_kwargs()['headers']
+        if self.router:
+            return await self.router.post(data, headers=headers, proxy=self.proxy, hedge=hedge, method=method)
+
+        return await self.transport.post(data, headers=headers, method=method)
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        request_data = self.encode_rpc_request(method, params)
+        coalesce_key = None
+        if method not in WRITE_METHODS and method not in STATEFUL_METHODS:
+            # The request ID differs between identical requests, so the key is made of the method and params
+            coalesce_key = (method, json.dumps(params, sort_keys=True, default=str))
+
+        raw_response = await self.post(
+            request_data, hedge=method not in WRITE_METHODS, coalesce_key=coalesce_key, method=method
+        )
+        return self.decode_rpc_response(raw_response)
@@ -10,7 +10,8 @@ def join_path(path: str | tuple | list) -> str:
 
 def read_json(path: str | tuple | list, encoding: str | None = None) -> list | dict:
     path = join_path(path)
-    return json.load(open(path, encoding=encoding))
+    with open(path, encoding=encoding) as f:
+        return json.load(f)
 
 
 def touch(path: str | tuple | list, file: bool = False) -> bool:
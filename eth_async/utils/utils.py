@@ -78,4 +78,5 @@ def api_key_required(func):
 
 def read_json(path: str | tuple | list, encoding: str | None = None) -> list | dict:
     path = join_path(path)
-    return json.load(open(path, encoding=encoding))
\ No newline at end of file
+    with open(path, encoding=encoding) as f:
+        return json.load(f)
\ No newline at end of file
@@ -53,8 +53,13 @@
 #
 #             raise exceptions.HTTPException(response=response, status_code=status_code)
 
+import time
+from urllib.parse import urlsplit
+
 from curl_cffi.requests import AsyncSession
 from eth_async import exceptions
+from eth_async.metrics import metrics
+from eth_async.rate_limit import rate_limiters, is_rate_limit_error, parse_retry_after
 
 
 def aiohttp_params(params: dict[str, ...] | None) -> dict[str, str | int | float] | None:
@@ -87,7 +92,8 @@ def aiohttp_params(params: dict[str, ...] | None) -> dict[str, str | int | float
 
 async def async_get(url: str, headers: dict | None = None, **kwargs) -> dict | None:
     """
-    Make a GET request and check if it was successful.
+    Make a GET request at the rate allowed by the rate limiter of the URL and check if it was successful. Rate
+        limited requests and server errors (5xx) are retried after a rate cut.
 
     Args:
         url (str): a URL.
@@ -98,15 +104,49 @@ async def async_get(url: str, headers: dict | None = None, **kwargs) -> dict | N
         Optional[dict]: received dictionary in response.
 
     """
-    async with AsyncSession() as session:
-        response = await session.get(
-            url=url,
-            headers=headers,
-            **kwargs
-        )
+    limiter = rate_limiters.get(url)
+    split_url = urlsplit(url)
+    name = f'GET {split_url.netloc}{split_url.path}'
+    proxy = kwargs.get('proxy')
+    retry_after = None
+    for _ in range(limiter.max_retries + 1):
+        await limiter.acquire()
+        started = time.perf_counter()
+        try:
+            async with AsyncSession() as session:
+                response = await session.get(
+                    url=url,
+                    headers=headers,
+                    **kwargs
+                )
+        except Exception:
+            metrics.observe('http', name, time.perf_counter() - started, error=True, endpoint=url, proxy=proxy)
+            raise
+
         status_code = response.status_code
+        metrics.observe(
+            'http', name, time.perf_counter() - started, error=status_code >= 400, endpoint=url, proxy=proxy
+        )
+        if status_code == 429 or status_code >= 500:
+            # A failing server is backed off like a rate limiting one, a higher rate would only add to its load
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            limiter.on_rate_limited(retry_after)
+            continue
+
         response = response.json()
+        if isinstance(response, dict) and is_rate_limit_error(response):
+            limiter.on_rate_limited()
+            continue
+
+        if status_code < 400:
+            limiter.on_success()
+
         if status_code <= 201:
             return response
         raise exceptions.HTTPException(response=response, status_code=status_code)
 
+    if status_code >= 500:
+        raise exceptions.HTTPException(status_code=status_code)
+
+    raise exceptions.RateLimited(endpoint=url, retry_after=retry_after)
+
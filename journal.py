@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import os
+import time
+import sqlite3
+
+# Statuses of an action after which the wallet is skipped on a rerun
+COMPLETED = frozenset({'confirmed', 'claimed', 'already_claimed'})
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS actions (
+    wallet TEXT NOT NULL,
+    action TEXT NOT NULL,
+    status TEXT NOT NULL,
+    reason TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (wallet, action)
+);
+CREATE TABLE IF NOT EXISTS txs (
+    tx_hash TEXT PRIMARY KEY,
+    wallet TEXT NOT NULL,
+    action TEXT NOT NULL,
+    final INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS txs_wallet_action ON txs (wallet, action);
+'''
+
+
+class Journal:
+    """
+    A persistent record of per-wallet actions and their transactions, so a rerun skips completed wallets and waits for
+        transactions sent before a crash instead of sending them again. Every write is committed at once, the file is
+        in WAL mode, so several processes may share it.
+
+    Action statuses:
+        - 'pending': transactions were sent, the action isn't confirmed yet.
+        - 'confirmed': the final transaction of the action is mined successfully.
+        - 'claimed': the faucet accepted the claim.
+        - 'already_claimed': the faucet was claimed before.
+        - 'failed': the action failed, the reason is recorded, it's retried on a rerun.
+
+    Attributes:
+        path (str): the SQLite database path.
+
+    """
+    path: str
+
+    def __init__(self, path: str) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            path (str): the SQLite database path, it's created if it doesn't exist.
+
+        """
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+
+    def status(self, wallet: str, action: str) -> str | None:
+        """
+        Get the status of an action.
+
+        Args:
+            wallet (str): the wallet address.
+            action (str): the action name, e.g. 'supply_mbtc'.
+
+        Returns:
+            Optional[str]: the status or None if the action wasn't started.
+
+        """
+        row = self._db.execute(
+            'SELECT status FROM actions WHERE wallet = ? AND action = ?', (wallet.lower(), action)
+        ).fetchone()
+        return row[0] if row else None
+
+    def is_completed(self, wallet: str, action: str) -> bool:
+        return self.status(wallet, action) in COMPLETED
+
+    def record(self, wallet: str, action: str, status: str, reason: str | None = None) -> None:
+        """
+        Record the status of an action.
+
+        Args:
+            wallet (str): the wallet address.
+            action (str): the action name.
+            status (str): the status.
+            reason (Optional[str]): the reason of a failure. (None)
+
+        """
+        self._db.execute(
+            'INSERT INTO actions (wallet, action, status, reason, updated_at) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (wallet, action) DO UPDATE SET status = excluded.status, reason = excluded.reason, '
+            'updated_at = excluded.updated_at',
+            (wallet.lower(), action, status, reason, time.time())
+        )
+
+    def record_tx(self, wallet: str, action: str, tx_hash: str, final: bool = True) -> None:
+        """
+        Record a sent transaction of an action and mark the action pending.
+
+        Args:
+            wallet (str): the wallet address.
+            action (str): the action name.
+            tx_hash (str): the transaction hash.
+            final (bool): whether the action is completed once the transaction is mined, False for preparatory
+                transactions such as approvals. (True)
+
+        """
+        now = time.time()
+        with self._db:
+            self._db.execute('BEGIN')
+            self._db.execute(
+                'INSERT OR REPLACE INTO txs (tx_hash, wallet, action, final, status, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (tx_hash, wallet.lower(), action, int(final), 'pending', now)
+            )
+            self._db.execute(
+                'INSERT INTO actions (wallet, action, status, reason, updated_at) VALUES (?, ?, ?, NULL, ?) '
+                'ON CONFLICT (wallet, action) DO UPDATE SET status = excluded.status, reason = NULL, '
+                'updated_at = excluded.updated_at',
+                (wallet.lower(), action, 'pending', now)
+            )
+
+    def update_tx(self, tx_hash: str, status: str) -> None:
+        """
+        Record the outcome of a transaction.
+
+        Args:
+            tx_hash (str): the transaction hash.
+            status (str): 'confirmed', 'reverted' or 'dropped'.
+
+        """
+        self._db.execute('UPDATE txs SET status = ?, updated_at = ? WHERE tx_hash = ?', (status, time.time(), tx_hash))
+
+    def pending_txs(self, wallet: str, action: str) -> list[tuple[str, bool]]:
+        """
+        Get transactions of an action that were sent but not seen mined.
+
+        Args:
+            wallet (str): the wallet address.
+            action (str): the action name.
+
+        Returns:
+            List[Tuple[str, bool]]: pairs of the transaction hash and whether it's final, in the order of sending.
+
+        """
+        rows = self._db.execute(
+            "SELECT tx_hash, final FROM txs WHERE wallet = ? AND action = ? AND status = 'pending' ORDER BY rowid",
+            (wallet.lower(), action)
+        ).fetchall()
+        return [(tx_hash, bool(final)) for tx_hash, final in rows]
+
+    def counts(self, action: str | None = None) -> dict[str, int]:
+        """
+        Count actions by status.
+
+        Args:
+            action (Optional[str]): the action name. (all actions)
+
+        Returns:
+            Dict[str, int]: the number of actions by status.
+
+        """
+        if action is None:
+            rows = self._db.execute('SELECT status, COUNT(*) FROM actions GROUP BY status')
+        else:
+            rows = self._db.execute('SELECT status, COUNT(*) FROM actions WHERE action = ? GROUP BY status', (action,))
+
+        return dict(rows.fetchall())
+
+    def close(self) -> None:
+        self._db.close()
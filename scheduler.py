@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import time
+import signal
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable
+
+from loguru import logger
+
+from eth_async.metrics import metrics
+
+
+@dataclass
+class Job:
+    """
+    An item being processed by the scheduler.
+
+    Attributes:
+        item (Any): the item.
+        attempt (int): the number of the attempt, starting from 1.
+        last_attempt (bool): whether the item isn't retried if this attempt fails.
+        label (Optional[str]): how the item is named in logs, the handler may set it, e.g. to the wallet address.
+        expires_at (Optional[float]): the event loop time the attempt runs out of time at, so that the handler can tell
+            the deadline from a cancellation of the run.
+
+    """
+    item: Any
+    attempt: int = 1
+    last_attempt: bool = True
+    label: str | None = None
+    expires_at: float | None = None
+
+    def expired(self) -> bool:
+        """
+        Check if the attempt ran out of time.
+
+        Returns:
+            bool: True if the attempt has a deadline and it passed.
+
+        """
+        return self.expires_at is not None and asyncio.get_running_loop().time() >= self.expires_at
+
+
+class Scheduler:
+    """
+    Processes items with a fixed number of long-lived workers that take them from a queue. Items are read from the
+        source only as there is room in the queue, so the source may be a lazy iterable of any size. An attempt that
+        raises an exception or runs longer than the deadline is retried at the back of the queue.
+
+    The first Ctrl-C (SIGINT) stops taking new items and waits for the items in progress, the second one cancels them.
+        Where signal handlers aren't supported (Windows), Ctrl-C cancels the run at once.
+
+    Attributes:
+        name (str): the scheduler name, a label of its metrics and the prefix of its logs.
+        workers (int): the number of workers.
+        deadline (Optional[float]): the time limit of an attempt, in seconds.
+        retries (int): the number of times a failed item is retried.
+        queue_size (int): the maximum number of items read ahead of the workers.
+        progress_interval (float): how often the progress is logged, in seconds.
+        taken (int): the number of items read from the source.
+        done (int): the number of items processed successfully.
+        failed (int): the number of items that failed every attempt with an exception.
+        timed_out (int): the number of items whose last attempt ran out of time.
+        retried (int): the number of retried attempts.
+        cancelled (int): the number of items cancelled in progress.
+        in_flight (int): the number of items being processed.
+        stopped (bool): whether the run was stopped or cancelled before the source ended.
+
+    """
+    name: str
+    workers: int
+    deadline: float | None
+    retries: int
+    queue_size: int
+    progress_interval: float
+    taken: int
+    done: int
+    failed: int
+    timed_out: int
+    retried: int
+    cancelled: int
+    in_flight: int
+    stopped: bool
+
+    def __init__(
+            self, handler: Callable[[Job], Awaitable[Any]], workers: int, name: str = 'wallets',
+            deadline: float | None = None, retries: int = 0, queue_size: int | None = None,
+            progress_interval: float = 10
+    ) -> None:
+        """
+        Initialize the class.
+
+        Args:
+            handler (Callable[[Job], Awaitable[Any]]): the coroutine function that processes an item, it raises an
+                exception if the item should be retried.
+            workers (int): the number of workers.
+            name (str): the scheduler name, a label of its metrics and the prefix of its logs. ('wallets')
+            deadline (Optional[float]): the time limit of an attempt, in seconds. (no limit)
+            retries (int): the number of times a failed item is retried. (0)
+            queue_size (Optional[int]): the maximum number of items read ahead of the workers. (the number of
+                workers)
+            progress_interval (float): how often the progress is logged, in seconds, 0 to disable it. (10)
+
+        """
+        if workers <= 0:
+            raise ValueError('The number of workers must be positive')
+
+        self.handler = handler
+        self.name = name
+        self.workers = workers
+        self.deadline = deadline
+        self.retries = retries
+        self.queue_size = queue_size or workers
+        self.progress_interval = progress_interval
+        self.taken = 0
+        self.done = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.retried = 0
+        self.cancelled = 0
+        self.in_flight = 0
+        self.stopped = False
+        self._queue: asyncio.Queue[Job | None] | None = None
+        self._stopping: asyncio.Event | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._started = 0.
+        metrics.set_gauge('scheduler_in_flight', lambda: self.in_flight, scheduler=name)
+        metrics.set_gauge('scheduler_queued', lambda: self._queue.qsize() if self._queue else 0, scheduler=name)
+
+    async def run(self, items: Iterable[Any]) -> dict[str, int | bool]:
+        """
+        Process all items.
+
+        Args:
+            items (Iterable[Any]): the items, read lazily. An exception of the iterable stops the run and is raised
+                once the items in progress are processed.
+
+        Returns:
+            Dict[str, Union[int, bool]]: the final counters, see 'stats'.
+
+        """
+        # Retried items are put back without waiting, so the queue itself is unbounded and the reader waits for
+        # a slot instead: an item holds its slot until its last attempt ends
+        self._queue = asyncio.Queue()
+        self._stopping = asyncio.Event()
+        slots = asyncio.Semaphore(self.workers + self.queue_size)
+        self._started = time.monotonic()
+
+        async def worker() -> None:
+            while True:
+                job = await self._queue.get()
+                if job is None:
+                    return
+
+                if await self._attempt(job):
+                    slots.release()
+                else:
+                    job.attempt += 1
+                    job.last_attempt = job.attempt > self.retries
+                    self._queue.put_nowait(job)
+
+        async def read() -> None:
+            error = None
+            try:
+                for item in items:
+                    await slots.acquire()
+                    if self._stopping.is_set():
+                        slots.release()
+                        break
+
+                    self.taken += 1
+                    self._queue.put_nowait(Job(item=item, last_attempt=not self.retries))
+            except Exception as e:
+                error = e
+
+            # Workers stop once every taken item is processed
+            for _ in range(self.workers + self.queue_size):
+                await slots.acquire()
+
+            for _ in range(self.workers):
+                self._queue.put_nowait(None)
+
+            if error:
+                raise error
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.workers)]
+        reader = asyncio.create_task(read())
+        self._tasks = [reader, *workers]
+        if self.progress_interval:
+            self._tasks.append(asyncio.create_task(self._log_progress()))
+
+        restore_signals = self._handle_signals()
+        try:
+            await asyncio.gather(*workers, return_exceptions=True)
+            if not reader.cancelled():
+                # Raises the exception of the source if it failed
+                await reader
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+        finally:
+            restore_signals()
+            for task in self._tasks:
+                task.cancel()
+
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        self._log(final=True)
+        return self.stats()
+
+    async def _attempt(self, job: Job) -> bool:
+        """
+        Process an item once.
+
+        Args:
+            job (Job): the item.
+
+        Returns:
+            bool: False if the item should be retried.
+
+        """
+        self.in_flight += 1
+        timeout = asyncio.timeout(self.deadline)
+        try:
+            async with timeout:
+                job.expires_at = timeout.when()
+                await self.handler(job)
+
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+        except Exception as e:
+            # A timeout of a request inside the handler is a failure, only the deadline is a time out
+            if isinstance(e, TimeoutError) and timeout.expired():
+                result, reason = 'timed_out', f'Ran out of {self.deadline} s'
+            else:
+                result, reason = 'failed', f'{type(e).__name__}: {e}'
+
+            label = f' | {job.label}' if job.label else ''
+            if not job.last_attempt:
+                self.retried += 1
+                metrics.inc('scheduler_attempts', scheduler=self.name, result='retried')
+                logger.warning(f'{reason}, retrying (attempt {job.attempt}){label}')
+                return False
+
+            if result == 'timed_out':
+                self.timed_out += 1
+            else:
+                self.failed += 1
+
+            metrics.inc('scheduler_attempts', scheduler=self.name, result=result)
+            logger.error(f'{reason}{label}')
+            return True
+
+        finally:
+            self.in_flight -= 1
+
+        self.done += 1
+        metrics.inc('scheduler_attempts', scheduler=self.name, result='done')
+        return True
+
+    def stop(self) -> None:
+        """
+        Stop taking new items, the items in progress and the queued ones are processed.
+        """
+        if self._stopping and not self._stopping.is_set():
+            self._stopping.set()
+            self.stopped = True
+            logger.warning(
+                f'{self.name}: stopping, waiting for {self.in_flight} in progress. Press Ctrl-C again to cancel them'
+            )
+
+    def cancel(self) -> None:
+        """
+        Cancel the items in progress and stop taking new items, the run returns the counters at once.
+        """
+        if self.in_flight:
+            logger.warning(f'{self.name}: cancelling {self.in_flight} in progress')
+
+        self.stopped = True
+        for task in self._tasks:
+            task.cancel()
+
+    def _handle_signals(self) -> Callable[[], None]:
+        loop = asyncio.get_running_loop()
+
+        def on_interrupt() -> None:
+            if self._stopping.is_set():
+                self.cancel()
+            else:
+                self.stop()
+
+        previous = signal.getsignal(signal.SIGINT)
+        try:
+            loop.add_signal_handler(signal.SIGINT, on_interrupt)
+        except (NotImplementedError, RuntimeError, ValueError):
+            # Windows or not the main thread: KeyboardInterrupt cancels the run
+            return lambda: None
+
+        def restore() -> None:
+            loop.remove_signal_handler(signal.SIGINT)
+            # The handler of asyncio.run that cancels the main task
+            signal.signal(signal.SIGINT, previous)
+
+        return restore
+
+    async def _log_progress(self) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            self._log()
+
+    def _log(self, final: bool = False) -> None:
+        elapsed = time.monotonic() - self._started
+        finished = self.done + self.failed + self.timed_out
+        message = (
+            f'{self.name}: {finished} finished ({self.done} done, {self.failed} failed, {self.timed_out} timed out, '
+            f'{self.retried} retried), {self.in_flight} in progress'
+        )
+        if elapsed:
+            message += f', {finished / elapsed:.1f}/s'
+
+        logger.info(message if final else f'{message}, {self.taken} taken')
+
+    def stats(self) -> dict[str, int | bool]:
+        """
+        Get the counters.
+
+        Returns:
+            Dict[str, Union[int, bool]]: the numbers of items taken, done, failed, timed out, cancelled and in
+                progress, of retried attempts, and whether the run was stopped.
+
+        """
+        return {
+            'taken': self.taken,
+            'done': self.done,
+            'failed': self.failed,
+            'timed_out': self.timed_out,
+            'retried': self.retried,
+            'cancelled': self.cancelled,
+            'in_flight': self.in_flight,
+            'stopped': self.stopped,
+        }
@@ -1,19 +1,99 @@
 import time
+import asyncio
+from typing import Any
+
 from fake_useragent import UserAgent
 from loguru import logger
+from web3.exceptions import TimeExhausted
 
 from eth_async.client import Client
 from eth_async.data.models import TokenAmount
+from eth_async.multicall import Multicall
+from eth_async.transactions import Tx
 from eth_async.utils.web_requests_old import async_get
+from journal import Journal
 
 
 class Base:
-    def __init__(self, client: Client, api_key: str, proxy_info: dict):
+    quote_api_url = 'https://ebey72gfe6.execute-api.us-east-1.amazonaws.com/prod/quote'
+
+    def __init__(self, client: Client, api_key: str, proxy_info: dict, journal: Journal | None = None):
         self.client = client
         self.api_key = api_key,
         self.proxy_info = proxy_info
+        self.journal = journal
         self.random_useragent = UserAgent().chrome
 
+    def journal_record(self, action: str, status: str, reason: str | None = None) -> None:
+        if self.journal:
+            self.journal.record(self.client.account.address, action, status, reason)
+
+    def journal_tx(self, action: str, tx: Tx, final: bool = True) -> None:
+        if self.journal:
+            self.journal.record_tx(self.client.account.address, action, tx.hash.hex(), final)
+
+    async def wait_for_receipts(self, txs: list[Tx], timeout: int | float = 300) -> list[dict[str, Any]]:
+        """
+            Waits for the receipts of the transactions and records their outcome in the journal.
+
+            Args:
+                txs (list[Tx]): The sent transactions.
+                timeout (int | float): The receipt waiting timeout. Default is 300 seconds.
+
+            Returns:
+                list[dict[str, Any]]: The receipts in the order of the transactions.
+
+            Raises:
+                TimeExhausted: If a receipt isn't received in time, the transaction is recorded as dropped.
+        """
+        async def wait(tx: Tx) -> dict[str, Any]:
+            try:
+                receipt = await tx.wait_for_receipt(client=self.client, timeout=timeout)
+            except TimeExhausted:
+                if self.journal:
+                    self.journal.update_tx(tx.hash.hex(), 'dropped')
+                raise
+
+            if self.journal:
+                self.journal.update_tx(tx.hash.hex(), 'confirmed' if receipt.get('status', 1) else 'reverted')
+            return receipt
+
+        return list(await asyncio.gather(*(wait(tx) for tx in txs)))
+
+    async def resume_pending(self, action: str) -> bool:
+        """
+            Waits for the transactions of the action that were sent before a restart instead of sending them again.
+
+            Args:
+                action (str): The action name, e.g. 'supply_mbtc'.
+
+            Returns:
+                bool: True if the final transaction of the action is mined successfully and the action is completed,
+                    False if the action has to be run (again).
+        """
+        if not self.journal:
+            return False
+
+        pending = self.journal.pending_txs(self.client.account.address, action)
+        if not pending:
+            return False
+
+        logger.info(f'Waiting for {len(pending)} transactions of the previous run | {self.client.account.address}')
+        completed = False
+        for tx_hash, final in pending:
+            try:
+                receipt = (await self.wait_for_receipts([Tx(tx_hash=tx_hash)]))[0]
+            except TimeExhausted:
+                logger.warning(f'Transaction {tx_hash} of the previous run was dropped | {self.client.account.address}')
+                continue
+
+            completed = completed or (final and bool(receipt.get('status', 1)))
+
+        if completed:
+            self.journal_record(action, 'confirmed')
+
+        return completed
+
     async def get_amount_out(self, amount: TokenAmount, to_ibgt: bool = True) -> TokenAmount:
         """
             Requests the token amount output (either iBGT or the reverse) from the API.
@@ -67,7 +147,7 @@ class Base:
 
         while attempt < max_attempts:
             try:
-                response = await async_get(url='https://ebey72gfe6.execute-api.us-east-1.amazonaws.com/prod/quote',
+                response = await async_get(url=self.quote_api_url,
                                            headers=headers,
                                            params=params,
                                            proxy=self.client.proxy)
@@ -83,7 +163,7 @@ class Base:
                     logger.warning('Attempts are over')
 
     async def approve_interface(self, token_address, spender, amount: TokenAmount | None = None,
-                                station_max: bool | None = False) -> bool:
+                                station_max: bool | None = False, wait: bool = True) -> bool | Tx:
         """
            Approves a spender to spend a certain amount of a token on behalf of the account.
 
@@ -92,11 +172,25 @@ class Base:
                spender (str): The address of the spender (contract or wallet).
                amount (TokenAmount | None): The amount to approve. If None, the entire balance will be approved.
                station_max (bool | None): Whether to approve the maximum amount at the station. Default is False.
+               wait (bool): Whether to wait for the approval receipt. Default is True.
 
            Returns:
                bool: True if approval was successful, False otherwise.
+               Tx: The sent approval transaction, if 'wait' is False and a new approval was needed.
        """
-        balance = await self.client.wallet.balance(token=token_address)
+        owner = self.client.account.address
+        balance, approved = await self.client.multicall.aggregate([
+            Multicall.balance_of(token=token_address, owner=owner),
+            Multicall.allowance(token=token_address, owner=owner, spender=spender),
+        ])
+        if balance is None or approved is None:
+            logger.error(f'Failed to read the balance and allowance of token {token_address} | {owner}')
+            return False
+
+        decimals = await self.client.transactions.get_decimals(contract=token_address)
+        balance = TokenAmount(amount=balance, decimals=decimals, wei=True)
+        approved = TokenAmount(amount=approved, decimals=decimals, wei=True)
+
         if balance.Wei <= 0:
             logger.warning(f'No balance available for token {token_address} | {self.client.account.address}')
             return False
@@ -108,12 +202,6 @@ class Base:
             return False
 
         # Check if approval is already sufficient
-        approved = await self.client.transactions.approved_amount(
-            token=token_address,
-            spender=spender,
-            owner=self.client.account.address
-        )
-
         if amount.Wei <= approved.Wei:
             logger.info(f'Approval already sufficient for spender {spender} | {self.client.account.address}')
             return True
@@ -126,6 +214,8 @@ class Base:
                 amount=amount,
                 station_max=station_max
             )
+            if not wait:
+                return tx
 
             # Wait for receipt to confirm transaction
             receipt = await tx.wait_for_receipt(client=self.client, timeout=300)
@@ -3,28 +3,43 @@ from typing import Literal
 
 from web3.exceptions import ContractLogicError
 from web3.types import TxParams
-from capmonstercloudclient import CapMonsterClient, ClientOptions
-from capmonstercloudclient.requests import TurnstileRequest
-import httpx
 
 from data.models import Contracts
+from eth_async.calldata import Calldata
 from eth_async.data.models import TokenAmount
+from eth_async.metrics import metrics
+from eth_async.multicall import Multicall
+from eth_async.transactions import Tx
 from tasks.base import Base
 from utils import logger
 
+# Calls of the lending pool and of the gateway that wraps the native coin, the asset and the pool are bound per token
+SUPPLY = Calldata('supply(address,uint256,address,uint16)')
+DEPOSIT_ETH = Calldata('depositETH(address,address,uint16)')
+
 
 class Hyperlend(Base):
+    # A supply sent before its approval is mined can't be estimated, it gets the largest estimate of an earlier supply
+    # of the token with this margin. Until a supply is estimated, the approval is awaited first.
+    supply_gas_margin = 1.2
+    supply_gas_estimates: dict[str, int] = {}
+    faucet_page_url = 'https://testnet.hyperlend.finance/dashboard'
+    faucet_api_url = 'https://api.hyperlend.finance/ethFaucet'
+    captcha_website_key = '0x4AAAAAAA2Qg1SB87LOUhrG'
+    # CapMonster API URL, the default one of the client if it's None
+    capmonster_url: str | None = None
     token_data = {
         'BTC': {
-            'data': '0x617ba037000000000000000000000000453b63484b11bbf0b61fc7e854f8dac7bde7d458',
+            'token': '0x453b63484b11bbF0b61fC7E854f8DAC7bdE7d458',
+            'call': SUPPLY.bind('0x453b63484b11bbF0b61fC7E854f8DAC7bdE7d458'),
             'pool': '0x1e85CCDf0D098a9f55b82F3E35013Eda235C8BD8'
         },
         'ETH': {
-            'data': '0x474cf53d000000000000000000000000e0bdd7e8b7bf5b15dcda6103fcbba82a460ae2c7',
+            'call': DEPOSIT_ETH.bind('0xe0bdd7e8b7bf5b15dcda6103fcbba82a460ae2c7'),
             'pool': '0xd2b21707d7a574D6A744FB600826770F9FBA6f80'
         },
         'HYPE': {
-            'data': '0x474cf53d00000000000000000000000068cd2d3503cb4a334522e557c5ba1a0d5fe56bfc',
+            'call': DEPOSIT_ETH.bind('0x68cd2d3503cb4a334522e557c5ba1a0d5fe56bfc'),
             'pool': '0x272C635e84fC122239933bE56089C99653FCd255'
         },
     }
@@ -55,27 +70,35 @@ class Hyperlend(Base):
         current_balance = await self.client.wallet.balance()
 
         if current_balance.Wei > 0:
+            metrics.inc('faucet_claims', faucet='hype', result='already_claimed')
+            self.journal_record('claim_hype_faucet', 'already_claimed')
             logger.warning(f'Already claimed, once per wallet! | {self.client.account.address} | '
                            f'{round((await self.client.wallet.balance()).Ether, 6)} HYPE')
             return
 
-        faucet_url = 'https://testnet.hyperlend.finance/dashboard'
-        website_key = '0x4AAAAAAA2Qg1SB87LOUhrG'
+        # Imported here, since only the HYPE faucet needs them
+        import httpx
+        from capmonstercloudclient import CapMonsterClient, ClientOptions
+        from capmonstercloudclient.requests import TurnstileRequest
+
         logger.info(f'Starting HYPE faucet claim | {self.client.account.address}')
 
         client_options = ClientOptions(api_key=str(self.api_key[0]))
+        if self.capmonster_url:
+            client_options.service_url = self.capmonster_url
         cap_monster_client = CapMonsterClient(options=client_options)
 
         turnstile_request = TurnstileRequest(
-            websiteURL=faucet_url,
-            websiteKey=website_key,
+            websiteURL=self.faucet_page_url,
+            websiteKey=self.captcha_website_key,
             proxyType='http',
             proxyAddress=str(self.proxy_info.get('ip')),
             proxyPort=int(self.proxy_info.get('port')),
             proxyLogin=str(self.proxy_info.get('username')),
             proxyPassword=str(self.proxy_info.get('password'))
         )
-        responses = await cap_monster_client.solve_captcha(turnstile_request)
+        with metrics.timer('http', 'CapMonster solve_captcha', endpoint=client_options.service_url):
+            responses = await cap_monster_client.solve_captcha(turnstile_request)
         logger.info(f'Received CAPTCHA response from Capmonster | {self.client.account.address}')
         solution = responses['token']
         logger.info(f'Sending claim request | {self.client.account.address}')
@@ -110,14 +133,18 @@ class Hyperlend(Base):
             attempt = 0
             while attempt <= max_attempts:
                 try:
-                    response = await client.post('https://api.hyperlend.finance/ethFaucet',
-                                                 headers=headers,
-                                                 json=json_data)
+                    with metrics.timer('http', 'POST api.hyperlend.finance/ethFaucet',
+                                       endpoint=self.faucet_api_url, proxy=self.client.proxy):
+                        response = await client.post(self.faucet_api_url,
+                                                     headers=headers,
+                                                     json=json_data)
                     break
                 except Exception as e:
                     logger.warning(f'Failed request, {attempt}/{max_attempts} attempt | {self.client.account.address}')
                     attempt += 1
                     if attempt == max_attempts:
+                        metrics.inc('faucet_claims', faucet='hype', result='failed')
+                        self.journal_record('claim_hype_faucet', 'failed', f'Failed request: {e}')
                         logger.error(f'Failed request: {e} | {self.client.account.address}')
                         return
                     await asyncio.sleep(5)
@@ -125,12 +152,18 @@ class Hyperlend(Base):
         result = response.json()
         msg = result.get("response", "")
         if isinstance(msg, dict) and msg.get('status') == 1:
+            metrics.inc('faucet_claims', faucet='hype', result='claimed')
+            self.journal_record('claim_hype_faucet', 'claimed')
             logger.success(f'Claimed native tokens | {self.client.account.address} | '
                            f'{round((await self.client.wallet.balance()).Ether, 6)} HYPE')
         elif 'user_already_claimed' in msg:
+            metrics.inc('faucet_claims', faucet='hype', result='already_claimed')
+            self.journal_record('claim_hype_faucet', 'already_claimed')
             logger.warning(f'Already claimed, once per wallet! | {self.client.account.address} | '
                            f'{round((await self.client.wallet.balance()).Ether, 6)} HYPE')
         else:
+            metrics.inc('faucet_claims', faucet='hype', result='failed')
+            self.journal_record('claim_hype_faucet', 'failed', str(msg))
             logger.error(f'{msg} | {self.client.account.address} | '
                          f'{round((await self.client.wallet.balance()).Ether, 6)} HYPE')
 
@@ -138,6 +171,9 @@ class Hyperlend(Base):
         logger.info(f'Starting MBTC faucet claim | {self.client.account.address}')
 
         failed_text = f'Failed to claim MBTC faucet'
+        if await self.resume_pending('claim_mbtc_faucet'):
+            logger.success(f'0.1 MBTC claimed in the previous run | {self.client.account.address}')
+            return
 
         tx_params = TxParams(
             to=Contracts.HYPERLEND_FAUCET.address,
@@ -148,80 +184,124 @@ class Hyperlend(Base):
             tx = await self.client.transactions.sign_and_send(tx_params=tx_params)
 
             if tx is None:
+                self.journal_record('claim_mbtc_faucet', 'failed', 'not sent')
                 logger.error(f'{failed_text}! | {self.client.account.address}')
                 return
 
-            receipt = await tx.wait_for_receipt(client=self.client, timeout=300)
+            self.journal_tx('claim_mbtc_faucet', tx)
+            receipt, = await self.wait_for_receipts([tx])
             if receipt:
-                logger.success(
-                    f'0.1 MBTC claimed | {tx.hash.hex()} | {self.client.account.address}')
+                if receipt.get('status', 1):
+                    self.journal_record('claim_mbtc_faucet', 'confirmed')
+                    logger.success(
+                        f'0.1 MBTC claimed | {tx.hash.hex()} | {self.client.account.address}')
+                else:
+                    self.journal_record('claim_mbtc_faucet', 'failed', 'reverted')
+                    logger.error(f'{failed_text}! Transaction reverted: {tx.hash.hex()} | {self.client.account.address}')
                 return
 
+            self.journal_record('claim_mbtc_faucet', 'failed', 'no receipt')
             logger.error(f'{failed_text}! | {self.client.account.address}')
 
         except ContractLogicError as e:
             if "already claimed" in str(e):
+                self.journal_record('claim_mbtc_faucet', 'already_claimed')
                 logger.warning(f'Already claimed MBTC faucet | {self.client.account.address}')
             else:
+                self.journal_record('claim_mbtc_faucet', 'failed', str(e))
                 logger.error(f"{e} | {self.client.account.address}")
         except Exception as e:
+            self.journal_record('claim_mbtc_faucet', 'failed', str(e))
             logger.error(f"{e} | {self.client.account.address}")
 
     async def supply_mbtc(self, amount: TokenAmount):
-        await self._supply(amount=amount, token_name='BTC')
+        await self._supply(amount=amount, token_name='BTC', action='supply_mbtc')
         return
 
     async def supply_eth(self, amount: TokenAmount):
-        await self._supply(amount=amount, token_name='ETH')
+        await self._supply(amount=amount, token_name='ETH', action='supply_eth')
         return
 
     async def supply_hype(self, amount: TokenAmount):
-        await self._supply(amount=amount, token_name='HYPE')
+        await self._supply(amount=amount, token_name='HYPE', action='supply_hype')
         return
 
-    async def _supply(self, amount: TokenAmount, token_name: Literal['BTC', 'ETH', 'HYPE']) -> None:
+    async def _supply(self, amount: TokenAmount, token_name: Literal['BTC', 'ETH', 'HYPE'], action: str) -> None:
         logger.info(f'Starting supply of {token_name} | {self.client.account.address}')
 
         failed_text = f'Failed to supply {token_name} on Hyperlend | {self.client.account.address}'
+        approve_tx = None
+        if await self.resume_pending(action):
+            logger.success(f'Supplied {token_name} on Hyperlend in the previous run | {self.client.account.address}')
+            return
 
-        native_balance = await self.client.wallet.balance()
+        # Read the native and the token balance in a single call
+        calls = [self.client.multicall.eth_balance(owner=self.client.account.address)]
+        if token_name == 'BTC':
+            calls.append(Multicall.balance_of(token=self.token_data['BTC']['token'], owner=self.client.account.address))
+        native_balance, *token_balance = await self.client.multicall.aggregate(calls)
+        if native_balance is None or None in token_balance:
+            self.journal_record(action, 'failed', 'balance not read')
+            logger.error(f'Failed to read balances for supply | {self.client.account.address}')
+            return
+
+        native_balance = TokenAmount(amount=native_balance, wei=True)
 
         if native_balance.Wei <= 0:
+            self.journal_record(action, 'failed', 'insufficient native balance')
             logger.error(f'Insufficient native balance for supply | {self.client.account.address}')
             return
 
         if token_name == 'BTC':
-            btc_balance = await self.client.wallet.balance(token='0x453b63484b11bbF0b61fC7E854f8DAC7bdE7d458')
+            decimals = await self.client.transactions.get_decimals(contract=self.token_data['BTC']['token'])
+            btc_balance = TokenAmount(amount=token_balance[0], decimals=decimals, wei=True)
+            if amount.decimals != decimals:
+                amount = TokenAmount(amount=amount.Ether, decimals=decimals)
 
             if btc_balance.Wei < amount.Wei:
+                self.journal_record(action, 'failed', 'insufficient MBTC balance')
                 logger.error(f'Insufficient MBTC balance for supply | {self.client.account.address}')
                 return
 
-            if await self.approve_interface(
-                    token_address=f'0x{self.token_data.get('BTC', '').get('data', '')[-40:]}',
-                    spender=self.token_data.get('BTC', '').get('pool', ''),
-                    station_max=True
-            ):
+            # Once a supply was estimated, the approval isn't awaited: the supply is sent right after it with the next
+            # local nonce
+            approval = await self.approve_interface(
+                token_address=self.token_data['BTC']['token'],
+                spender=self.token_data.get('BTC', '').get('pool', ''),
+                station_max=True,
+                wait=False
+            )
+            if isinstance(approval, Tx):
+                approve_tx = approval
+                self.journal_tx(action, approve_tx, final=False)
+                logger.info(f'Sent MBTC approval for pool | {self.client.account.address}')
+            elif approval:
                 logger.info(f'Approved MBTC for pool | {self.client.account.address}')
             else:
+                self.journal_record(action, 'failed', 'approval failed')
                 logger.error(f'Failed to approve MBTC | {self.client.account.address}')
                 return
 
-            data = (f'{self.token_data.get('BTC', '').get('data', '')}'
-                    f'{amount.Wei:064x}'
-                    f'{int(self.client.account.address, 16):064x}'
-                    f'{0:064x}')
+            if approve_tx and token_name not in self.supply_gas_estimates:
+                receipt, = await self.wait_for_receipts([approve_tx])
+                if not receipt.get('status', 1):
+                    self.journal_record(action, 'failed', 'approval reverted')
+                    logger.error(f'MBTC approval reverted: {approve_tx.hash.hex()} | {self.client.account.address}')
+                    return
+
+                approve_tx = None
+
+            data = self.token_data['BTC']['call'].encode_hex(amount.Wei, self.client.account.address, 0)
             pool = self.token_data.get('BTC', {}).get('pool', '')
             value = 0
 
         if token_name == 'ETH' or token_name == 'HYPE':
             if native_balance.Wei < amount.Wei:
+                self.journal_record(action, 'failed', f'insufficient {token_name} balance')
                 logger.error(f'Insufficient {token_name} balance for supply | {self.client.account.address}')
                 return
 
-            data = (f'{self.token_data.get(token_name, '').get('data', '')}'
-                    f'{int(self.client.account.address, 16):064x}'
-                    f'{0:064x}')
+            data = self.token_data[token_name]['call'].encode_hex(self.client.account.address, 0)
             pool = self.token_data.get(token_name, {}).get('pool', '')
             value = amount.Wei
 
@@ -230,18 +310,35 @@ class Hyperlend(Base):
             data=data,
             value=value
         )
+        if approve_tx:
+            # Gas can't be estimated until the approval is mined
+            tx_params['gas'] = int(self.supply_gas_estimates[token_name] * self.supply_gas_margin)
 
         tx = await self.client.transactions.sign_and_send(tx_params=tx_params)
 
         if tx is None:
+            self.journal_record(action, 'failed', 'not sent')
             return
         else:
-            receipt = await tx.wait_for_receipt(client=self.client, timeout=300)
-            if receipt:
+            if not approve_tx:
+                self.supply_gas_estimates[token_name] = max(
+                    self.supply_gas_estimates.get(token_name, 0), int(tx.params['gas'])
+                )
+
+            self.journal_tx(action, tx)
+            receipts = await self.wait_for_receipts([approve_tx, tx] if approve_tx else [tx])
+            if approve_tx and not receipts[0].get('status', 1):
+                self.journal_record(action, 'failed', 'approval reverted')
+                logger.error(f'MBTC approval reverted: {approve_tx.hash.hex()} | {self.client.account.address}')
+                return
+
+            if all(receipt and receipt.get('status', 1) for receipt in receipts):
+                self.journal_record(action, 'confirmed')
                 logger.success(
                     f'Supplied {amount.Ether} {token_name} on Hyperlend: {tx.hash.hex()} '
                     f'| {self.client.account.address}')
                 return
+            self.journal_record(action, 'failed', 'reverted')
             logger.error(f'{failed_text}! | {self.client.account.address}')
 
     # async def get_balances(self) -> None:
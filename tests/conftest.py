@@ -0,0 +1,44 @@
+import os
+import socket
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from aiohttp import web
+
+# Caches of the tests don't mix with the ones of real runs, it's set before eth_async reads it
+os.environ['ETH_ASYNC_CACHE_DIR'] = tempfile.mkdtemp(prefix='eth_async_tests_')
+
+from benchmarks.mock_chain import MockChain, MockConfig
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def local_node(
+        chain: MockChain | None = None, port: int | None = None
+) -> AsyncIterator[tuple[MockChain, str]]:
+    """
+    Serve the mock chain in the running event loop.
+
+    Args:
+        chain (Optional[MockChain]): the chain, e.g. with overridden handlers. (one without latency and failures)
+        port (Optional[int]): the port, e.g. to serve a chain again where a network points. (a free one)
+
+    Returns:
+        AsyncIterator[Tuple[MockChain, str]]: the chain and its URL.
+
+    """
+    chain = chain or MockChain(MockConfig(latency=0, jitter=0))
+    port = port or free_port()
+    runner = web.AppRunner(chain.app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    try:
+        yield chain, f'http://127.0.0.1:{port}/'
+    finally:
+        await runner.cleanup()
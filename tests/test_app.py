@@ -0,0 +1,102 @@
+import os
+import asyncio
+
+from eth_account import Account
+
+import app
+from eth_async.metrics import metrics
+from eth_async.transactions import NonceManager
+from journal import Journal
+from scheduler import Scheduler
+from tasks.hyperlend import Hyperlend
+
+
+async def hang(self) -> None:
+    await asyncio.sleep(10)
+
+
+def reason(journal: Journal, wallet: str) -> str | None:
+    row = journal._db.execute(
+        'SELECT reason FROM actions WHERE wallet = ? AND action = ?', (wallet.lower(), 'claim_mbtc_faucet')
+    ).fetchone()
+    return row[0] if row else None
+
+
+def process(journal: Journal):
+    async def handler(job) -> None:
+        await app.process_wallet(
+            job.item, None, '', 'claim_mbtc_faucet', journal=journal, job=job, check_proxy=False
+        )
+
+    return handler
+
+
+def test_timed_out_wallet_is_journaled(monkeypatch, tmp_path):
+    monkeypatch.setattr(Hyperlend, 'claim_mbtc_faucet', hang)
+    journal = Journal(str(tmp_path / 'journal.db'))
+    private_key = os.urandom(32).hex()
+
+    stats = asyncio.run(Scheduler(process(journal), workers=1, deadline=0.1, progress_interval=0).run([private_key]))
+
+    assert stats['timed_out'] == 1
+    address = Account.from_key(private_key).address
+    assert journal.status(address, 'claim_mbtc_faucet') == 'failed'
+    assert reason(journal, address) == 'timed out'
+
+
+def test_cancelled_wallet_is_journaled(monkeypatch, tmp_path):
+    monkeypatch.setattr(Hyperlend, 'claim_mbtc_faucet', hang)
+    journal = Journal(str(tmp_path / 'journal.db'))
+    private_key = os.urandom(32).hex()
+
+    async def scenario():
+        scheduler = Scheduler(process(journal), workers=1, progress_interval=0)
+        asyncio.get_running_loop().call_later(0.1, scheduler.cancel)
+        return await scheduler.run([private_key])
+
+    assert asyncio.run(scenario())['cancelled'] == 1
+    address = Account.from_key(private_key).address
+    assert reason(journal, address) == 'cancelled'
+
+
+def test_summary_counts_a_timed_out_wallet_once(monkeypatch, tmp_path):
+    monkeypatch.setattr(Hyperlend, 'claim_mbtc_faucet', hang)
+    monkeypatch.setattr(app.config, 'JOURNAL_PATH', str(tmp_path / 'journal.db'))
+    metrics.reset()
+
+    summary = asyncio.run(app.run(
+        wallets=[(os.urandom(32).hex(), None)], api_key='', selected_function='claim_mbtc_faucet',
+        max_concurrent_tasks=1, verify_proxies=False, wallet_timeout=0.1
+    ))
+
+    assert summary['results'] == {'timed_out': 1}
+    assert summary['wallets_per_second'] < 1 / 0.1
+
+
+def test_request_timeout_of_a_wallet_is_a_failure(monkeypatch, tmp_path):
+    async def time_out(self) -> None:
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(Hyperlend, 'claim_mbtc_faucet', time_out)
+    journal = Journal(str(tmp_path / 'journal.db'))
+
+    for deadline in (None, 10):
+        scheduler = Scheduler(process(journal), workers=1, deadline=deadline, progress_interval=0)
+        stats = asyncio.run(scheduler.run([os.urandom(32).hex()]))
+        assert (stats['failed'], stats['timed_out']) == (1, 0)
+
+
+def test_nonce_manager_of_a_processed_wallet_is_evicted(monkeypatch, tmp_path):
+    managers = []
+
+    async def claim(self) -> None:
+        managers.append(self.client.transactions.nonce_manager)
+
+    monkeypatch.setattr(Hyperlend, 'claim_mbtc_faucet', claim)
+    journal = Journal(str(tmp_path / 'journal.db'))
+    private_key = os.urandom(32).hex()
+
+    asyncio.run(Scheduler(process(journal), workers=1, progress_interval=0).run([private_key]))
+
+    assert len(managers) == 1
+    assert managers[0] not in NonceManager._managers.values()
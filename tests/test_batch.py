@@ -0,0 +1,80 @@
+import os
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from benchmarks.mock_chain import MockChain, MockConfig, RPCFailure
+from eth_async import exceptions
+from eth_async.client import Client
+from eth_async.data.models import Network
+from tests.conftest import local_node
+
+ADDRESSES = [f'0x{i:040x}' for i in range(1, 9)]
+BROKEN = ADDRESSES[1:5]
+
+
+class ReversedChain(MockChain):
+    """
+    A chain whose node answers batches in reverse order, which JSON-RPC allows.
+    """
+    async def rpc(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if isinstance(body, list):
+            return web.json_response([self._call(item) for item in reversed(body)])
+
+        return web.json_response(self._call(body))
+
+
+class FailingChain(ReversedChain):
+    """
+    A chain whose node always fails the balances of some addresses and fails the balance of another one once.
+    """
+    def __init__(self, config: MockConfig) -> None:
+        super().__init__(config)
+        self.attempts = {}
+
+    def _eth_getBalance(self, address: str, block: str = 'latest') -> str:
+        attempt = self.attempts[address] = self.attempts.get(address, 0) + 1
+        if address in BROKEN or (address == ADDRESSES[5] and attempt == 1):
+            raise RPCFailure(-32000, 'header not found')
+
+        return hex(int(address, 16))
+
+
+def make_client(url: str, chain_id: int) -> Client:
+    network = Network(name=f'local{chain_id}', rpc=url, chain_id=chain_id, coin_symbol='HYPE', decimals=18)
+    return Client(private_key=os.urandom(32).hex(), network=network, check_proxy=False)
+
+
+def test_responses_are_matched_by_id():
+    async def scenario():
+        async with local_node(ReversedChain(MockConfig(latency=0, jitter=0, chain_id=31401))) as (chain, url):
+            client = make_client(url, 31401)
+            return await client.batch.nonces(ADDRESSES), await client.batch.execute(
+                [('eth_chainId', []), ('eth_blockNumber', [])]
+            ), chain.block_number
+
+    nonces, (chain_id, block), block_number = asyncio.run(scenario())
+    assert list(nonces.values()) == [0] * len(ADDRESSES)
+    assert (int(chain_id, 16), int(block, 16)) == (31401, block_number)
+
+
+def test_failed_requests_are_resent_once_each():
+    async def scenario():
+        async with local_node(FailingChain(MockConfig(latency=0, jitter=0, chain_id=31402))) as (chain, url):
+            client = make_client(url, 31402)
+            results = await client.batch.execute(
+                [('eth_getBalance', [address, 'latest']) for address in ADDRESSES], return_errors=True
+            )
+            with pytest.raises(exceptions.RPCError):
+                await client.batch.balances(ADDRESSES[:4])
+
+            return results, chain.attempts
+
+    results, attempts = asyncio.run(scenario())
+    assert all(isinstance(results[i], exceptions.RPCError) for i in range(1, 5))
+    assert [int(results[i], 16) for i in (0, 5, 6, 7)] == [int(ADDRESSES[i], 16) for i in (0, 5, 6, 7)]
+    # The batch and a single retry in each of the two calls
+    assert [attempts[address] for address in BROKEN] == [4, 4, 4, 2]
+    assert attempts[ADDRESSES[5]] == 2
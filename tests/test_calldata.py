@@ -0,0 +1,47 @@
+import pytest
+from eth_abi import encode
+from web3 import Web3
+
+from eth_async.calldata import APPROVE, UINT256_MAX, Calldata, selector
+
+TOKEN = '0x453b63484b11bbF0b61fC7E854f8DAC7bdE7d458'
+POOL = '0x1e85CCDf0D098a9f55b82F3E35013Eda235C8BD8'
+SUPPLY = Calldata('supply(address,uint256,address,uint16)')
+
+
+def test_bound_arguments_are_encoded_once():
+    supply = SUPPLY.bind(TOKEN)
+
+    assert supply.types == ('uint256', 'address', 'uint16')
+    assert supply.prefix == selector(SUPPLY.signature) + encode(['address'], [TOKEN])
+    assert supply.encode(10, POOL, 0) == SUPPLY.encode(TOKEN, 10, POOL, 0) == (
+        Web3.keccak(text='supply(address,uint256,address,uint16)')[:4]
+        + encode(['address', 'uint256', 'address', 'uint16'], [TOKEN, 10, POOL, 0])
+    )
+    assert APPROVE.encode_hex(POOL, UINT256_MAX) == '0x' + APPROVE.encode(POOL, UINT256_MAX).hex()
+
+    with pytest.raises(ValueError):
+        SUPPLY.bind(TOKEN, 1, POOL, 0, 0)
+
+
+def test_uint_range_is_checked():
+    supply = SUPPLY.bind(TOKEN)
+    assert supply.encode(UINT256_MAX, POOL, 2 ** 16 - 1)[-2:] == b'\xff\xff'
+
+    for amount, referral in ((-1, 0), (UINT256_MAX + 1, 0), (1, 2 ** 16)):
+        with pytest.raises(ValueError):
+            supply.encode(amount, POOL, referral)
+
+    with pytest.raises(ValueError):
+        supply.encode(1.5, POOL, 0)
+
+
+def test_address_checksum_is_verified():
+    assert APPROVE.encode(POOL.lower(), 1) == APPROVE.encode(POOL.upper().replace('0X', '0x'), 1) == \
+        APPROVE.encode(POOL, 1)
+
+    with pytest.raises(ValueError):
+        APPROVE.encode(POOL[:3] + POOL[3].swapcase() + POOL[4:], 1)
+
+    with pytest.raises(ValueError):
+        APPROVE.encode(POOL[:-1], 1)
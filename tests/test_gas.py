@@ -0,0 +1,48 @@
+import os
+import asyncio
+
+from benchmarks.mock_chain import MockChain, MockConfig
+from eth_async.client import Client
+from eth_async.data.models import Network
+from tests.conftest import local_node
+
+DEAD_PROXY = 'http://127.0.0.1:1'
+
+
+def make_network(url: str, chain_id: int) -> Network:
+    return Network(name=f'local{chain_id}', rpc=url, chain_id=chain_id, tx_type=2, coin_symbol='HYPE', decimals=18)
+
+
+def make_client(network: Network, proxy: str | None = None) -> Client:
+    return Client(private_key=os.urandom(32).hex(), network=network, proxy=proxy, check_proxy=False)
+
+
+def test_refresh_failed_through_another_proxy_is_made_again():
+    async def scenario():
+        async with local_node(MockChain(MockConfig(latency=0.02, jitter=0, chain_id=31301))) as (chain, url):
+            network = make_network(url, 31301)
+            # The client with the dead proxy starts the refresh, the other one joins it
+            dead, alive = make_client(network, DEAD_PROXY), make_client(network)
+            return await asyncio.gather(
+                network.gas_oracle.fees(dead), network.gas_oracle.fees(alive), return_exceptions=True
+            )
+
+    dead_result, fees = asyncio.run(scenario())
+    assert isinstance(dead_result, Exception)
+    assert fees.max_fee
+
+
+def test_latest_priority_fee_is_served_from_the_cache():
+    async def scenario():
+        async with local_node(MockChain(MockConfig(latency=0, jitter=0, chain_id=31302))) as (chain, url):
+            network = make_network(url, 31302)
+            client = make_client(network)
+            fees = await network.gas_oracle.fees(client)
+            estimator = network.gas_oracle.priority_fees
+            requests = chain.state.requests
+            priority_fee = await client.transactions.max_priority_fee()
+            return fees, priority_fee.Wei, estimator.stats(), chain.state.requests - requests
+
+    fees, priority_fee, stats, requests = asyncio.run(scenario())
+    assert priority_fee == fees.max_priority_fee
+    assert (stats['hits'], requests) == (1, 0)
@@ -0,0 +1,71 @@
+import os
+import asyncio
+
+from benchmarks.mock_chain import MockChain, MockConfig
+from eth_async.client import Client
+from eth_async.data.models import Network, TokenAmount
+from tasks.hyperlend import Hyperlend
+from tests.conftest import local_node
+
+TOKEN = Hyperlend.token_data['BTC']['token']
+POOL = Hyperlend.token_data['BTC']['pool']
+
+
+class RevertingApprovalChain(MockChain):
+    """
+    A chain whose token reverts every approval.
+    """
+    def _eth_getTransactionReceipt(self, tx_hash: str) -> dict | None:
+        receipt = super()._eth_getTransactionReceipt(tx_hash)
+        if receipt and receipt['to'] == TOKEN:
+            receipt['status'] = '0x0'
+
+        return receipt
+
+
+def config(chain_id: int) -> MockConfig:
+    return MockConfig(latency=0, jitter=0, chain_id=chain_id, recover_senders=True, block_time=0.05)
+
+
+def make_hyperlend(url: str, chain_id: int) -> Hyperlend:
+    network = Network(name=f'local{chain_id}', rpc=url, chain_id=chain_id, coin_symbol='HYPE', decimals=18)
+    client = Client(private_key=os.urandom(32).hex(), network=network, check_proxy=False)
+    return Hyperlend(client=client, api_key='', proxy_info={})
+
+
+def sent_to(chain: MockChain, address: str) -> list[str]:
+    return [to for _, sender, to, _ in chain.state.txs.values() if sender == address]
+
+
+def test_supply_is_sent_with_the_approval_once_its_gas_is_estimated(monkeypatch):
+    monkeypatch.setattr(Hyperlend, 'supply_gas_estimates', {})
+    waits = []
+    wait_for_receipts = Hyperlend.wait_for_receipts
+
+    async def record_waits(self, txs, timeout=300):
+        waits.append([tx.params['to'] for tx in txs])
+        return await wait_for_receipts(self, txs, timeout=timeout)
+
+    monkeypatch.setattr(Hyperlend, 'wait_for_receipts', record_waits)
+
+    async def scenario():
+        async with local_node(MockChain(config(31501))) as (chain, url):
+            for _ in range(2):
+                await make_hyperlend(url, 31501).supply_mbtc(amount=TokenAmount(0.001, decimals=8))
+
+    asyncio.run(scenario())
+    # The first supply waits for its approval to be estimated, the second one is sent right after its approval
+    assert waits == [[TOKEN], [POOL], [TOKEN, POOL]]
+    assert Hyperlend.supply_gas_estimates == {'BTC': MockConfig.gas_estimate}
+
+
+def test_supply_isnt_sent_after_a_reverted_approval(monkeypatch):
+    monkeypatch.setattr(Hyperlend, 'supply_gas_estimates', {})
+
+    async def scenario():
+        async with local_node(RevertingApprovalChain(config(31502))) as (chain, url):
+            hyperlend = make_hyperlend(url, 31502)
+            await hyperlend.supply_mbtc(amount=TokenAmount(0.001, decimals=8))
+            return sent_to(chain, hyperlend.client.account.address)
+
+    assert asyncio.run(scenario()) == [TOKEN]
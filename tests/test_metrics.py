@@ -0,0 +1,12 @@
+from eth_async.metrics import Metrics
+
+
+def test_prometheus_merges_proxies():
+    metrics = Metrics()
+    for i in range(50):
+        metrics.observe('rpc', 'eth_call', 0.1, endpoint='http://node', proxy=f'http://10.0.0.{i}:8080')
+
+    exported = metrics.prometheus()
+    assert 'proxy=' not in exported
+    assert 'eth_async_request_duration_seconds_count{kind="rpc",name="eth_call",endpoint="node"} 50' in exported
+    assert sum(line.startswith('eth_async_request_duration_seconds_count') for line in exported.splitlines()) == 1
@@ -0,0 +1,104 @@
+import asyncio
+
+from eth_abi import encode
+from web3 import Web3
+
+from benchmarks.mock_chain import MockChain, MockConfig
+from eth_async.client import Client
+from eth_async.data.models import Network
+from eth_async.multicall import Multicall, BALANCE_OF, SYMBOL, NAME
+from tasks.base import Base
+from tests.conftest import local_node
+
+TOKEN = '0x453b63484b11bbF0b61fC7E854f8DAC7bdE7d458'
+SPENDER = '0x1e85CCDf0D098a9f55b82F3E35013Eda235C8BD8'
+OWNERS = [Web3.to_checksum_address(f'0x{i:040x}') for i in range(1, 4)]
+
+
+class BrokenTokenChain(MockChain):
+    """
+    A chain where 'balanceOf' of the token returns nothing, as a call to a contract without the function does.
+    """
+    def _execute(self, to: str, data: bytes) -> bytes:
+        if data[:4] == BALANCE_OF and to.lower() == TOKEN.lower():
+            return b''
+
+        return super()._execute(to, data)
+
+
+class Bytes32SymbolChain(MockChain):
+    """
+    A chain where the token returns its symbol as bytes32 and reverts on 'name', as MKR-like tokens do.
+    """
+    def _execute(self, to: str, data: bytes) -> bytes:
+        if data[:4] == SYMBOL:
+            return b'MKR'.ljust(32, b'\0')
+
+        if data[:4] == NAME:
+            return b''
+
+        return super()._execute(to, data)
+
+
+def client_for(url: str, chain_id: int) -> Client:
+    network = Network(name=f'local{chain_id}', rpc=url, chain_id=chain_id, coin_symbol='HYPE', decimals=18)
+    return Client(network=network, check_proxy=False)
+
+
+def test_aggregate_reads_of_many_wallets_in_one_call():
+    async def scenario():
+        config = MockConfig(latency=0, jitter=0, chain_id=31001, token_balance=5, token_decimals=6)
+        async with local_node(MockChain(config)) as (chain, url):
+            client = client_for(url, config.chain_id)
+            calls = [client.multicall.eth_balance(owner) for owner in OWNERS]
+            calls += [Multicall.balance_of(TOKEN, owner) for owner in OWNERS]
+            calls += [Multicall.allowance(TOKEN, OWNERS[0], SPENDER), Multicall.decimals(TOKEN)]
+            await client.multicall.is_deployed()
+
+            requests = chain.state.requests
+            results = await client.multicall.aggregate(calls)
+            return results, chain.state.requests - requests, config
+
+    results, requests, config = asyncio.run(scenario())
+    assert results == [config.balance] * 3 + [5] * 3 + [0, 6]
+    assert requests == 1
+
+
+def test_aggregate_falls_back_to_batch_without_multicall3():
+    async def scenario():
+        config = MockConfig(latency=0, jitter=0, chain_id=31002, multicall=False, token_balance=7)
+        async with local_node(MockChain(config)) as (chain, url):
+            client = client_for(url, config.chain_id)
+            return await client.multicall.aggregate(
+                [client.multicall.eth_balance(OWNERS[0]), Multicall.balance_of(TOKEN, OWNERS[0])]
+            ), config
+
+    results, config = asyncio.run(scenario())
+    assert results == [config.balance, 7]
+
+
+def test_approve_interface_fails_cleanly_on_failed_reads():
+    async def scenario():
+        config = MockConfig(latency=0, jitter=0, chain_id=31003)
+        async with local_node(BrokenTokenChain(config)) as (chain, url):
+            client = client_for(url, config.chain_id)
+            base = Base(client=client, api_key='', proxy_info={})
+            return await base.approve_interface(token_address=TOKEN, spender=SPENDER, wait=False)
+
+    assert asyncio.run(scenario()) is False
+
+
+def test_encoded_calls_match_the_abi():
+    call = Multicall.allowance(TOKEN, OWNERS[0], SPENDER)
+    assert call.data[4:] == encode(['address', 'address'], [OWNERS[0], SPENDER])
+
+
+def test_token_metadata_with_bytes32_symbol():
+    async def scenario():
+        config = MockConfig(latency=0, jitter=0, chain_id=31004, token_decimals=18)
+        async with local_node(Bytes32SymbolChain(config)) as (chain, url):
+            client = client_for(url, config.chain_id)
+            return await client.transactions.get_token_metadata(TOKEN)
+
+    metadata = asyncio.run(scenario())
+    assert (metadata.decimals, metadata.symbol, metadata.name) == (18, 'MKR', None)
@@ -0,0 +1,44 @@
+import os
+import asyncio
+
+from eth_account import Account
+from web3 import Web3
+from web3.types import TxParams
+
+from benchmarks.mock_chain import MockChain, MockConfig
+from eth_async.client import Client
+from eth_async.data.models import Network
+from eth_async.pipeline import tx_pipeline
+from tests.conftest import local_node
+
+RECIPIENT = '0x1e85CCDf0D098a9f55b82F3E35013Eda235C8BD8'
+
+
+def test_transactions_signed_in_processes_match_inline_signing():
+    async def scenario():
+        config = MockConfig(latency=0, jitter=0, chain_id=31601, recover_senders=True)
+        async with local_node(MockChain(config)) as (chain, url):
+            network = Network(name='local31601', rpc=url, chain_id=31601, coin_symbol='HYPE', decimals=18)
+            clients = [Client(private_key=os.urandom(32).hex(), network=network, check_proxy=False) for _ in range(3)]
+            tx_params = [TxParams(to=RECIPIENT, value=i, gas=21000) for i in range(len(clients))]
+
+            tx_pipeline.configure(processes=2)
+            try:
+                await tx_pipeline.warm_up()
+                raw_txs = await asyncio.gather(*(
+                    tx_pipeline.prepare(client, params) for client, params in zip(clients, tx_params)
+                ))
+                tx_hashes = [await tx_pipeline.submit(client, raw) for client, raw in zip(clients, raw_txs)]
+                assert tx_pipeline._executor is not None
+            finally:
+                tx_pipeline.configure(processes=0)
+
+            return chain, clients, tx_params, raw_txs, tx_hashes
+
+    chain, clients, tx_params, raw_txs, tx_hashes = asyncio.run(scenario())
+
+    for client, params, raw_tx, tx_hash in zip(clients, tx_params, raw_txs, tx_hashes):
+        signed = Account.sign_transaction(params, client.account.key)
+        assert raw_tx == bytes(signed.rawTransaction)
+        assert tx_hash == signed.hash
+        assert Web3.to_checksum_address(chain.state.txs[tx_hash.hex()][1]) == client.account.address
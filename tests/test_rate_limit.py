@@ -0,0 +1,90 @@
+import time
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from eth_async import exceptions
+from eth_async.rate_limit import RateLimiter, is_rate_limit_error, parse_retry_after, rate_limiters
+from eth_async.utils.web_requests_old import async_get
+from tests.conftest import free_port
+
+
+def test_rate_grows_on_success_and_is_cut_once_per_interval():
+    limiter = RateLimiter(rate=10, max_rate=20, increase=5, decrease=0.5, decrease_interval=60)
+    limiter.on_success()
+    assert limiter.rate == 10.5
+
+    limiter.on_rate_limited()
+    limiter.on_rate_limited()
+    # A burst of rejections cuts the rate once
+    assert (limiter.rate, limiter.rate_limited) == (5.25, 2)
+
+
+def test_retry_after_pauses_requests():
+    async def scenario():
+        limiter = RateLimiter(rate=1000)
+        limiter.on_rate_limited(retry_after=0.2)
+        started = time.monotonic()
+        await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.19
+
+
+def test_rate_limit_errors_and_retry_after_are_recognized():
+    assert is_rate_limit_error({'code': -32005, 'message': 'slow down'})
+    assert is_rate_limit_error({'status': '0', 'message': 'NOTOK', 'result': 'Max rate limit reached'})
+    assert not is_rate_limit_error({'code': -32000, 'message': 'execution reverted'})
+    assert parse_retry_after('2') == 2
+    assert parse_retry_after('soon') is None
+
+
+async def start_server(statuses: list[int]) -> tuple[web.AppRunner, str]:
+    """
+    Serve an API that answers with the given statuses in turn and then with 200.
+    """
+    async def handler(request: web.Request) -> web.Response:
+        status = statuses.pop(0) if statuses else 200
+        return web.json_response({'status': '1', 'result': 'ok'}, status=status)
+
+    app = web.Application()
+    app.router.add_get('/api', handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    port = free_port()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner, f'http://127.0.0.1:{port}/api'
+
+
+def test_server_errors_cut_the_rate():
+    async def scenario():
+        runner, url = await start_server([500, 503])
+        try:
+            rate_limiters.configure(url, rate=100, decrease_interval=0)
+            response = await async_get(url)
+            return response, rate_limiters.get(url).stats()
+        finally:
+            await runner.cleanup()
+
+    response, stats = asyncio.run(scenario())
+    assert response['result'] == 'ok'
+    assert stats['rate_limited'] == 2
+    assert stats['rate'] < 100 / 2
+
+
+def test_persistent_server_error_is_raised():
+    async def scenario():
+        runner, url = await start_server([502] * 10)
+        try:
+            rate_limiters.configure(url, max_retries=2, decrease_interval=0)
+            with pytest.raises(exceptions.HTTPException) as error:
+                await async_get(url)
+
+            return error.value.status_code, rate_limiters.get(url).rate
+        finally:
+            await runner.cleanup()
+
+    status_code, rate = asyncio.run(scenario())
+    assert status_code == 502
+    assert rate < 500
@@ -0,0 +1,81 @@
+import os
+import asyncio
+
+import pytest
+from web3.exceptions import TimeExhausted
+from web3.types import TxParams
+
+from benchmarks.mock_chain import MockChain, MockConfig
+from eth_async.client import Client
+from eth_async.data.models import Network
+from tests.conftest import free_port, local_node
+
+RECIPIENT = '0x1e85CCDf0D098a9f55b82F3E35013Eda235C8BD8'
+
+
+def make_network(chain_id: int, port: int) -> Network:
+    return Network(
+        name=f'local{chain_id}', rpc=f'http://127.0.0.1:{port}/', chain_id=chain_id, coin_symbol='HYPE', decimals=18
+    )
+
+
+async def send(network: Network):
+    client = Client(private_key=os.urandom(32).hex(), network=network, check_proxy=False)
+    tx = await client.transactions.sign_and_send(TxParams(to=RECIPIENT, value=1, gas=21000))
+    return client, tx
+
+
+def test_watcher_works_in_every_event_loop():
+    port = free_port()
+    network = make_network(31201, port)
+
+    async def scenario():
+        config = MockConfig(latency=0, jitter=0, chain_id=31201, block_time=0.05)
+        async with local_node(MockChain(config), port=port):
+            client, tx = await send(network)
+            return (await tx.wait_for_receipt(client, timeout=5, poll_latency=0.02))['status']
+
+    # E.g. benchmarks and shards run one event loop after another
+    assert asyncio.run(scenario()) == 1
+    assert asyncio.run(scenario()) == 1
+
+
+def test_waiter_that_gives_up_doesnt_drop_the_others():
+    port = free_port()
+    network = make_network(31202, port)
+
+    async def scenario():
+        config = MockConfig(latency=0, jitter=0, chain_id=31202, block_time=0.5)
+        async with local_node(MockChain(config), port=port):
+            client, tx = await send(network)
+            watcher = network.receipt_watcher
+            patient = asyncio.create_task(watcher.wait(client, tx.hash, timeout=5, poll_latency=0.02))
+            with pytest.raises(TimeExhausted):
+                await watcher.wait(client, tx.hash, timeout=0.01)
+
+            return (await patient)['transactionHash'] == tx.hash, watcher.pending
+
+    assert asyncio.run(scenario()) == (True, 0)
+
+
+def test_watcher_moves_off_a_dead_proxy():
+    port = free_port()
+    network = make_network(31203, port)
+
+    async def scenario():
+        config = MockConfig(latency=0, jitter=0, chain_id=31203, block_time=0.05)
+        async with local_node(MockChain(config), port=port):
+            client, first = await send(network)
+            second = await client.transactions.sign_and_send(TxParams(to=RECIPIENT, value=1, gas=21000))
+            dead = Client(
+                private_key=os.urandom(32).hex(), network=network, proxy='http://127.0.0.1:1', check_proxy=False
+            )
+            watcher = network.receipt_watcher
+            # The transaction watched last is polled through the dead proxy first
+            receipts = await asyncio.gather(
+                watcher.wait(client, first.hash, timeout=5, poll_latency=0.02),
+                watcher.wait(dead, second.hash, timeout=5, poll_latency=0.02)
+            )
+            return [receipt['status'] for receipt in receipts]
+
+    assert asyncio.run(scenario()) == [1, 1]
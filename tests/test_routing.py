@@ -0,0 +1,86 @@
+import json
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from eth_async.routing import EndpointRouter
+from eth_async.transport import TransportConfig, TransportRegistry
+from tests.conftest import free_port
+
+SEND = json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': 'eth_sendRawTransaction', 'params': ['0x00']}).encode()
+
+
+async def start_node(delay: float) -> tuple[web.AppRunner, str, list]:
+    """
+    Serve a node that answers every request after a delay and records the requests it got.
+    """
+    received = []
+
+    async def rpc(request: web.Request) -> web.Response:
+        received.append(await request.read())
+        await asyncio.sleep(delay)
+        return web.json_response({'jsonrpc': '2.0', 'id': 1, 'result': '0x' + '11' * 32})
+
+    app = web.Application()
+    app.router.add_post('/', rpc)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    port = free_port()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner, f'http://127.0.0.1:{port}/', received
+
+
+def make_router(*urls: str) -> tuple[EndpointRouter, TransportRegistry]:
+    registry = TransportRegistry(TransportConfig(request_timeout=0.2))
+    # The first endpoint is ranked first
+    return EndpointRouter([(url, 1 / (i + 1)) for i, url in enumerate(urls)], registry=registry), registry
+
+
+def test_write_doesnt_fail_over_after_a_timeout():
+    async def scenario():
+        slow, slow_url, slow_received = await start_node(delay=1)
+        fast, fast_url, fast_received = await start_node(delay=0)
+        router, registry = make_router(slow_url, fast_url)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await router.post(SEND, hedge=False, method='eth_sendRawTransaction')
+
+            return len(slow_received), len(fast_received), router.failovers
+        finally:
+            await registry.close()
+            await slow.cleanup()
+            await fast.cleanup()
+
+    # The transaction reached the slow node, so it isn't sent again to the other one
+    assert asyncio.run(scenario()) == (1, 0, 0)
+
+
+def test_write_fails_over_when_the_connection_is_refused():
+    async def scenario():
+        node, url, received = await start_node(delay=0)
+        router, registry = make_router(f'http://127.0.0.1:{free_port()}/', url)
+        try:
+            await router.post(SEND, hedge=False, method='eth_sendRawTransaction')
+            return len(received), router.failovers
+        finally:
+            await registry.close()
+            await node.cleanup()
+
+    assert asyncio.run(scenario()) == (1, 1)
+
+
+def test_read_fails_over_after_a_timeout():
+    async def scenario():
+        slow, slow_url, _ = await start_node(delay=1)
+        fast, fast_url, fast_received = await start_node(delay=0)
+        router, registry = make_router(slow_url, fast_url)
+        try:
+            await router.post(SEND.replace(b'eth_sendRawTransaction', b'eth_call'), method='eth_call')
+            return len(fast_received), router.failovers
+        finally:
+            await registry.close()
+            await slow.cleanup()
+            await fast.cleanup()
+
+    assert asyncio.run(scenario()) == (1, 1)
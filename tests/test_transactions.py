@@ -0,0 +1,165 @@
+import os
+import asyncio
+
+import pytest
+from web3.types import TxParams
+
+from benchmarks.mock_chain import MockChain, MockConfig, RPCFailure
+from eth_async.client import Client
+from eth_async.metrics import metrics
+from eth_async.data.models import Network
+from eth_async.pipeline import tx_pipeline
+from eth_async.transactions import NonceManager
+from tests.conftest import local_node
+
+RECIPIENT = '0x1e85CCDf0D098a9f55b82F3E35013Eda235C8BD8'
+
+
+class RejectingChain(MockChain):
+    """
+    A chain whose node rejects the first transaction, as it does one that can't pay for gas.
+    """
+    rejected = False
+
+    def _eth_sendRawTransaction(self, raw: str) -> str:
+        if not self.rejected:
+            self.rejected = True
+            raise RPCFailure(-32000, 'insufficient funds for gas * price + value')
+
+        return super()._eth_sendRawTransaction(raw)
+
+
+class StaleNonceChain(MockChain):
+    """
+    A chain whose node reports the first transaction's nonce as already used, as after a send from another process.
+    """
+    stale = False
+
+    def _eth_sendRawTransaction(self, raw: str) -> str:
+        if not self.stale:
+            self.stale = True
+            raise RPCFailure(-32000, 'nonce too low')
+
+        return super()._eth_sendRawTransaction(raw)
+
+
+def make_client(url: str, chain_id: int) -> Client:
+    network = Network(name=f'local{chain_id}', rpc=url, chain_id=chain_id, coin_symbol='HYPE', decimals=18)
+    return Client(private_key=os.urandom(32).hex(), network=network, check_proxy=False)
+
+
+def config(chain_id: int) -> MockConfig:
+    return MockConfig(latency=0, jitter=0, chain_id=chain_id, recover_senders=True)
+
+
+def transfer() -> TxParams:
+    return TxParams(to=RECIPIENT, value=1, gas=21000)
+
+
+def test_nonce_of_a_rejected_transaction_is_reused():
+    async def scenario():
+        async with local_node(RejectingChain(config(31101))) as (chain, url):
+            client = make_client(url, 31101)
+            with pytest.raises(ValueError):
+                await client.transactions.sign_and_send(transfer())
+
+            return (await client.transactions.sign_and_send(transfer())).params['nonce']
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_nonce_is_resynced_when_the_response_to_a_broadcast_is_lost(monkeypatch):
+    submit = tx_pipeline.submit
+
+    async def submit_and_lose_response(client, raw_tx):
+        await submit(client, raw_tx)
+        raise asyncio.TimeoutError()
+
+    async def scenario():
+        async with local_node(MockChain(config(31102))) as (chain, url):
+            client = make_client(url, 31102)
+            monkeypatch.setattr(tx_pipeline, 'submit', submit_and_lose_response)
+            with pytest.raises(asyncio.TimeoutError):
+                await client.transactions.sign_and_send(transfer())
+
+            monkeypatch.setattr(tx_pipeline, 'submit', submit)
+            return (await client.transactions.sign_and_send(transfer())).params['nonce']
+
+    # The first transaction reached the node, so its nonce isn't handed out again
+    assert asyncio.run(scenario()) == 1
+
+
+def test_explicit_zero_nonce_is_not_replaced():
+    async def scenario():
+        async with local_node(MockChain(config(31103))) as (chain, url):
+            client = make_client(url, 31103)
+            await client.transactions.sign_and_send(transfer())
+            # A replacement of the first transaction fails instead of being sent with the next managed nonce
+            with pytest.raises(ValueError, match='nonce too low'):
+                await client.transactions.sign_and_send(TxParams(**transfer(), nonce=0))
+
+            return len(chain.state.txs)
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_retried_nonce_error_is_not_counted_as_a_failure():
+    async def scenario():
+        async with local_node(StaleNonceChain(config(31104))) as (chain, url):
+            client = make_client(url, 31104)
+            failed = metrics.total('txs_failed')
+            await client.transactions.sign_and_send(transfer())
+            return metrics.total('txs_failed') - failed, len(chain.state.txs)
+
+    assert asyncio.run(scenario()) == (0, 1)
+
+
+def test_nonce_of_a_transaction_cancelled_before_broadcast_is_reused(monkeypatch):
+    prepare = tx_pipeline.prepare
+
+    async def prepare_and_hang(client, tx_params):
+        await prepare(client, tx_params)
+        await asyncio.sleep(10)
+
+    async def scenario():
+        async with local_node(MockChain(config(31105))) as (chain, url):
+            client = make_client(url, 31105)
+            monkeypatch.setattr(tx_pipeline, 'prepare', prepare_and_hang)
+            with pytest.raises(TimeoutError):
+                await asyncio.wait_for(client.transactions.sign_and_send(transfer()), 0.1)
+
+            monkeypatch.setattr(tx_pipeline, 'prepare', prepare)
+            return (await client.transactions.sign_and_send(transfer())).params['nonce']
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_nonce_is_resynced_when_a_broadcast_is_cancelled(monkeypatch):
+    submit = tx_pipeline.submit
+
+    async def submit_and_hang(client, raw_tx):
+        await submit(client, raw_tx)
+        await asyncio.sleep(10)
+
+    async def scenario():
+        async with local_node(MockChain(config(31106))) as (chain, url):
+            client = make_client(url, 31106)
+            monkeypatch.setattr(tx_pipeline, 'submit', submit_and_hang)
+            with pytest.raises(TimeoutError):
+                await asyncio.wait_for(client.transactions.sign_and_send(transfer()), 0.1)
+
+            monkeypatch.setattr(tx_pipeline, 'submit', submit)
+            return (await client.transactions.sign_and_send(transfer())).params['nonce']
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_nonce_manager_is_keyed_by_the_resolved_chain_id():
+    async def scenario():
+        async with local_node(MockChain(config(31107))) as (chain, url):
+            network = Network(name='unresolved31107', rpc=url, coin_symbol='HYPE', decimals=18)
+            client = Client(private_key=os.urandom(32).hex(), network=network, check_proxy=False)
+            tx = await client.transactions.sign_and_send(TxParams(**transfer(), chainId=31107))
+            return tx.params['nonce'], NonceManager.for_account(31107, client.account.address)._next
+
+    assert asyncio.run(scenario()) == (0, 1)
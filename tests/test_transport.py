@@ -0,0 +1,87 @@
+import gc
+import asyncio
+
+from benchmarks.mock_chain import MockChain, MockConfig
+from eth_async.transport import PooledHTTPProvider, RequestCoalescer, TransportRegistry
+from tests.conftest import local_node
+
+
+def test_reads_are_coalesced_only_through_the_same_proxy():
+    async def scenario():
+        # Proxied requests come to the mock chain by path, so it serves as both proxies and the node
+        async with local_node(MockChain(MockConfig(latency=0.05, jitter=0))) as (chain, url):
+            registry = TransportRegistry()
+            host = url.split('://')[1].rstrip('/')
+            providers = [
+                PooledHTTPProvider(url, proxy=f'http://{user}:pass@{host}', registry=registry)
+                for user in ('a', 'a', 'b')
+            ]
+            try:
+                await asyncio.gather(*(provider.make_request('eth_blockNumber', []) for provider in providers))
+                return registry.coalescer.stats()
+            finally:
+                await registry.close()
+
+    stats = asyncio.run(scenario())
+    assert (stats['upstream'], stats['coalesced']) == (2, 1)
+
+
+def test_providers_share_a_transport_and_its_connections():
+    async def scenario():
+        async with local_node(MockChain(MockConfig(latency=0, jitter=0))) as (chain, url):
+            registry = TransportRegistry()
+            providers = [PooledHTTPProvider(url, registry=registry) for _ in range(3)]
+            try:
+                for provider in providers:
+                    await provider.make_request('eth_chainId', [])
+
+                transport = providers[0].transport
+                return registry.stats(), transport is providers[2].transport, transport.session()
+            finally:
+                await registry.close()
+
+    stats, shared, session = asyncio.run(scenario())
+    assert shared
+    assert (stats['transports'], stats['misses'], stats['connections_created']) == (1, 1, 1)
+    assert stats['connections_reused'] == 2
+    assert session.closed
+
+
+def test_idle_transports_are_closed():
+    async def scenario():
+        async with local_node(MockChain(MockConfig(latency=0, jitter=0))) as (chain, url):
+            registry = TransportRegistry()
+            provider = PooledHTTPProvider(url, registry=registry)
+            await provider.make_request('eth_chainId', [])
+            transport = registry.get(url)
+            session = transport.session()
+            transport.last_used -= registry.config.idle_timeout + 1
+            registry._last_eviction -= registry.config.idle_timeout + 1
+            registry.evict()
+            await asyncio.sleep(0.01)
+            return registry.stats(), session.closed
+
+    stats, closed = asyncio.run(scenario())
+    assert (stats['transports'], stats['evictions']) == (0, 1)
+    assert closed
+
+
+def test_failed_call_without_waiters_is_not_reported():
+    errors = []
+
+    async def scenario():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        coalescer = RequestCoalescer()
+
+        async def fail() -> bytes:
+            await asyncio.sleep(0.01)
+            raise ConnectionError('dead proxy')
+
+        waiter = asyncio.ensure_future(coalescer.run('key', fail))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0.05)
+        gc.collect()
+
+    asyncio.run(scenario())
+    assert not errors
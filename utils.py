@@ -1,4 +1,8 @@
+import csv
 import sys
+from dataclasses import dataclass, replace
+from itertools import islice
+from typing import Iterator
 
 from loguru import logger
 
@@ -37,6 +41,101 @@ def load_file(file_path, description):
         return None
 
 
+def iter_lines(file_path: str) -> Iterator[str]:
+    """
+    Reads a file lazily, unlike 'load_file' only the current line is held in memory.
+
+    Args:
+        file_path (str): The path to the file to be read.
+
+    Returns:
+        Iterator[str]: The non-empty, stripped lines of the file.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                yield line
+
+
+@dataclass(frozen=True)
+class WalletSource:
+    """
+    Wallets read lazily from the private keys file, zipped with the proxies file if it's set, or from a CSV manifest
+    with the 'private_key' and an optional 'proxy' column. Wallets without a proxy get one from the proxy pool.
+    Iterating it yields (private key, proxy) pairs and opens the files again each time, so the inventory can be of any
+    size. The source can be pickled and split into shards for worker processes, each shard reads the files itself.
+
+    Attributes:
+        keys_path (str | None): The path to the private keys file, one key per line.
+        proxies_path (str | None): The path to the proxies file, one proxy per wallet, or None if the wallets share
+            the proxy pool.
+        manifest_path (str | None): The path to the CSV manifest, used instead of the keys and proxies files.
+        shard_index (int): The index of the first wallet of the shard.
+        shard_count (int): The number of shards, the shard takes every 'shard_count'-th wallet.
+    """
+    keys_path: str | None = None
+    proxies_path: str | None = None
+    manifest_path: str | None = None
+    shard_index: int = 0
+    shard_count: int = 1
+
+    def __iter__(self) -> Iterator[tuple[str, str | None]]:
+        if self.manifest_path:
+            pairs = self._iter_manifest()
+        elif not self.proxies_path:
+            pairs = ((private_key, None) for private_key in iter_lines(self.keys_path))
+        else:
+            # Raises ValueError once one file ends before the other
+            pairs = zip(iter_lines(self.keys_path), iter_lines(self.proxies_path), strict=True)
+
+        return islice(pairs, self.shard_index, None, self.shard_count)
+
+    def _iter_manifest(self) -> Iterator[tuple[str, str | None]]:
+        with open(self.manifest_path, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.DictReader(file)
+            if 'private_key' not in (reader.fieldnames or ()):
+                raise ValueError(f"The manifest {self.manifest_path} has no 'private_key' column")
+
+            for row in reader:
+                private_key = (row['private_key'] or '').strip()
+                if private_key:
+                    yield private_key, (row.get('proxy') or '').strip() or None
+
+    def shard(self, index: int, count: int) -> 'WalletSource':
+        """
+        Splits the wallets round-robin.
+
+        Args:
+            index (int): The index of the shard.
+            count (int): The number of shards.
+
+        Returns:
+            WalletSource: The wallets of the shard.
+        """
+        return replace(self, shard_index=self.shard_index + index * self.shard_count,
+                       shard_count=self.shard_count * count)
+
+    def count(self) -> int:
+        """
+        Counts the wallets by reading the files through, checking that every wallet has a proxy if there is a
+        proxies file.
+
+        Returns:
+            int: The number of wallets.
+
+        Raises:
+            ValueError: If the numbers of private keys and proxies are not equal or the manifest is invalid.
+        """
+        try:
+            return sum(1 for _ in self)
+        except ValueError as e:
+            if self.manifest_path:
+                raise
+
+            raise ValueError('Not equal number of proxies and wallets.') from e
+
+
 def format_proxy(proxy: str) -> dict:
     """
     Formats a proxy string into a dictionary with connection details.